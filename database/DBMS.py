@@ -1,66 +1,69 @@
 import streamlit as st
-import mysql.connector
 import pandas as pd
+import hashlib
+import logging
+import os
+import time
+import uuid
 from datetime import datetime, date
 
-# ========== DB CONFIG (YAHAN APNA CHANGE KARO) ==========
-DB_HOST = "localhost"
-DB_USER = "root"              # ← apna MySQL user
-DB_PASSWORD = "fazilraza" # ← apna MySQL password
-DB_NAME = "students"          # ← apna database name
-
-
-# ========== DB CONNECTION & HELPERS ==========
-@st.cache_resource
-def get_connection():
-    return mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME
-    )
+import db
+import importer
+import scheduler
+import timetable
+
+logger = logging.getLogger("erp.db")
 
 
+# ========== PAGE HELPERS ==========
+def filter_selectbox(label: str, table_name: str, column: str, filters: list):
+    """Render an "All + distinct values" selectbox and append the chosen equality filter."""
+    choice = st.selectbox(
+        label,
+        options=["All"] + db.get_distinct_values(table_name, column),
+        index=0
+    )
+    if choice != "All":
+        filters.append((column, "equals", choice))
+
 
-def run_query(query, params=None):
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute(query, params or ())
-    rows = cur.fetchall()
-    cur.close()
-    return rows
+def submit_key(form: str, *values) -> str:
+    """Idempotency key for submitting ``values`` through ``form``: reruns and double
+    clicks with the same values reuse it until submit_done() starts a new one."""
+    nonce = st.session_state.setdefault(f"{form}_submit_key", uuid.uuid4().hex)
+    return f"{form}:{nonce}:{hashlib.sha1(repr(values).encode()).hexdigest()}"
 
 
-def run_execute(query, params=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(query, params or ())
-    conn.commit()
-    cur.close()
+def submit_done(form: str):
+    st.session_state.pop(f"{form}_submit_key", None)
 
 
-@st.cache_data
-def get_table_df(table_name: str) -> pd.DataFrame:
-    conn = get_connection()
-    df = pd.read_sql(f"SELECT * FROM `{table_name}`;", conn)
+def load_filtered(table_name: str, filters: list, what: str, search_text: str = "") -> pd.DataFrame:
+    """Fetch up to PAGE_ROWS filtered rows and caption the shown/total counts."""
+    filters = tuple(filters)
+    total, is_estimate = db.count_table_rows(table_name, search_text, filters)
+    df = db.get_table_page(table_name, search_text, filters, limit=db.PAGE_ROWS)
+    st.caption(f"Showing {len(df)} of {'≈ ' if is_estimate else ''}{total:,} {what}")
     return df
 
 
-@st.cache_data
-def get_all_tables() -> list:
-    """Return all table names from current DB."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SHOW TABLES;")
-    tables = [row[0] for row in cur.fetchall()]
-    cur.close()
-    return tables
+def show_conflicts(df: pd.DataFrame, cols: dict, kind: str):
+    """Render double-bookings of rooms or faculty found by the sweep."""
+    conflicts = timetable.find_conflicts(df, cols, kind)
+    if conflicts.empty:
+        st.success(f"No overlapping classes for any {kind}.")
+        return
+    conflicts["start"] = conflicts["start"].map(timetable.format_minutes)
+    conflicts["end"] = conflicts["end"].map(timetable.format_minutes)
+    conflicts = conflicts.rename(columns={"resource": cols[kind], "day": cols["day"] or "day"})
+    st.warning(f"{len(conflicts)} class(es) overlap another booking of the same {kind}.")
+    st.dataframe(conflicts, use_container_width=True)
 
 
 # ====== UI CONFIG ======
 st.set_page_config(page_title="Coaching ERP Dashboard", layout="wide")
 st.title("🎓 Coaching Management – Streamlit ERP")
-st.caption(f"Connected to MySQL database: **{DB_NAME}**")
+st.caption(f"Connected to MySQL database: **{db.DB_NAME}**")
 
 # ====== SIDEBAR NAVIGATION ======
 pages = [
@@ -73,112 +76,120 @@ pages = [
     "Results",
     "Faculty & Classes",
     "Rooms Utilization",
-    "All Tables"
+    "Bulk Import",
+    "All Tables",
+    "Performance"
 ]
 
 st.sidebar.header("📂 Modules")
 page = st.sidebar.radio("Go to:", pages)
+db.set_page(page)
+db.set_session(st.session_state.setdefault("erp_session_id", uuid.uuid4().hex))
 
+if db.METRICS_PORT:
+    try:
+        db.start_metrics_server(db.METRICS_PORT)
+    except OSError as e:
+        logger.warning("metrics server not started on port %s: %s", db.METRICS_PORT, e)
 
-# ================== 1. DASHBOARD ==================
-if page == "Dashboard":
-    st.subheader("📊 Overall Analytics Dashboard")
+if db.REFRESH_ENABLED:
+    # Pre-warms the first screen of every page and keeps it fresh in the background.
+    db.start_cache_refresher()
 
-    col1, col2, col3, col4 = st.columns(4)
+with st.sidebar.expander("🧠 Query cache"):
+    st.json({**db.get_table_cache().metrics(), **db.refresher_metrics()})
 
-    # KPIs
-    try:
-        total_students = run_query("SELECT COUNT(*) AS c FROM student;")[0]["c"]
-    except:
-        total_students = 0
+with st.sidebar.expander("📝 Write queue"):
+    st.json(db.write_queue_metrics() or {"status": "no queued writes yet"})
 
+with st.sidebar.expander("🔌 Connection pool"):
     try:
-        total_courses = run_query("SELECT COUNT(*) AS c FROM course WHERE STATUS='Active';")[0]["c"]
-    except:
-        total_courses = 0
+        st.json(db.get_pool().metrics())
+    except Exception as e:
+        st.error(f"Connection pool unavailable: {e}")
 
-    try:
-        total_leads = run_query("SELECT COUNT(*) AS c FROM lead;")[0]["c"]
-    except:
-        total_leads = 0
+if db.DB_REPLICAS:
+    with st.sidebar.expander("🪞 Read replicas"):
+        st.caption(f"Used by: {', '.join(db.REPLICA_PAGES)}")
+        st.json(db.replica_metrics())
 
-    try:
-        total_fee_paid = run_query("SELECT IFNULL(SUM(AMOUNT_PAID),0) AS s FROM fee_payment;")[0]["s"]
-    except:
-        total_fee_paid = 0
-
-    with col1:
-        st.metric("Total Students", total_students)
-    with col2:
-        st.metric("Active Courses", total_courses)
-    with col3:
-        st.metric("Total Leads", total_leads)
-    with col4:
-        st.metric("Total Fees Collected", f"₹ {total_fee_paid:,.0f}")
+
+# ================== 1. DASHBOARD ==================
+if page == "Dashboard":
+    st.subheader("📊 Overall Analytics Dashboard")
+
+    col1, col2, col3, col4 = st.columns(4)
+    kpi_students, kpi_courses, kpi_leads, kpi_fees = (c.empty() for c in (col1, col2, col3, col4))
 
     st.write("---")
 
     # Course-wise student count USING student.COURSE_NAME
     col_a, col_b = st.columns(2)
-
     with col_a:
         st.markdown("#### 👥 Course-wise Student Count")
-        try:
-            rows = run_query("""
-                SELECT 
-                    s.COURSE_NAME,
-                    COUNT(s.STUDENT_ID) AS student_count
-                FROM student s
-                GROUP BY s.COURSE_NAME
-                ORDER BY student_count DESC;
-            """)
-            if rows:
-                df = pd.DataFrame(rows)
-                df = df.set_index("COURSE_NAME")
-                st.bar_chart(df["student_count"])
-            else:
-                st.info("No student/course data found.")
-        except Exception as e:
-            st.error(f"Error loading course-wise count: {e}")
+        course_slot = st.empty()
 
     # Monthly fee collection
     with col_b:
         st.markdown("#### 💰 Monthly Fee Collection")
-        try:
-            rows = run_query("""
-                SELECT DATE_FORMAT(PAYMENT_DATE, '%Y-%m') AS ym,
-                       SUM(AMOUNT_PAID) AS total_paid
-                FROM fee_payment
-                GROUP BY ym
-                ORDER BY ym;
-            """)
-            if rows:
-                df = pd.DataFrame(rows)
-                df = df.set_index("ym")
-                st.line_chart(df["total_paid"])
-            else:
-                st.info("No fee payment data found.")
-        except Exception as e:
-            st.error(f"Error loading fee data: {e}")
+        fee_slot = st.empty()
 
     st.write("---")
 
     # Lead status distribution
     st.markdown("#### 📞 Lead Status Distribution")
-    try:
-        rows = run_query("""
-            SELECT STATUS, COUNT(*) AS count
-            FROM lead
-            GROUP BY STATUS;
-        """)
-        if rows:
-            df = pd.DataFrame(rows)
-            df = df.set_index("STATUS")
-            st.bar_chart(df["count"])
-        else:
-            st.info("No lead data found.")
-    except Exception as e:
-        st.error(f"Error loading lead status data: {e}")
+    lead_slot = st.empty()
+
+    for slot in (course_slot, fee_slot, lead_slot):
+        slot.caption("Loading…")
+
+    # The widgets are independent, so their queries run in parallel and each
+    # one is drawn as soon as its own data arrives.
+    for name, result, error in db.run_parallel({
+        "course_headcount": (db.load_summary, ("course_headcount",)),
+        "fee_monthly": (db.load_summary, ("fee_monthly",)),
+        "lead_status": (db.load_summary, ("lead_status",)),
+        "active_courses": (db.count_table_rows, ("course", "", (("STATUS", "equals", "Active"),))),
+    }):
+        if name == "course_headcount":
+            if error is not None:
+                course_slot.error(f"Error loading course-wise count: {error}")
+                kpi_students.metric("Total Students", 0)
+            elif result.empty:
+                course_slot.info("No student/course data found.")
+                kpi_students.metric("Total Students", 0)
+            else:
+                course_slot.bar_chart(result.set_index("COURSE_NAME")["student_count"])
+                kpi_students.metric("Total Students", int(result["student_count"].sum()))
+
+        elif name == "fee_monthly":
+            if error is not None:
+                fee_slot.error(f"Error loading fee data: {error}")
+                kpi_fees.metric("Total Fees Collected", "₹ 0")
+            elif result.empty:
+                fee_slot.info("No fee payment data found.")
+                kpi_fees.metric("Total Fees Collected", "₹ 0")
+            else:
+                fee_slot.line_chart(result.set_index("ym")["total_paid"])
+                kpi_fees.metric("Total Fees Collected", f"₹ {float(result['total_paid'].sum()):,.0f}")
+
+        elif name == "lead_status":
+            if error is not None:
+                lead_slot.error(f"Error loading lead status data: {error}")
+                kpi_leads.metric("Total Leads", 0)
+            elif result.empty:
+                lead_slot.info("No lead data found.")
+                kpi_leads.metric("Total Leads", 0)
+            else:
+                lead_slot.bar_chart(result.set_index("STATUS")["count"])
+                kpi_leads.metric("Total Leads", int(result["count"].sum()))
+
+        elif name == "active_courses":
+            if error is not None:
+                logger.warning("active course count unavailable: %s", error)
+                kpi_courses.metric("Active Courses", 0)
+            else:
+                kpi_courses.metric("Active Courses", result[0])
 
 
 # ================== 2. STUDENTS ==================
@@ -186,36 +197,28 @@ elif page == "Students":
     st.subheader("🎓 Student Management")
 
     try:
-        df = get_table_df("student")
+        student_cols = db.get_table_columns("student")
     except Exception as e:
         st.error(f"Error loading student table: {e}")
-        df = pd.DataFrame()
-
-    if not df.empty:
-        # Filter by COURSE_NAME
-        if "COURSE_NAME" in df.columns:
-            unique_courses = sorted(df["COURSE_NAME"].dropna().unique())
-            course_filter = st.selectbox(
-                "Filter by COURSE_NAME (optional):",
-                options=["All"] + list(unique_courses),
-                index=0
-            )
-            if course_filter != "All":
-                df = df[df["COURSE_NAME"] == course_filter]
-
-        # Status filter
-        if "STATUS" in df.columns:
-            status_values = sorted(df["STATUS"].dropna().unique())
-            status_filter = st.selectbox(
-                "Filter by STATUS:",
-                options=["All"] + list(status_values),
-                index=0
-            )
-            if status_filter != "All":
-                df = df[df["STATUS"] == status_filter]
+        student_cols = []
 
-        st.caption(f"Showing {len(df)} students")
-        st.dataframe(df, use_container_width=True)
+    if student_cols:
+        filters = []
+        try:
+            find = st.text_input("🔍 Find a student (name, mobile, e-mail — prefix and typos OK):", "")
+
+            # Filter by COURSE_NAME
+            if "COURSE_NAME" in student_cols:
+                filter_selectbox("Filter by COURSE_NAME (optional):", "student", "COURSE_NAME", filters)
+
+            # Status filter
+            if "STATUS" in student_cols:
+                filter_selectbox("Filter by STATUS:", "student", "STATUS", filters)
+
+            df = load_filtered("student", filters, "students", find)
+            st.dataframe(df, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading students: {e}")
 
         st.write("---")
 
@@ -244,18 +247,13 @@ elif page == "Students":
                         st.error("Name and COURSE_NAME are required.")
                     else:
                         try:
-                            run_execute("""
-                                INSERT INTO student
-                                (NAME, GENDER, DOB, MOBILE, EMAIL_ID, ADDRESS, CITY, STATE, PINCODE,
-                                 PARENT_NAME, PARENT_MOBILE, COURSE_NAME, JOIN_DATE, STATUS)
-                                VALUES
-                                (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);
-                            """, (
+                            values = dict(zip(db.STUDENT_FIELDS, (
                                 name, gender, dob, mobile, email, address, city, state, pincode,
                                 parent_name, parent_mobile, course_name, join_date, status
-                            ))
+                            )))
+                            db.add_student(values, submit_key("add_student", values))
+                            submit_done("add_student")
                             st.success("Student added successfully.")
-                            st.cache_data.clear()
                         except Exception as e:
                             st.error(f"Error inserting student: {e}")
 
@@ -266,12 +264,9 @@ elif page == "Students":
             if st.button("Update Status"):
                 if sid and new_status:
                     try:
-                        run_execute(
-                            "UPDATE student SET STATUS = %s WHERE STUDENT_ID = %s;",
-                            (new_status, sid)
-                        )
+                        db.update_student_status(sid, new_status, submit_key("student_status", sid, new_status))
+                        submit_done("student_status")
                         st.success(f"Student {sid} status updated.")
-                        st.cache_data.clear()
                     except Exception as e:
                         st.error(f"Error updating status: {e}")
                 else:
@@ -283,9 +278,12 @@ elif page == "Students":
             if st.button("Delete Student"):
                 if del_id:
                     try:
-                        run_execute("DELETE FROM student WHERE STUDENT_ID = %s;", (del_id,))
-                        st.success(f"Student {del_id} deleted (if existed).")
-                        st.cache_data.clear()
+                        deleted = db.delete_student(del_id, submit_key("delete_student", del_id))
+                        submit_done("delete_student")
+                        if deleted:
+                            st.success(f"Student {del_id} deleted.")
+                        else:
+                            st.info(f"No student with STUDENT_ID {del_id}.")
                     except Exception as e:
                         st.error(f"Error deleting student: {e}")
                 else:
@@ -295,15 +293,9 @@ elif page == "Students":
         st.write("---")
         st.markdown("#### 📊 Course-wise Student Count")
         try:
-            rows = run_query("""
-                SELECT COURSE_NAME, COUNT(*) AS student_count
-                FROM student
-                GROUP BY COURSE_NAME
-                ORDER BY student_count DESC;
-            """)
-            if rows:
-                dfc = pd.DataFrame(rows).set_index("COURSE_NAME")
-                st.bar_chart(dfc["student_count"])
+            dfc = db.load_summary("course_headcount")
+            if not dfc.empty:
+                st.bar_chart(dfc.set_index("COURSE_NAME")["student_count"])
             else:
                 st.info("No students found for chart.")
         except Exception as e:
@@ -317,25 +309,22 @@ elif page == "Courses":
     st.subheader("📚 Course Management")
 
     try:
-        df = get_table_df("course")
+        course_cols = db.get_table_columns("course")
     except Exception as e:
         st.error(f"Error loading course table: {e}")
-        df = pd.DataFrame()
-
-    if not df.empty:
-        # Status filter
-        if "STATUS" in df.columns:
-            st_vals = sorted(df["STATUS"].dropna().unique())
-            st_filter = st.selectbox(
-                "Filter by STATUS:",
-                options=["All"] + list(st_vals),
-                index=0
-            )
-            if st_filter != "All":
-                df = df[df["STATUS"] == st_filter]
+        course_cols = []
 
-        st.caption(f"Showing {len(df)} courses")
-        st.dataframe(df, use_container_width=True)
+    if course_cols:
+        filters = []
+        try:
+            # Status filter
+            if "STATUS" in course_cols:
+                filter_selectbox("Filter by STATUS:", "course", "STATUS", filters)
+
+            df = load_filtered("course", filters, "courses")
+            st.dataframe(df, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading courses: {e}")
 
         st.write("---")
 
@@ -356,13 +345,10 @@ elif page == "Courses":
                         st.error("COURSE_NAME is required.")
                     else:
                         try:
-                            run_execute("""
-                                INSERT INTO course
-                                (COURSE_NAME, CATEGORY, DURATION_MONTHS, FEES, LEVEL, STATUS)
-                                VALUES (%s,%s,%s,%s,%s,%s);
-                            """, (cname, category, duration, fees, level, status))
+                            values = dict(zip(db.COURSE_FIELDS, (cname, category, duration, fees, level, status)))
+                            db.add_course(values, submit_key("add_course", values))
+                            submit_done("add_course")
                             st.success("Course added successfully.")
-                            st.cache_data.clear()
                         except Exception as e:
                             st.error(f"Error inserting course: {e}")
 
@@ -373,12 +359,9 @@ elif page == "Courses":
             if st.button("Update Course Status"):
                 if cid and new_status:
                     try:
-                        run_execute(
-                            "UPDATE course SET STATUS = %s WHERE COURSE_ID = %s;",
-                            (new_status, cid)
-                        )
+                        db.update_course_status(cid, new_status, submit_key("course_status", cid, new_status))
+                        submit_done("course_status")
                         st.success(f"Course {cid} status updated.")
-                        st.cache_data.clear()
                     except Exception as e:
                         st.error(f"Error updating course: {e}")
                 else:
@@ -388,17 +371,9 @@ elif page == "Courses":
         st.write("---")
         st.markdown("#### 💰 Fee Collection by Course")
         try:
-            rows = run_query("""
-                SELECT 
-                    c.COURSE_NAME,
-                    SUM(c.FEES) AS total_course_fees, 
-                    IFNULL(SUM(fp.AMOUNT_PAID),0) AS total_paid
-                FROM course c
-                LEFT JOIN fee_payment fp ON fp.COURSE_ID = c.COURSE_ID
-                GROUP BY c.COURSE_NAME;
-            """)
-            if rows:
-                df_fee = pd.DataFrame(rows).set_index("COURSE_NAME")
+            df_fee = db.get_course_fee_summary()
+            if not df_fee.empty:
+                df_fee = df_fee.set_index("COURSE_NAME")
                 st.bar_chart(df_fee[["total_course_fees", "total_paid"]])
             else:
                 st.info("No fee data available for courses.")
@@ -414,45 +389,50 @@ elif page == "Attendance":
     st.subheader("📅 Attendance Analytics")
 
     try:
-        df = get_table_df("attendance")
+        att_cols = db.get_table_columns("attendance")
+        min_date, max_date = db.get_attendance_bounds()
     except Exception as e:
         st.error(f"Error loading attendance table: {e}")
-        df = pd.DataFrame()
+        att_cols, min_date, max_date = [], None, None
+
+    if att_cols and min_date is not None:
+        filters = []
+        sid = None
 
-    if not df.empty:
         # Filter by STUDENT_ID
-        if "STUDENT_ID" in df.columns:
-            sid_values = sorted(df["STUDENT_ID"].dropna().unique())
-            sid = st.selectbox(
-                "Filter by STUDENT_ID (optional):",
-                options=["All"] + list(sid_values),
-                index=0
-            )
-            if sid != "All":
-                df = df[df["STUDENT_ID"] == sid]
-
-        # Date range filter
-        if "ATTENDANCE_DATE" in df.columns:
-            df["ATTENDANCE_DATE"] = pd.to_datetime(df["ATTENDANCE_DATE"])
-            min_date, max_date = df["ATTENDANCE_DATE"].min(), df["ATTENDANCE_DATE"].max()
-            date_range = st.date_input("Date range:", [min_date, max_date])
-            if len(date_range) == 2:
-                start, end = date_range
-                df = df[(df["ATTENDANCE_DATE"] >= pd.to_datetime(start)) &
-                        (df["ATTENDANCE_DATE"] <= pd.to_datetime(end))]
-
-        st.caption(f"Showing {len(df)} attendance rows")
-        st.dataframe(df, use_container_width=True)
+        if "STUDENT_ID" in att_cols:
+            sid_choice = st.number_input("Filter by STUDENT_ID (0 = all):", min_value=0, step=1)
+            if sid_choice and not db.student_exists(sid_choice):
+                st.warning(f"No student with STUDENT_ID {int(sid_choice)}; showing all students.")
+            elif sid_choice:
+                sid = int(sid_choice)
+                filters.append(("STUDENT_ID", "equals", sid))
+
+        # Date range filter (sent to MySQL as an indexed range predicate)
+        date_range = st.date_input("Date range:", [min_date, max_date])
+        if len(date_range) == 2:
+            start, end = date_range
+        else:
+            start, end = min_date, max_date
+        filters += [("ATTENDANCE_DATE", ">=", start), ("ATTENDANCE_DATE", "<=", end)]
+
+        try:
+            df = load_filtered("attendance", filters, "attendance rows")
+            st.dataframe(df, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading attendance rows: {e}")
 
         # Present trend chart
-        if "ATTENDANCE_DATE" in df.columns and "STATUS" in df.columns:
+        if "STATUS" in att_cols:
             st.markdown("#### 📈 Daily Present Count")
+            use_rollup = st.checkbox(
+                "Use daily rollup table (fast for long ranges; ignored with a student filter)",
+                value=True
+            )
             try:
-                pres = df[df["STATUS"] == "Present"]
-                if not pres.empty:
-                    daily = pres.groupby("ATTENDANCE_DATE").size().reset_index(name="present_count")
-                    daily = daily.set_index("ATTENDANCE_DATE")
-                    st.line_chart(daily["present_count"])
+                daily = db.get_daily_present(start, end, sid, use_rollup)
+                if not daily.empty:
+                    st.line_chart(daily.set_index("ATTENDANCE_DATE")["present_count"])
                 else:
                     st.info("No 'Present' records to show trend.")
             except Exception as e:
@@ -460,76 +440,164 @@ elif page == "Attendance":
     else:
         st.info("Attendance table is empty or not accessible.")
 
+    # 📝 Bulk marking: one grid per batch, saved in a single transaction
+    st.write("---")
+    with st.expander("📝 Mark Attendance (bulk, by batch)"):
+        try:
+            batches = db.get_distinct_values("student", "COURSE_NAME")
+        except Exception as e:
+            st.error(f"Error loading batches: {e}")
+            batches = []
+
+        if batches:
+            bcol1, bcol2 = st.columns(2)
+            with bcol1:
+                batch = st.selectbox("Batch (COURSE_NAME):", batches)
+            with bcol2:
+                mark_date = st.date_input("Attendance date:", value=date.today(), key="mark_date")
+
+            try:
+                roster = db.get_table_page(
+                    "student", "", (("COURSE_NAME", "equals", batch), ("STATUS", "equals", "Active")),
+                    order_by="STUDENT_ID", limit=db.PAGE_ROWS
+                )
+            except Exception as e:
+                st.error(f"Error loading batch students: {e}")
+                roster = pd.DataFrame()
+
+            if roster.empty:
+                st.info("No active students in this batch.")
+            else:
+                grid = roster[["STUDENT_ID", "NAME"]].assign(STATUS=db.ATTENDANCE_STATUSES[0])
+                grid = st.data_editor(
+                    grid,
+                    column_config={
+                        "STATUS": st.column_config.SelectboxColumn(
+                            "STATUS", options=db.ATTENDANCE_STATUSES, required=True
+                        )
+                    },
+                    disabled=["STUDENT_ID", "NAME"],
+                    hide_index=True,
+                    use_container_width=True,
+                    key=f"att_grid_{batch}_{mark_date}"
+                )
+                st.caption(f"{len(grid)} students · {int((grid['STATUS'] == 'Present').sum())} present")
+
+                if st.button("💾 Save Attendance"):
+                    try:
+                        res = db.mark_attendance(mark_date, grid["STUDENT_ID"].tolist(), grid["STATUS"].tolist())
+                        rate = res["written"] / res["seconds"] if res["seconds"] else 0
+                        st.success(
+                            f"Saved {res['written']} attendance rows in {res['seconds'] * 1000:.0f} ms "
+                            f"({rate:,.0f} rows/sec, one transaction)."
+                        )
+                        for row_index, err in res["errors"]:
+                            st.error(f"STUDENT_ID {grid['STUDENT_ID'].iloc[row_index]}: {err}")
+                    except Exception as e:
+                        st.error(f"Error saving attendance: {e}")
+
 
 # ================== 5. FEES ==================
 elif page == "Fees":
     st.subheader("💰 Fee Management Dashboard")
 
-    # Join via fee_payment → course → student
+    # Balances come from the fee_ledger table (kept in step with every payment)
+    pending_only = st.checkbox("Show only students with pending balance > 0", value=False)
     try:
-        rows = run_query("""
-            SELECT 
-                s.STUDENT_ID,
-                s.NAME,
-                c.COURSE_NAME,
-                c.FEES AS total_fees,
-                IFNULL(SUM(fp.AMOUNT_PAID),0) AS total_paid,
-                (c.FEES - IFNULL(SUM(fp.AMOUNT_PAID),0)) AS balance
-            FROM fee_payment fp
-            JOIN student s ON fp.STUDENT_ID = s.STUDENT_ID
-            JOIN course c   ON fp.COURSE_ID = c.COURSE_ID
-            GROUP BY s.STUDENT_ID, s.NAME, c.COURSE_NAME, c.FEES
-            ORDER BY s.STUDENT_ID;
-        """)
-        df = pd.DataFrame(rows)
+        total = db.count_fee_ledger(pending_only)
     except Exception as e:
-        st.error(f"Error loading fee summary: {e}")
-        df = pd.DataFrame()
-
-    if not df.empty:
-        st.caption(f"Total students in fee summary: {len(df)}")
+        st.error(f"Error loading fee ledger (is migration 006 applied?): {e}")
+        total = 0
 
-        pending_only = st.checkbox("Show only students with pending balance > 0", value=False)
-        if pending_only:
-            df = df[df["balance"] > 0]
-
-        st.dataframe(df, use_container_width=True)
+    if total:
+        n_pages = max(1, -(-total // db.PAGE_ROWS))
+        page_no = st.number_input("Page:", min_value=1, max_value=n_pages, value=1, step=1)
+        st.caption(f"Students in fee summary: {total:,} · page {int(page_no)} of {n_pages}")
+        try:
+            df = db.get_fee_ledger_page(pending_only, db.PAGE_ROWS, (int(page_no) - 1) * db.PAGE_ROWS)
+            st.dataframe(df, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading fee summary: {e}")
 
         # Course-wise fee chart
         st.markdown("#### 📊 Course-wise Fee Collection")
         try:
-            course_fee = df.groupby("COURSE_NAME")[["total_fees", "total_paid"]].sum()
-            st.bar_chart(course_fee)
+            course_fee = db.get_fee_by_course()
+            st.bar_chart(course_fee.set_index("COURSE_NAME")[["total_fees", "total_paid"]])
         except Exception as e:
             st.error(f"Error plotting course fee chart: {e}")
     else:
         st.info("No fee summary available.")
 
+    st.write("---")
+
+    # ➕ Record a payment (payment + ledger in one transaction)
+    with st.expander("➕ Record Fee Payment"):
+        with st.form("add_payment_form"):
+            pay_sid = st.number_input("STUDENT_ID *", min_value=1, step=1)
+            pay_cid = st.number_input("COURSE_ID *", min_value=1, step=1)
+            amount = st.number_input("AMOUNT_PAID *", min_value=0.0, step=500.0)
+            pay_date = st.date_input("PAYMENT_DATE", value=date.today())
+            pay_mode = st.selectbox("PAYMENT_MODE", ["UPI", "Cash", "Online"])
+
+            if st.form_submit_button("Record Payment"):
+                if amount <= 0:
+                    st.error("AMOUNT_PAID must be greater than 0.")
+                else:
+                    values = {
+                        "STUDENT_ID": int(pay_sid),
+                        "COURSE_ID": int(pay_cid),
+                        "AMOUNT_PAID": amount,
+                        "PAYMENT_DATE": pay_date,
+                    }
+                    try:
+                        if "PAYMENT_MODE" in db.get_table_columns("fee_payment"):
+                            values["PAYMENT_MODE"] = pay_mode
+                        db.record_payment(values, submit_key("payment", values))
+                        submit_done("payment")
+                        st.success(f"Payment of ₹ {amount:,.0f} recorded for student {int(pay_sid)}.")
+                    except Exception as e:
+                        st.error(f"Error recording payment: {e}")
+
+    # 🧾 Ledger verification
+    with st.expander("🧾 Verify Fee Ledger"):
+        st.caption("Re-aggregates fee_payment and compares it with fee_ledger (full scan — run off-peak).")
+        fix = st.checkbox("Rebuild drifted ledger rows", value=False)
+        if st.button("Run Verification"):
+            try:
+                drift = db.verify_fee_ledger(fix=fix)
+                if drift.empty:
+                    st.success("Ledger matches fee_payment.")
+                else:
+                    st.warning(f"{len(drift)} ledger rows differ{' (rebuilt)' if fix else ''}:")
+                    st.dataframe(drift, use_container_width=True)
+            except Exception as e:
+                st.error(f"Error verifying ledger: {e}")
+
 
 # ================== 6. LEADS ==================
 elif page == "Leads":
     st.subheader("📞 Lead Management & Analytics")
 
     try:
-        df = get_table_df("lead")
+        lead_cols = db.get_table_columns("lead")
     except Exception as e:
         st.error(f"Error loading lead table: {e}")
-        df = pd.DataFrame()
-
-    if not df.empty:
-        # Status filter
-        if "STATUS" in df.columns:
-            st_values = sorted(df["STATUS"].dropna().unique())
-            st_filter = st.selectbox(
-                "Filter by STATUS:",
-                options=["All"] + list(st_values),
-                index=0
-            )
-            if st_filter != "All":
-                df = df[df["STATUS"] == st_filter]
+        lead_cols = []
 
-        st.caption(f"Showing {len(df)} leads")
-        st.dataframe(df, use_container_width=True)
+    if lead_cols:
+        filters = []
+        try:
+            find = st.text_input("🔍 Find a lead (name, mobile, e-mail — prefix and typos OK):", "")
+
+            # Status filter
+            if "STATUS" in lead_cols:
+                filter_selectbox("Filter by STATUS:", "lead", "STATUS", filters)
+
+            df = load_filtered("lead", filters, "leads", find)
+            st.dataframe(df, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading leads: {e}")
 
         # Update status UI
         st.write("---")
@@ -545,12 +613,9 @@ elif page == "Leads":
         if st.button("Update Lead"):
             if lead_id:
                 try:
-                    run_execute(
-                        "UPDATE lead SET STATUS = %s WHERE LEAD_ID = %s;",
-                        (new_status, lead_id)
-                    )
+                    db.update_lead_status(lead_id, new_status, submit_key("lead_status", lead_id, new_status))
+                    submit_done("lead_status")
                     st.success(f"Lead {lead_id} status updated to {new_status}.")
-                    st.cache_data.clear()
                 except Exception as e:
                     st.error(f"Error updating lead: {e}")
             else:
@@ -560,18 +625,65 @@ elif page == "Leads":
         st.write("---")
         st.markdown("#### 📊 Lead Status Distribution")
         try:
-            rows = run_query("""
-                SELECT STATUS, COUNT(*) AS count
-                FROM lead
-                GROUP BY STATUS;
-            """)
-            if rows:
-                dfl = pd.DataFrame(rows).set_index("STATUS")
-                st.bar_chart(dfl["count"])
+            dfl = db.load_summary("lead_status")
+            if not dfl.empty:
+                st.bar_chart(dfl.set_index("STATUS")["count"])
             else:
                 st.info("No lead status data.")
         except Exception as e:
             st.error(f"Error loading lead status chart: {e}")
+
+        # Conversion funnel, read from the counters kept by db.update_lead_status
+        st.write("---")
+        st.markdown("#### 🔻 Conversion Funnel")
+        try:
+            if not db.funnel_ready():
+                st.info("Apply migrations/009_lead_funnel.sql and run `python jobs.py sync-lead-funnel` "
+                        "to track conversions.")
+            else:
+                overall = db.get_lead_funnel()
+                if overall.empty:
+                    st.info("No leads counted yet.")
+                else:
+                    totals = overall.iloc[0]
+                    mcols = st.columns(len(overall.columns))
+                    for col, (name, value) in zip(mcols, totals.items()):
+                        col.metric(name, f"{value:.1f}%" if name == "CONVERSION_PCT" else f"{int(value):,}")
+                    st.bar_chart(totals.drop("CONVERSION_PCT"))
+
+                    with st.expander("Conversion by source and by cohort"):
+                        st.markdown("**By source**")
+                        st.dataframe(db.get_lead_funnel("SOURCE"), use_container_width=True)
+                        st.markdown("**By cohort (month created)**")
+                        by_cohort = db.get_lead_funnel("COHORT")
+                        st.line_chart(by_cohort["CONVERSION_PCT"])
+                        st.dataframe(by_cohort, use_container_width=True)
+
+                    with st.expander("Status changes per month"):
+                        periods = db.get_lead_periods()
+                        if periods.empty:
+                            st.info("No status changes recorded yet.")
+                        else:
+                            st.bar_chart(periods.drop(columns="CONVERSION_PCT", errors="ignore"))
+                            st.dataframe(periods, use_container_width=True)
+
+                    with st.expander("Time spent in each status"):
+                        stage_times = db.get_stage_times()
+                        if stage_times.empty:
+                            st.info("No lead has left a tracked status yet.")
+                        else:
+                            st.dataframe(stage_times, use_container_width=True)
+
+                    with st.expander("🕒 Lead history"):
+                        history_id = st.text_input("LEAD_ID:", key="lead_history_id").strip()
+                        if history_id:
+                            history = db.get_lead_history(history_id)
+                            if history.empty:
+                                st.info("No status changes recorded for this lead.")
+                            else:
+                                st.dataframe(history, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading lead funnel: {e}")
     else:
         st.info("Lead table is empty or not accessible.")
 
@@ -580,91 +692,142 @@ elif page == "Leads":
 elif page == "Results":
     st.subheader("📑 Result & Performance Analytics")
 
-    # Try to show joined result with student + test + course
-    df = pd.DataFrame()
-    joined_ok = False
+    # Filters are applied inside the SQL join; only one page of rows is loaded.
+    try:
+        courses = db.get_distinct_values("course", "COURSE_NAME")
+    except Exception as e:
+        st.error(f"Error loading courses: {e}")
+        courses = []
+    fcol1, fcol2 = st.columns(2)
+    with fcol1:
+        c_filter = st.selectbox("Filter by COURSE_NAME:", options=["All"] + courses, index=0)
+    with fcol2:
+        sid_filter = st.text_input("Filter by STUDENT_ID:", "").strip()
+    course_name = None if c_filter == "All" else c_filter
+    student_id = sid_filter or None
 
     try:
-        rows = run_query("""
-            SELECT 
-                r.RESULT_ID,
-                r.STUDENT_ID,
-                s.NAME AS STUDENT_NAME,
-                r.TEST_ID,
-                t.TEST_NAME,
-                t.COURSE_ID,
-                c.COURSE_NAME,
-                r.MARKS_OBTAINED,
-                r.GRADE,
-                r.REMARKS
-            FROM result r
-            JOIN student s ON r.STUDENT_ID = s.STUDENT_ID
-            JOIN test t    ON r.TEST_ID = t.TEST_ID
-            JOIN course c  ON t.COURSE_ID = c.COURSE_ID;
-        """)
-        df = pd.DataFrame(rows)
-        joined_ok = True
+        total = db.count_results(course_name, student_id)
+        df = db.get_results(course_name, student_id)
+        st.caption(f"Showing {len(df)} of {total:,} result rows (newest first)")
+        st.dataframe(df, use_container_width=True)
     except Exception as e:
         st.warning(f"Joined result view not available, showing raw result table. Details: {e}")
         try:
-            df = get_table_df("result")
+            st.dataframe(db.get_table_page("result", limit=db.PAGE_ROWS), use_container_width=True)
         except Exception as e2:
             st.error(f"Error loading result table: {e2}")
-            df = pd.DataFrame()
-
-    if not df.empty:
-        # Filters: course / student
-        if "COURSE_NAME" in df.columns:
-            courses = sorted(df["COURSE_NAME"].dropna().unique())
-            c_filter = st.selectbox(
-                "Filter by COURSE_NAME:",
-                options=["All"] + list(courses),
-                index=0
-            )
-            if c_filter != "All":
-                df = df[df["COURSE_NAME"] == c_filter]
-
-        if "STUDENT_ID" in df.columns:
-            sids = sorted(df["STUDENT_ID"].dropna().unique())
-            sid_filter = st.selectbox(
-                "Filter by STUDENT_ID:",
-                options=["All"] + list(sids),
-                index=0
-            )
-            if sid_filter != "All":
-                df = df[df["STUDENT_ID"] == sid_filter]
 
-        st.caption(f"Showing {len(df)} result rows")
-        st.dataframe(df, use_container_width=True)
+    # Charts read the per-course / per-test statistics tables (migrations/008)
+    st.write("---")
+    col_r1, col_r2 = st.columns(2)
 
-        # Charts (if marks available)
-        if "MARKS_OBTAINED" in df.columns:
-            st.write("---")
-            col_r1, col_r2 = st.columns(2)
+    with col_r1:
+        st.markdown("#### 📊 Average Marks by Course")
+        try:
+            course_stats = db.load_course_stats()
+            if not course_stats.empty:
+                st.bar_chart(course_stats.set_index("COURSE_NAME")["MEAN_MARKS"])
+            else:
+                st.info("No marks recorded yet.")
+        except Exception as e:
+            st.error(f"Error plotting course-wise avg marks: {e}")
 
-            with col_r1:
-                st.markdown("#### 📊 Average Marks by Course")
-                if "COURSE_NAME" in df.columns:
-                    try:
-                        m1 = df.groupby("COURSE_NAME")["MARKS_OBTAINED"].mean()
-                        st.bar_chart(m1)
-                    except Exception as e:
-                        st.error(f"Error plotting course-wise avg marks: {e}")
-                else:
-                    st.info("COURSE_NAME not available for chart.")
+    with col_r2:
+        st.markdown("#### 📊 Average Marks by Test")
+        try:
+            test_stats = db.load_test_stats(course_name)
+            if not test_stats.empty:
+                st.bar_chart(test_stats.set_index("TEST_NAME")["MEAN_MARKS"])
+            else:
+                st.info("No marks recorded for these tests.")
+        except Exception as e:
+            test_stats = pd.DataFrame()
+            st.error(f"Error plotting test-wise avg marks: {e}")
+
+    with st.expander("📈 Test statistics (mean, median, percentiles, grades)"):
+        if not test_stats.empty:
+            st.dataframe(test_stats, use_container_width=True)
+        try:
+            grades = db.load_grade_counts(course_name)
+            if not grades.empty:
+                st.dataframe(
+                    grades.pivot_table(index="TEST_NAME", columns="GRADE", values="RESULT_COUNT", fill_value=0),
+                    use_container_width=True
+                )
+        except Exception as e:
+            st.error(f"Error loading grade distribution: {e}")
+
+    # Student-wise performance tracking
+    st.write("---")
+    st.markdown("#### 🎯 Student-wise Performance")
+    if student_id:
+        try:
+            perf = db.get_student_performance(student_id)
+            if perf.empty:
+                st.info(f"No results for STUDENT_ID {student_id}.")
+            else:
+                st.dataframe(perf, use_container_width=True)
+                st.line_chart(perf.set_index("TEST_NAME")["PERCENTILE"])
+        except Exception as e:
+            st.error(f"Error loading student performance: {e}")
+    elif course_name:
+        try:
+            standings = db.get_course_standings(course_name)
+            if standings.empty:
+                st.info("No results for this course yet.")
+            else:
+                st.caption("Ranked on average percentile across the course's tests.")
+                st.dataframe(standings.head(db.PAGE_ROWS), use_container_width=True)
+        except Exception as e:
+            st.error(f"Error loading course standings: {e}")
+    else:
+        st.info("Enter a STUDENT_ID for their rank and percentile in each test, or pick a course for its standings.")
+
+    # 📝 Marks entry: one grid per test, saved in a single transaction
+    st.write("---")
+    with st.expander("📝 Enter Marks (by test)"):
+        try:
+            tests = db.get_tests(course_name)
+        except Exception as e:
+            st.error(f"Error loading tests: {e}")
+            tests = pd.DataFrame()
+
+        if tests.empty:
+            st.info("No tests found.")
+        else:
+            labels = {
+                int(row.TEST_ID): f"{row.TEST_NAME} · {row.COURSE_NAME} (#{row.TEST_ID})"
+                for row in tests.itertuples(index=False)
+            }
+            test_id = st.selectbox("Test:", list(labels), format_func=labels.get)
+            try:
+                sheet = db.get_marks_sheet(test_id)
+            except Exception as e:
+                st.error(f"Error loading students for this test: {e}")
+                sheet = pd.DataFrame()
 
-            with col_r2:
-                st.markdown("#### 📊 Average Marks by Test")
-                if "TEST_NAME" in df.columns:
+            if sheet.empty:
+                st.info("No active students in this test's course.")
+            else:
+                sheet = st.data_editor(
+                    sheet,
+                    disabled=["STUDENT_ID", "NAME"],
+                    hide_index=True,
+                    use_container_width=True,
+                    key=f"marks_grid_{test_id}"
+                )
+                entered = sheet[sheet["MARKS_OBTAINED"].notna()]
+                st.caption(f"{len(entered)} of {len(sheet)} students have marks")
+
+                if st.button("💾 Save Marks"):
                     try:
-                        m2 = df.groupby("TEST_NAME")["MARKS_OBTAINED"].mean()
-                        st.bar_chart(m2)
+                        res = db.record_marks(test_id, entered)
+                        st.success(f"Saved {res['written']} results in {res['seconds'] * 1000:.0f} ms; statistics updated.")
+                        for row_index, err in res["errors"]:
+                            st.error(f"STUDENT_ID {entered['STUDENT_ID'].iloc[row_index]}: {err}")
                     except Exception as e:
-                        st.error(f"Error plotting test-wise avg marks: {e}")
-                else:
-                    st.info("TEST_NAME not available for chart.")
-    else:
-        st.info("Result data is empty or not accessible.")
+                        st.error(f"Error saving marks: {e}")
 
 
 # ================== 8. FACULTY & CLASSES ==================
@@ -673,24 +836,29 @@ elif page == "Faculty & Classes":
 
     # Faculty table
     try:
-        df_fac = get_table_df("faculty")
+        df_fac = db.get_table_df("faculty")
         st.markdown("### Faculty List")
         st.dataframe(df_fac, use_container_width=True)
-    except:
+    except Exception as e:
+        logger.info("faculty table unavailable: %s", e)
         st.info("Faculty table not found or empty.")
 
     st.write("---")
     st.markdown("### Class Schedule & Faculty Load")
 
     try:
-        df_cs = get_table_df("class_schedule")
+        df_cs = db.get_table_df("class_schedule")
     except Exception as e:
         st.error(f"Error loading class_schedule: {e}")
         df_cs = pd.DataFrame()
 
     if not df_cs.empty:
+        cols = db.get_schedule_columns()
+        schedule = db.get_table_info("class_schedule")
+        df_all = df_cs
+
         # Filter by FACULTY_ID
-        if "FACULTY_ID" in df_cs.columns:
+        if schedule.has("FACULTY_ID"):
             fac_values = sorted(df_cs["FACULTY_ID"].dropna().unique())
             fac_choice = st.selectbox(
                 "Filter by FACULTY_ID:",
@@ -703,8 +871,50 @@ elif page == "Faculty & Classes":
         st.caption(f"Showing {len(df_cs)} class schedule rows")
         st.dataframe(df_cs, use_container_width=True)
 
-        # Faculty load chart
-        if "FACULTY_ID" in df_cs.columns:
+        if cols["faculty"] and db.timetable_ready(cols):
+            st.markdown("#### ⚠️ Faculty Double-Bookings")
+            show_conflicts(df_all, cols, "faculty")
+
+            # Faculty load chart
+            st.markdown("#### 📊 Faculty-wise Teaching Hours")
+            try:
+                st.bar_chart(timetable.booked_hours(df_all, cols, "faculty").rename("hours"))
+            except Exception as e:
+                st.error(f"Error plotting faculty load: {e}")
+
+            st.markdown("#### ➕ Check a New Booking")
+            with st.form("check_booking"):
+                c1, c2 = st.columns(2)
+                with c1:
+                    fac_id = st.selectbox(f"{cols['faculty']}:", sorted(df_all[cols["faculty"]].dropna().unique()))
+                    room_id = (
+                        st.selectbox(f"{cols['room']}:", sorted(df_all[cols["room"]].dropna().unique()))
+                        if cols["room"] else None
+                    )
+                    day = st.text_input(f"{cols['day']} (as stored, e.g. 2024-07-01):") if cols["day"] else ""
+                with c2:
+                    start_t = st.time_input("Start time:", value=datetime.strptime("09:00", "%H:%M").time())
+                    end_t = st.time_input("End time:", value=datetime.strptime("10:00", "%H:%M").time())
+                checked = st.form_submit_button("Check")
+            if checked:
+                start_m = start_t.hour * 60 + start_t.minute
+                end_m = end_t.hour * 60 + end_t.minute
+                if end_m <= start_m:
+                    st.error("End time must be after start time.")
+                else:
+                    indexes = db.get_timetable_indexes()
+                    clashes = {
+                        kind: indexes[kind].conflicts(resource, day.strip(), start_m, end_m)
+                        for kind, resource in (("faculty", fac_id), ("room", room_id))
+                        if kind in indexes and resource is not None
+                    }
+                    if any(clashes.values()):
+                        for kind, ids in clashes.items():
+                            if ids:
+                                st.error(f"The {kind} is already booked then (class {', '.join(map(str, ids))}).")
+                    else:
+                        st.success("Slot is free for both the faculty member and the room.")
+        elif schedule.has("FACULTY_ID"):
             st.markdown("#### 📊 Faculty-wise Class Count")
             try:
                 fload = df_cs.groupby("FACULTY_ID").size().reset_index(name="class_count")
@@ -715,36 +925,117 @@ elif page == "Faculty & Classes":
     else:
         st.info("No class schedule data available.")
 
+    st.write("---")
+    st.markdown("### 🗓️ Timetable Generator")
+    st.caption(
+        f"Places every batch's weekly classes ({db.PERIOD_MINUTES}-minute periods, {db.ROOM_OPEN}–{db.ROOM_CLOSE}) "
+        "respecting room capacity, faculty time off (faculty_unavailability), daily faculty load "
+        "and batch timings. Nothing is written until you save."
+    )
+    with st.form("generate_timetable"):
+        keep_existing = st.checkbox("Keep the classes already in class_schedule", value=True)
+        sessions = st.number_input("Classes per batch per week:", min_value=1, max_value=30,
+                                   value=db.SESSIONS_PER_WEEK)
+        generate = st.form_submit_button("Generate")
+    if generate:
+        try:
+            problem = db.build_schedule_problem(keep_existing, int(sessions))
+            result = scheduler.solve(problem, time_limit=db.SOLVER_TIME_LIMIT_S)
+            st.session_state["timetable"] = (problem, result)
+        except Exception as e:
+            st.error(f"Error generating timetable: {e}")
+
+    if "timetable" in st.session_state:
+        problem, result = st.session_state["timetable"]
+
+        c1, c2 = st.columns([3, 1])
+        with c1:
+            absent = st.selectbox("Faculty member unavailable this week:", list(problem.faculty))
+        with c2:
+            st.write("")
+            replan = st.button("Re-plan without them")
+        if replan:
+            previous = result["assignment"]
+            problem = scheduler.faculty_absent(problem, absent)
+            result = scheduler.resolve(problem, previous, time_limit=db.SOLVER_TIME_LIMIT_S)
+            st.session_state["timetable"] = (problem, result)
+            moved = sum(1 for s, v in result["assignment"].items() if previous.get(s) != v)
+            st.info(f"Re-planned: {moved} class(es) moved, all others unchanged.")
+
+        total = len(problem.sessions())
+        st.caption(
+            f"Placed {total - len(result['unplaced'])} of {total} classes in {result['seconds']} s "
+            f"({result['backtracks']} backtracks)."
+        )
+        if result["unplaced"]:
+            st.warning(
+                "Could not place classes for batches: "
+                + ", ".join(sorted({str(b) for b, _ in result["unplaced"]}))
+            )
+        plan = pd.DataFrame(scheduler.to_rows(problem, result["assignment"]))
+        if not plan.empty:
+            plan["start"] = plan["start"].map(timetable.format_minutes)
+            plan["end"] = plan["end"].map(timetable.format_minutes)
+        st.dataframe(plan, use_container_width=True)
+
+        week_start = st.date_input("Week starting (Monday), used when the schedule stores dates:")
+        if st.button("Save to class_schedule"):
+            try:
+                saved = db.save_generated_timetable(problem, result["assignment"], week_start)
+                st.success(f"Saved {saved['written']} classes.")
+                for row_index, err in saved["errors"]:
+                    st.error(f"Class {row_index + 1}: {err}")
+                st.session_state.pop("timetable")
+            except Exception as e:
+                st.error(f"Error saving timetable: {e}")
+
 
 # ================== 9. ROOMS UTILIZATION ==================
 elif page == "Rooms Utilization":
     st.subheader("🏫 Room / Class Utilization")
 
     try:
-        df_cs = get_table_df("class_schedule")
+        df_cs = db.get_table_df("class_schedule")
     except Exception as e:
         st.error(f"Error loading class_schedule: {e}")
         df_cs = pd.DataFrame()
 
     try:
-        df_room = get_table_df("room")
-    except:
+        df_room = db.get_table_df("room")
+    except Exception as e:
+        logger.info("room table unavailable: %s", e)
         df_room = pd.DataFrame()
 
     if not df_cs.empty:
         st.markdown("### Room-wise Schedule")
 
-        if "ROOM_ID" in df_cs.columns:
+        if db.get_table_info("class_schedule").has("ROOM_ID"):
             st.caption(f"Total scheduled classes: {len(df_cs)}")
             st.dataframe(df_cs, use_container_width=True)
 
-            st.markdown("#### 📊 Room-wise Class Count")
-            try:
-                rload = df_cs.groupby("ROOM_ID").size().reset_index(name="class_count")
-                rload = rload.set_index("ROOM_ID")
-                st.bar_chart(rload["class_count"])
-            except Exception as e:
-                st.error(f"Error plotting room utilization: {e}")
+            cols = db.get_schedule_columns()
+            if db.timetable_ready(cols):
+                st.markdown(f"#### 📊 Room Utilization ({db.ROOM_OPEN}–{db.ROOM_CLOSE} per scheduled day)")
+                try:
+                    open_minutes = timetable.to_minutes([db.ROOM_CLOSE, db.ROOM_OPEN])
+                    rooms = df_room["ROOM_ID"].dropna().tolist() if "ROOM_ID" in df_room.columns else None
+                    util = timetable.room_utilisation(df_cs, cols, open_minutes[0] - open_minutes[1], rooms)
+                    st.bar_chart(util["utilisation_pct"])
+                    st.dataframe(util, use_container_width=True)
+                except Exception as e:
+                    st.error(f"Error computing room utilization: {e}")
+
+                st.markdown("#### ⚠️ Room Double-Bookings")
+                show_conflicts(df_cs, cols, "room")
+            else:
+                st.markdown("#### 📊 Room-wise Class Count")
+                st.caption("START_TIME / END_TIME not found in class_schedule, so only counts are shown.")
+                try:
+                    rload = df_cs.groupby("ROOM_ID").size().reset_index(name="class_count")
+                    rload = rload.set_index("ROOM_ID")
+                    st.bar_chart(rload["class_count"])
+                except Exception as e:
+                    st.error(f"Error plotting room utilization: {e}")
         else:
             st.info("ROOM_ID column not found in class_schedule.")
     else:
@@ -756,12 +1047,82 @@ elif page == "Rooms Utilization":
         st.dataframe(df_room, use_container_width=True)
 
 
-# ================== 10. ALL TABLES VIEWER (AUTO FROM DB) ==================
+# ================== 10. BULK IMPORT ==================
+elif page == "Bulk Import":
+    st.subheader("📥 Bulk Import from CSV / Excel")
+    st.caption(
+        "Rows are validated against the table schema, inserted in batched transactions "
+        "and checkpointed — re-upload the same file to resume an interrupted import."
+    )
+
+    table_name = st.selectbox("Import into table:", db.IMPORT_TABLES)
+    upload = st.file_uploader("Upload file:", type=["csv", "xlsx", "xlsm"])
+
+    try:
+        schema = db.get_table_schema(table_name)
+        with st.expander(f"Expected columns for `{table_name}`"):
+            st.dataframe(pd.DataFrame(schema), use_container_width=True)
+    except Exception as e:
+        st.error(f"Error reading schema of `{table_name}`: {e}")
+        schema = []
+
+    if upload is not None and schema:
+        try:
+            file_hash = importer.file_sha256(upload)
+            job = db.get_import_job(table_name, file_hash)
+        except Exception as e:
+            st.error(f"Error reading import checkpoints (is migration 005 applied?): {e}")
+            job, file_hash = None, None
+
+        restart = False
+        if job and job["STATUS"] == "done":
+            st.info(f"This file was already imported ({job['ROWS_WRITTEN']:,} rows written).")
+            restart = st.checkbox("Import it again from the start")
+        elif job and job["ROWS_COMMITTED"]:
+            st.warning(f"Previous import stopped after row {job['ROWS_COMMITTED']:,}; it will resume there.")
+            restart = st.checkbox("Ignore the checkpoint and start from row 1")
+
+        blocked = bool(job and job["STATUS"] == "done" and not restart)
+        if file_hash and st.button("🚀 Start Import", disabled=blocked):
+            status_box = st.empty()
+
+            def _show(stats, done):
+                rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+                status_box.info(
+                    f"Processed up to row {done:,} · written {stats['written']:,} · "
+                    f"rejected {len(stats['rejected']):,} · {rate:,.0f} rows/sec"
+                )
+
+            try:
+                job = db.start_import_job(table_name, upload.name, file_hash, restart=restart)
+                stats = db.run_import(table_name, upload, job, on_progress=_show)
+                rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+                st.success(
+                    f"Imported {stats['written']:,} of {stats['rows']:,} rows into `{table_name}` "
+                    f"in {stats['seconds']:.1f}s ({rate:,.0f} rows/sec)."
+                )
+                if stats["unknown_columns"]:
+                    st.caption(f"Ignored columns not in the table: {', '.join(map(str, stats['unknown_columns']))}")
+                if stats["rejected"]:
+                    st.warning(f"{len(stats['rejected']):,} rows were rejected:")
+                    st.dataframe(
+                        pd.DataFrame(stats["rejected"], columns=["file_row", "error"]),
+                        use_container_width=True
+                    )
+            except Exception as e:
+                try:
+                    db.fail_import_job(table_name, file_hash)
+                except Exception:
+                    pass
+                st.error(f"Import stopped: {e}. Committed chunks are kept; start again to resume.")
+
+
+# ================== 11. ALL TABLES VIEWER (AUTO FROM DB) ==================
 elif page == "All Tables":
     st.subheader("🗄️ All Tables Viewer (Auto-detected)")
 
     try:
-        all_tables = get_all_tables()
+        all_tables = db.get_all_tables()
     except Exception as e:
         st.error(f"Error fetching table list: {e}")
         all_tables = []
@@ -772,39 +1133,204 @@ elif page == "All Tables":
         table_name = st.sidebar.selectbox("Select Table:", all_tables, index=0)
         st.markdown(f"### `{table_name}`")
 
+        try:
+            columns = db.get_table_columns(table_name)
+        except Exception as e:
+            st.error(f"Error reading columns of `{table_name}`: {e}")
+            columns = []
+
         col1, col2 = st.columns([2, 1])
         with col1:
-            search_text = st.text_input("Search (matches any column):", "")
+            search_label = (
+                "Search (name, mobile, e-mail — prefix and typos OK):" if table_name in db.SEARCH_TABLES
+                else "Search (matches any column):"
+            )
+            search_text = st.text_input(search_label, "")
         with col2:
-            max_rows = st.number_input("Max rows to show:", min_value=10, max_value=2000, value=500, step=10)
+            max_rows = st.number_input("Rows per page:", min_value=10, max_value=2000, value=500, step=10)
+
+        filters = []
+        with st.expander("🔎 Column filters & sorting"):
+            fcol1, fcol2, fcol3 = st.columns(3)
+            with fcol1:
+                filter_col = st.selectbox("Filter column:", ["(none)"] + columns)
+            with fcol2:
+                filter_op = st.selectbox("Operator:", list(db.FILTER_OPERATORS))
+            with fcol3:
+                filter_val = st.text_input("Value:", "")
+            if filter_col != "(none)" and filter_val != "":
+                filters.append((filter_col, filter_op, filter_val))
+
+            scol1, scol2 = st.columns(2)
+            with scol1:
+                order_by = st.selectbox("Order by:", ["(none)"] + columns)
+            with scol2:
+                descending = st.checkbox("Descending", value=False)
+        filters = tuple(filters)
+        order_by = None if order_by == "(none)" else order_by
 
         try:
-            df = get_table_df(table_name)
-            total_rows = len(df)
-            st.caption(f"Total rows: {total_rows}")
-
-            if search_text.strip():
-                s = search_text.lower()
-                df_filtered = df[df.apply(
-                    lambda row: row.astype(str).str.lower().str.contains(s).any(),
-                    axis=1
-                )]
+            # Large tables: say when the query cannot use an index before running it.
+            warnings = db.scan_warnings(table_name, search_text, filters, order_by)
+            for warning in warnings:
+                st.warning(warning)
+            if warnings and not st.checkbox("Run anyway", key=f"scan_ok_{table_name}"):
+                st.info("Pick an indexed column, or tick 'Run anyway'.")
+                st.stop()
+
+            total_rows, is_estimate = db.count_table_rows(table_name, search_text, filters)
+            page_size = int(max_rows)
+            n_pages = max(1, -(-total_rows // page_size))
+            st.caption(f"{'≈ ' if is_estimate else ''}{total_rows:,} matching rows · {n_pages:,} pages")
+
+            key = db.keyset_column(table_name)
+            if key and not search_text.strip() and order_by in (None, key):
+                # Keyset paging: each page starts after the last key of the previous one.
+                view = (table_name, filters, descending, page_size)
+                nav = st.session_state.get("keyset_nav")
+                if nav is None or nav["view"] != view:
+                    nav = st.session_state["keyset_nav"] = {"view": view, "cursors": [None], "last": None}
+                ncol1, ncol2, ncol3, ncol4 = st.columns([1, 1, 1, 3])
+                if ncol1.button("⏮ First"):
+                    nav["cursors"] = [None]
+                if ncol2.button("◀ Prev", disabled=len(nav["cursors"]) == 1):
+                    nav["cursors"].pop()
+                if ncol3.button("Next ▶", disabled=nav["last"] is None):
+                    nav["cursors"].append(nav["last"])
+                ncol4.caption(f"Page {len(nav['cursors']):,} of {n_pages:,}")
+
+                df_show = db.get_table_page(
+                    table_name, search_text, filters, key, descending,
+                    limit=page_size, after=nav["cursors"][-1]
+                )
+                last = df_show[key].iloc[-1] if len(df_show) == page_size else None
+                nav["last"] = last.item() if hasattr(last, "item") else last
             else:
-                df_filtered = df
+                page_no = st.number_input("Page:", min_value=1, max_value=n_pages, value=1, step=1)
+                df_show = db.get_table_page(
+                    table_name, search_text, filters, order_by, descending,
+                    limit=page_size, offset=(int(page_no) - 1) * page_size
+                )
 
-            if df_filtered.empty:
+            if df_show.empty:
                 st.warning("No rows match your search.")
             else:
-                df_show = df_filtered.head(int(max_rows))
                 st.dataframe(df_show, use_container_width=True)
 
-                csv = df_filtered.to_csv(index=False).encode("utf-8")
-                st.download_button(
-                    label="⬇️ Download filtered data as CSV",
-                    data=csv,
-                    file_name=f"{table_name}.csv",
-                    mime="text/csv"
-                )
+            # Export only runs when asked for, never on a plain rerun.
+            st.write("---")
+            ecol1, ecol2 = st.columns([1, 2])
+            with ecol1:
+                export_fmt = st.selectbox("Export format:", list(db.EXPORT_FORMATS))
+            with ecol2:
+                st.write("")
+                prepare = st.button("📦 Prepare export of all matching rows")
+
+            if prepare:
+                old_path = st.session_state.pop("export_path", None)
+                if old_path and os.path.exists(old_path):
+                    os.remove(old_path)
+                bar = st.progress(0.0, text="Exporting…")
+
+                def _report(done):
+                    frac = min(done / total_rows, 1.0) if total_rows else 1.0
+                    bar.progress(frac, text=f"Exported {done:,} rows")
+
+                try:
+                    started = time.perf_counter()
+                    path = db.export_table(
+                        table_name, export_fmt, search_text, filters, order_by, descending,
+                        progress=_report
+                    )
+                    bar.progress(1.0, text=f"Export ready in {time.perf_counter() - started:.1f}s")
+                    st.session_state["export_path"] = path
+                    st.session_state["export_name"] = f"{table_name}{db.EXPORT_FORMATS[export_fmt]}"
+                except ImportError:
+                    st.error("Parquet export needs `pyarrow` (pip install pyarrow).")
+                except Exception as e:
+                    st.error(f"Export failed: {e}")
+
+            export_path = st.session_state.get("export_path")
+            if export_path and os.path.exists(export_path):
+                with open(export_path, "rb") as fh:
+                    st.download_button(
+                        label=f"⬇️ Download {st.session_state['export_name']}",
+                        data=fh,
+                        file_name=st.session_state["export_name"],
+                        mime="application/octet-stream"
+                    )
         except Exception as e:
             st.error(f"Error loading table `{table_name}`: {e}")
-            st.info("Check if table exists and names are correct.")    
\ No newline at end of file
+            st.info("Check if table exists and names are correct.")
+
+
+# ================== 12. PERFORMANCE ==================
+elif page == "Performance":
+    st.subheader("⏱️ Query Performance")
+    stats = db.get_query_stats()
+
+    summary = stats.summary()
+    if summary.empty:
+        st.info("No queries recorded yet — open a few pages first.")
+    else:
+        st.markdown("#### Statements (rolling window)")
+        sort_col = st.selectbox("Sort by:", ["p95_ms", "p99_ms", "max_ms", "count", "total_kb", "errors"])
+        st.dataframe(summary.sort_values(sort_col, ascending=False), use_container_width=True)
+
+        st.markdown("#### Slowest executions")
+        top_n = st.number_input("Top N:", min_value=1, max_value=stats.keep_slowest, value=10, step=1)
+        slow = stats.slowest(int(top_n))
+        st.dataframe(
+            pd.DataFrame(
+                [(round(sec * 1000, 1), pg, at.strftime("%H:%M:%S"), db.fingerprint(q)) for sec, q, _, pg, at in slow],
+                columns=["ms", "page", "at", "query"]
+            ),
+            use_container_width=True
+        )
+
+        explainable = [i for i, (_, q, _, _, _) in enumerate(slow) if q.lstrip().upper().startswith("SELECT")]
+        if explainable:
+            pick = st.selectbox(
+                "EXPLAIN query #:",
+                explainable,
+                format_func=lambda i: f"#{i + 1} ({slow[i][0] * 1000:.0f} ms) {db.fingerprint(slow[i][1])[:80]}"
+            )
+            if st.button("Run EXPLAIN"):
+                _, q, params, _, _ = slow[pick]
+                try:
+                    st.dataframe(db.explain(q, params), use_container_width=True)
+                except Exception as e:
+                    st.error(f"EXPLAIN failed: {e}")
+
+    st.markdown("#### DataFrame memory (compact dtypes)")
+    mem = db.get_memory_report()
+    if mem:
+        st.dataframe(
+            pd.DataFrame.from_dict(dict(mem), orient="index").rename_axis("table"),
+            use_container_width=True
+        )
+    else:
+        st.info("No full table loads yet.")
+
+    st.markdown("#### Cache hits / misses by loader and page")
+    cache_summary = stats.cache_summary()
+    if cache_summary.empty:
+        st.info("No cached loaders used yet.")
+    else:
+        st.dataframe(cache_summary, use_container_width=True)
+
+    st.markdown("#### Prometheus export")
+    try:
+        pool_metrics = db.get_pool().metrics()
+    except Exception:
+        pool_metrics = {}
+    prom = stats.prometheus_text(pool_metrics, db.get_table_cache().metrics(), db.write_queue_metrics(),
+                                 db.replica_metrics())
+    if db.METRICS_PORT:
+        st.caption(f"Scrape endpoint: `http://<host>:{db.METRICS_PORT}/metrics`")
+    else:
+        st.caption("Set METRICS_PORT at the top of db.py to expose a scrape endpoint.")
+    st.download_button("⬇️ Download metrics.txt", prom, file_name="metrics.txt", mime="text/plain")
+    with st.expander("Show exposition text"):
+        st.code(prom, language="text")
+
@@ -0,0 +1,274 @@
+"""Time each page's data-loading path against generated data (see datagen.py).
+
+Every scenario runs the same statements the page runs, fetches the rows and
+builds the DataFrame the page would show. Latency is measured over
+``--iterations`` runs (p50 / p95 / p99 / max); peak Python memory (driver
+rows + DataFrame) comes from one extra run under tracemalloc, kept apart so
+it does not slow the timed runs. On MySQL the loaders the pages actually
+call (db.py, ``db_*`` scenarios) are timed too, with the query cache
+cleared before every call so each run reaches the database.
+
+    python datagen.py --students 100000 --password ...
+    python bench.py --password ... --json before.json
+    # ...change something...
+    python bench.py --password ... --json after.json --compare before.json
+
+``--sqlite bench.db`` runs the portable scenarios against a SQLite stand-in.
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import datagen
+import db
+import search
+
+
+class Scenario:
+    """One page data path: SQL per dialect (None = not available there)."""
+
+    def __init__(self, name: str, page: str, mysql: str, sqlite: str = "same", params=None):
+        self.name = name
+        self.page = page
+        self.sql = {"mysql": mysql, "sqlite": mysql if sqlite == "same" else sqlite}
+        self.params = params or (lambda ctx: ())
+
+
+SCENARIOS = [
+    # Dashboard KPIs and charts (live aggregates; summary tables are timed below when present)
+    Scenario("dashboard_course_headcount", "Dashboard",
+             "SELECT COURSE_NAME, COUNT(STUDENT_ID) AS student_count FROM student "
+             "GROUP BY COURSE_NAME ORDER BY student_count DESC"),
+    Scenario("dashboard_fee_monthly", "Dashboard",
+             "SELECT DATE_FORMAT(PAYMENT_DATE, '%Y-%m') AS ym, SUM(AMOUNT_PAID) AS total_paid "
+             "FROM fee_payment GROUP BY ym ORDER BY ym",
+             "SELECT strftime('%Y-%m', PAYMENT_DATE) AS ym, SUM(AMOUNT_PAID) AS total_paid "
+             "FROM fee_payment GROUP BY ym ORDER BY ym"),
+    Scenario("dashboard_lead_status", "Dashboard",
+             "SELECT STATUS, COUNT(*) AS count FROM lead GROUP BY STATUS"),
+    Scenario("dashboard_summary_tables", "Dashboard",
+             "SELECT COURSE_NAME, student_count FROM summary_course_headcount ORDER BY student_count DESC",
+             None),
+    # Fees: the per-student balance join the page used before the ledger, and the ledger page
+    Scenario("fees_balance_join", "Fees",
+             "SELECT s.STUDENT_ID, s.NAME, c.COURSE_NAME, c.FEES AS total_fees, "
+             "SUM(fp.AMOUNT_PAID) AS total_paid, c.FEES - SUM(fp.AMOUNT_PAID) AS balance "
+             "FROM fee_payment fp JOIN student s ON s.STUDENT_ID = fp.STUDENT_ID "
+             "JOIN course c ON c.COURSE_ID = fp.COURSE_ID "
+             "GROUP BY s.STUDENT_ID, s.NAME, c.COURSE_NAME, c.FEES"),
+    Scenario("fees_ledger_page", "Fees",
+             "SELECT l.STUDENT_ID, s.NAME, c.COURSE_NAME, l.TOTAL_FEES, l.TOTAL_PAID, l.BALANCE "
+             "FROM fee_ledger l JOIN student s ON s.STUDENT_ID = l.STUDENT_ID "
+             "JOIN course c ON c.COURSE_ID = l.COURSE_ID WHERE l.BALANCE > 0 "
+             "ORDER BY l.BALANCE DESC LIMIT 500",
+             None),
+    # Attendance: daily present counts over the last 30 days, and one student's history
+    Scenario("attendance_daily_range", "Attendance",
+             "SELECT ATTENDANCE_DATE, COUNT(*) AS present_count FROM attendance "
+             "WHERE STATUS = 'Present' AND ATTENDANCE_DATE BETWEEN %s AND %s "
+             "GROUP BY ATTENDANCE_DATE ORDER BY ATTENDANCE_DATE",
+             params=lambda ctx: (ctx["att_from"], ctx["att_to"])),
+    Scenario("attendance_one_student", "Attendance",
+             "SELECT * FROM attendance WHERE STUDENT_ID = %s AND ATTENDANCE_DATE BETWEEN %s AND %s",
+             params=lambda ctx: (ctx["student_id"], ctx["att_from"], ctx["att_to"])),
+    # Students page: one filtered page
+    Scenario("students_filtered_page", "Students",
+             "SELECT * FROM student WHERE COURSE_NAME = %s AND STATUS = 'Active' LIMIT 1000",
+             params=lambda ctx: (ctx["course_name"],)),
+    # Results: the full join the page loads
+    Scenario("results_join", "Results",
+             "SELECT r.RESULT_ID, r.STUDENT_ID, s.NAME AS STUDENT_NAME, r.TEST_ID, t.TEST_NAME, "
+             "t.COURSE_ID, c.COURSE_NAME, r.MARKS_OBTAINED, r.GRADE, r.REMARKS FROM result r "
+             "JOIN student s ON r.STUDENT_ID = s.STUDENT_ID JOIN test t ON r.TEST_ID = t.TEST_ID "
+             "JOIN course c ON t.COURSE_ID = c.COURSE_ID"),
+    Scenario("results_filtered_page", "Results",
+             "SELECT r.RESULT_ID, r.STUDENT_ID, s.NAME AS STUDENT_NAME, r.TEST_ID, t.TEST_NAME, "
+             "t.COURSE_ID, c.COURSE_NAME, r.MARKS_OBTAINED, r.GRADE, r.REMARKS FROM result r "
+             "JOIN student s ON r.STUDENT_ID = s.STUDENT_ID JOIN test t ON r.TEST_ID = t.TEST_ID "
+             "JOIN course c ON t.COURSE_ID = c.COURSE_ID WHERE c.COURSE_NAME = %s "
+             "ORDER BY r.RESULT_ID DESC LIMIT 1000",
+             params=lambda ctx: (ctx["course_name"],)),
+    # All Tables: full load, and the LIKE search over every column
+    Scenario("all_tables_full_student", "All Tables", "SELECT * FROM student"),
+    Scenario("all_tables_like_search", "All Tables",
+             "SELECT * FROM student WHERE LOWER(CONCAT_WS(' ', NAME, MOBILE, EMAIL_ID, CITY)) LIKE %s "
+             "LIMIT 500",
+             "SELECT * FROM student WHERE LOWER(NAME || ' ' || MOBILE || ' ' || EMAIL_ID || ' ' || CITY) "
+             "LIKE %s LIMIT 500",
+             params=lambda ctx: (f"%{ctx['search_term']}%",)),
+]
+
+
+# The page loaders themselves (MySQL only): name -> (page, call given the context)
+DB_SCENARIOS = {
+    "db_dashboard_summary": ("Dashboard", lambda ctx: db.load_summary("course_headcount")),
+    "db_fee_ledger_page": ("Fees", lambda ctx: db.get_fee_ledger_page(True, db.PAGE_ROWS, 0)),
+    "db_attendance_trend": ("Attendance", lambda ctx: db.get_daily_present(ctx["att_from"], ctx["att_to"])),
+    "db_students_page": ("Students", lambda ctx: db.get_table_page(
+        "student", "", (("COURSE_NAME", "equals", ctx["course_name"]), ("STATUS", "equals", "Active")),
+        limit=db.PAGE_ROWS)),
+    "db_course_fee_summary": ("Courses", lambda ctx: db.get_course_fee_summary()),
+    "db_results_page": ("Results", lambda ctx: db.get_results(ctx["course_name"])),
+    "db_result_stats": ("Results", lambda ctx: db.load_test_stats(ctx["course_name"])),
+    "db_student_performance": ("Results", lambda ctx: db.get_student_performance(ctx["student_id"])),
+    "db_lead_funnel": ("Leads", lambda ctx: db.get_lead_funnel("COHORT")),
+}
+
+
+def _fetch(conn, dialect: str, sql: str, params) -> pd.DataFrame:
+    if dialect == "sqlite":
+        sql = sql.replace("%s", "?")
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params) if params else cur.execute(sql)
+        columns = [d[0] for d in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=columns)
+    finally:
+        cur.close()
+
+
+def _context(conn, dialect: str) -> dict:
+    """Realistic parameters taken from the data itself."""
+    hi = _fetch(conn, dialect, "SELECT MAX(ATTENDANCE_DATE) AS hi FROM attendance", ()).iloc[0, 0]
+    hi = pd.Timestamp(hi).date()
+    sample = _fetch(conn, dialect, "SELECT STUDENT_ID, NAME, COURSE_NAME FROM student LIMIT 1", ()).iloc[0]
+    return {
+        "att_from": hi - timedelta(days=30), "att_to": hi,
+        "student_id": int(sample["STUDENT_ID"]),
+        "course_name": sample["COURSE_NAME"],
+        "search_term": str(sample["NAME"]).split()[0].lower(),
+    }
+
+
+def measure(func, iterations: int) -> dict:
+    """Latency percentiles over ``iterations`` calls plus peak memory of one more."""
+    func()                                   # warm-up (connection, caches)
+    latencies, rows = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        out = func()
+        latencies.append((time.perf_counter() - started) * 1000)
+        rows = len(out) if out is not None else 0
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    ms = np.array(latencies)
+    return {
+        "rows": rows,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+        "peak_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def run(conn, dialect: str, iterations: int, only=None, log=print) -> dict:
+    ctx = _context(conn, dialect)
+    results = {}
+    for sc in SCENARIOS:
+        sql = sc.sql[dialect]
+        if sql is None or (only and sc.name not in only):
+            continue
+        params = sc.params(ctx)
+        try:
+            results[sc.name] = dict(page=sc.page, **measure(lambda: _fetch(conn, dialect, sql, params), iterations))
+        except Exception as e:     # e.g. a migration-only table that is not there
+            log(f"skipped {sc.name}: {e}")
+            if dialect == "mysql":
+                conn.rollback()
+            continue
+        log(_line(sc.name, results[sc.name]))
+
+    for name, (page, call) in DB_SCENARIOS.items() if dialect == "mysql" else ():
+        if only and name not in only:
+            continue
+
+        def cold(call=call):
+            db.get_table_cache().clear()
+            return call(ctx)
+
+        try:
+            results[name] = dict(page=page, **measure(cold, iterations))
+        except Exception as e:
+            log(f"skipped {name}: {e}")
+            continue
+        log(_line(name, results[name]))
+
+    # All Tables search through the in-memory index (search.py).
+    if not only or "search_index_lookup" in only:
+        def fetch(query, params=()):
+            return _fetch(conn, dialect, query, params).to_dict("records")
+
+        index = search.TableSearch("student", "STUDENT_ID", ["NAME", "MOBILE", "EMAIL_ID", "CITY"])
+        started = time.perf_counter()
+        index.rebuild(fetch)
+        build_ms = (time.perf_counter() - started) * 1000
+        term = ctx["search_term"]
+        results["search_index_lookup"] = dict(
+            page="All Tables", build_ms=round(build_ms, 1),
+            **measure(lambda: index.search(term, 1000), iterations),
+        )
+        log(_line("search_index_lookup", results["search_index_lookup"]))
+    return results
+
+
+HEADER = f"{'scenario':<28} {'rows':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak MB':>8}"
+
+
+def _line(name: str, r: dict) -> str:
+    return (f"{name:<28} {r['rows']:>9,} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+            f"{r['p99_ms']:>9} {r['max_ms']:>9} {r['peak_mb']:>8}")
+
+
+def compare(current: dict, baseline: dict):
+    """Print p50/p95/peak of this run against an earlier --json file."""
+    print(f"\n{'scenario':<28} {'p50 before':>10} {'p50 now':>9} {'p95 before':>10} {'p95 now':>9} "
+          f"{'peak before':>11} {'peak now':>9}")
+    for name, now in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        print(f"{name:<28} {old['p50_ms']:>10} {now['p50_ms']:>9} {old['p95_ms']:>10} {now['p95_ms']:>9} "
+              f"{old['peak_mb']:>11} {now['peak_mb']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the page data paths")
+    datagen.add_target_args(parser)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--json", metavar="PATH", help="save results for a later --compare")
+    parser.add_argument("--compare", metavar="PATH", help="earlier --json results to compare with")
+    args = parser.parse_args()
+
+    conn, dialect = datagen.connect(args)
+    if dialect == "mysql":
+        db.configure(DB_HOST=args.host, DB_USER=args.user, DB_PASSWORD=args.password, DB_NAME=args.database)
+        db.set_page("bench")
+    try:
+        print(HEADER)
+        results = run(conn, dialect, args.iterations, set(args.only.split(",")) if args.only else None)
+    finally:
+        conn.close()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({
+                "target": args.sqlite or f"mysql://{args.host}/{args.database}",
+                "iterations": args.iterations,
+                "python": platform.python_version(),
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results,
+            }, fh, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            compare(results, json.load(fh)["results"])
@@ -0,0 +1,327 @@
+"""Synthetic ERP data at a chosen scale, for benchmarks and load tests.
+
+Creates the core tables (student, course, batch, attendance, fee_payment,
+lead, test, result, faculty, room, class_schedule) and fills them with
+realistic-looking rows. Everything is derived from ``--students``:
+
+    students   attendance (x days)   results        fee payments   leads
+    10,000     300,000               ~200,000       ~30,000        20,000
+    200,000    6,000,000             ~4,000,000     ~600,000       400,000
+
+Targets a MySQL/MariaDB database (default ``students_bench`` so it never
+touches the real one) or a SQLite file as a stand-in:
+
+    python datagen.py --students 10000 --database students_bench --password ...
+    python datagen.py --students 10000 --sqlite bench.db
+
+Apply the migrations to a MySQL target afterwards so the ledger and summary
+tables are built from the generated data. Rows are streamed in chunks, so
+memory use stays flat at any scale.
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+CHUNK_ROWS = 5000
+
+# table -> [(column, MySQL type)]; the first column is the auto-increment key
+SCHEMA = {
+    "course": [
+        ("COURSE_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("COURSE_NAME", "VARCHAR(100) NOT NULL"),
+        ("FEES", "DECIMAL(10, 2) NOT NULL"), ("DURATION_MONTHS", "INT"), ("STATUS", "VARCHAR(20)"),
+    ],
+    "faculty": [
+        ("FACULTY_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("NAME", "VARCHAR(100) NOT NULL"),
+        ("MOBILE", "VARCHAR(15)"), ("EMAIL_ID", "VARCHAR(100)"), ("SUBJECT", "VARCHAR(50)"),
+        ("MAX_CLASSES_PER_DAY", "INT"),
+    ],
+    "room": [
+        ("ROOM_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("ROOM_NAME", "VARCHAR(50) NOT NULL"),
+        ("CAPACITY", "INT"),
+    ],
+    "batch": [
+        ("BATCH_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("BATCH_NAME", "VARCHAR(100) NOT NULL"),
+        ("COURSE_ID", "INT NOT NULL"), ("FACULTY_ID", "INT"), ("STRENGTH", "INT"),
+        ("START_TIME", "TIME"), ("END_TIME", "TIME"),
+    ],
+    "student": [
+        ("STUDENT_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("NAME", "VARCHAR(100) NOT NULL"),
+        ("GENDER", "VARCHAR(10)"), ("DOB", "DATE"), ("MOBILE", "VARCHAR(15)"), ("EMAIL_ID", "VARCHAR(100)"),
+        ("ADDRESS", "VARCHAR(255)"), ("CITY", "VARCHAR(50)"), ("STATE", "VARCHAR(50)"),
+        ("PINCODE", "VARCHAR(10)"), ("PARENT_NAME", "VARCHAR(100)"), ("PARENT_MOBILE", "VARCHAR(15)"),
+        ("COURSE_NAME", "VARCHAR(100)"), ("JOIN_DATE", "DATE"), ("STATUS", "VARCHAR(20)"),
+    ],
+    "attendance": [
+        ("ATTENDANCE_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("STUDENT_ID", "INT NOT NULL"),
+        ("ATTENDANCE_DATE", "DATE NOT NULL"), ("STATUS", "VARCHAR(10) NOT NULL"),
+    ],
+    "fee_payment": [
+        ("PAYMENT_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("STUDENT_ID", "INT NOT NULL"),
+        ("COURSE_ID", "INT NOT NULL"), ("AMOUNT_PAID", "DECIMAL(10, 2) NOT NULL"),
+        ("PAYMENT_DATE", "DATE NOT NULL"), ("PAYMENT_MODE", "VARCHAR(20)"),
+    ],
+    "lead": [
+        ("LEAD_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("NAME", "VARCHAR(100) NOT NULL"),
+        ("MOBILE", "VARCHAR(15)"), ("EMAIL_ID", "VARCHAR(100)"), ("COURSE_INTERESTED", "VARCHAR(100)"),
+        ("SOURCE", "VARCHAR(50)"), ("STATUS", "VARCHAR(30)"), ("CREATED_AT", "DATETIME"),
+    ],
+    "test": [
+        ("TEST_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("COURSE_ID", "INT NOT NULL"),
+        ("TEST_NAME", "VARCHAR(100) NOT NULL"), ("TEST_DATE", "DATE"), ("MAX_MARKS", "INT"),
+    ],
+    "result": [
+        ("RESULT_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("STUDENT_ID", "INT NOT NULL"),
+        ("TEST_ID", "INT NOT NULL"), ("MARKS_OBTAINED", "DECIMAL(6, 2)"), ("GRADE", "VARCHAR(5)"),
+        ("REMARKS", "VARCHAR(255)"),
+    ],
+    "class_schedule": [
+        ("CLASS_ID", "INT AUTO_INCREMENT PRIMARY KEY"), ("BATCH_ID", "INT NOT NULL"),
+        ("COURSE_ID", "INT"), ("FACULTY_ID", "INT"), ("ROOM_ID", "INT"), ("CLASS_DATE", "DATE"),
+        ("START_TIME", "TIME"), ("END_TIME", "TIME"),
+    ],
+}
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ayaan", "Krishna", "Ishaan",
+    "Rahul", "Rohit", "Amit", "Fazil", "Imran", "Karan", "Nikhil", "Pranav", "Siddharth", "Yash",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Pari", "Anika", "Navya", "Myra", "Sara", "Priya",
+    "Pooja", "Neha", "Sneha", "Ayesha", "Fatima", "Kavya", "Riya", "Tanvi", "Meera", "Zoya",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Gupta", "Singh", "Kumar", "Raza", "Khan", "Patel", "Reddy", "Iyer",
+    "Nair", "Das", "Mehta", "Joshi", "Chopra", "Ansari", "Yadav", "Mishra", "Pandey", "Qureshi",
+]
+CITIES = [
+    ("Lucknow", "Uttar Pradesh"), ("Kanpur", "Uttar Pradesh"), ("Delhi", "Delhi"), ("Patna", "Bihar"),
+    ("Jaipur", "Rajasthan"), ("Kota", "Rajasthan"), ("Bhopal", "Madhya Pradesh"), ("Pune", "Maharashtra"),
+    ("Hyderabad", "Telangana"), ("Kolkata", "West Bengal"),
+]
+COURSES = [
+    ("JEE Main Batch", 85000, 12), ("JEE Advanced Batch", 110000, 24), ("NEET Batch", 95000, 12),
+    ("NEET Repeater Batch", 75000, 10), ("Foundation Class 9", 40000, 12), ("Foundation Class 10", 45000, 12),
+    ("Class 11 Boards", 50000, 12), ("Class 12 Boards", 55000, 12), ("CUET Crash Course", 25000, 3),
+    ("Olympiad Prep", 30000, 6), ("NDA Batch", 60000, 8), ("CA Foundation", 48000, 6),
+]
+SUBJECTS = ["Physics", "Chemistry", "Mathematics", "Biology", "English", "Reasoning"]
+LEAD_SOURCES = ["Walk-in", "Website", "Facebook", "Instagram", "Referral", "Google Ads", "Seminar"]
+LEAD_STATUSES = ["New", "In Follow-up", "Converted", "Not Interested", "Lost"]
+
+
+class Generator:
+    """Deterministic row streams for every table at one scale."""
+
+    def __init__(self, students: int, days: int = 30, seed: int = 0, today: date = None):
+        self.rng = random.Random(seed)
+        self.students = students
+        self.days = days
+        self.today = today or date.today()
+        self.n_faculty = max(10, students // 250)
+        self.n_rooms = max(5, students // 400)
+        self.n_batches = max(len(COURSES), students // 60)
+        self.tests_per_course = 20
+        # student -> course id, filled while students are generated
+        self.student_course = []
+
+    def _name(self) -> str:
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def _mobile(self) -> str:
+        return f"{self.rng.randint(6, 9)}{self.rng.randint(0, 999999999):09d}"
+
+    def _email(self, name: str, n: int) -> str:
+        return f"{name.lower().replace(' ', '.')}{n}@{self.rng.choice(('gmail.com', 'yahoo.in', 'outlook.com'))}"
+
+    def _school_days(self) -> list:
+        days, d = [], self.today
+        while len(days) < self.days:
+            d -= timedelta(days=1)
+            if d.weekday() < 6:
+                days.append(d)
+        return days[::-1]
+
+    def course(self):
+        for name, fees, months in COURSES:
+            yield (name, fees, months, "Active" if self.rng.random() < 0.85 else "Inactive")
+
+    def faculty(self):
+        for i in range(1, self.n_faculty + 1):
+            name = self._name()
+            yield (name, self._mobile(), self._email(name, i), self.rng.choice(SUBJECTS), self.rng.choice((4, 5, 6)))
+
+    def room(self):
+        for i in range(1, self.n_rooms + 1):
+            name = f"Lab-{i}" if i % 7 == 0 else str(100 + i)
+            yield (name, self.rng.choice((30, 40, 60, 80, 120)))
+
+    def batch(self):
+        windows = [("08:00:00", "12:00:00"), ("12:00:00", "16:00:00"), ("16:00:00", "20:00:00")]
+        for i in range(1, self.n_batches + 1):
+            course_id = (i - 1) % len(COURSES) + 1
+            start, end = self.rng.choice(windows)
+            yield (f"{COURSES[course_id - 1][0]} - B{i}", course_id, self.rng.randint(1, self.n_faculty),
+                   self.rng.randint(30, 70), start, end)
+
+    def student(self):
+        for i in range(1, self.students + 1):
+            course_id = self.rng.randint(1, len(COURSES))
+            self.student_course.append(course_id)
+            name = self._name()
+            city, state = self.rng.choice(CITIES)
+            yield (
+                name, self.rng.choice(("Male", "Female")),
+                date(self.rng.randint(2002, 2011), self.rng.randint(1, 12), self.rng.randint(1, 28)),
+                self._mobile(), self._email(name, i), f"{self.rng.randint(1, 500)}, Sector {self.rng.randint(1, 60)}",
+                city, state, f"{self.rng.randint(200000, 899999)}",
+                f"{self.rng.choice(FIRST_NAMES)} {name.split()[1]}", self._mobile(),
+                COURSES[course_id - 1][0], self.today - timedelta(days=self.rng.randint(0, 700)),
+                "Active" if self.rng.random() < 0.9 else self.rng.choice(("Inactive", "Dropped", "Completed")),
+            )
+
+    def attendance(self):
+        days = self._school_days()
+        for sid in range(1, self.students + 1):
+            regular = self.rng.random() < 0.8
+            for d in days:
+                roll = self.rng.random()
+                status = "Present" if roll < (0.9 if regular else 0.65) else ("Absent" if roll < 0.97 else "Leave")
+                yield (sid, d, status)
+
+    def fee_payment(self):
+        for sid in range(1, self.students + 1):
+            course_id = self.student_course[sid - 1] if self.student_course else 1
+            fees = COURSES[course_id - 1][1]
+            for _ in range(self.rng.choice((1, 2, 3, 3, 4))):
+                yield (sid, course_id, round(fees / self.rng.choice((2, 3, 4)), 2),
+                       self.today - timedelta(days=self.rng.randint(0, 540)),
+                       self.rng.choice(("Cash", "UPI", "Card", "Bank Transfer", "Cheque")))
+
+    def lead(self):
+        for i in range(1, 2 * self.students + 1):
+            name = self._name()
+            created = datetime.combine(self.today, datetime.min.time()) - timedelta(
+                days=self.rng.randint(0, 365), minutes=self.rng.randint(0, 1440)
+            )
+            yield (name, self._mobile(), self._email(name, i), self.rng.choice(COURSES)[0],
+                   self.rng.choice(LEAD_SOURCES), self.rng.choices(LEAD_STATUSES, (30, 30, 15, 15, 10))[0],
+                   created)
+
+    def test(self):
+        for course_id in range(1, len(COURSES) + 1):
+            for n in range(1, self.tests_per_course + 1):
+                yield (course_id, f"{COURSES[course_id - 1][0]} Test {n}",
+                       self.today - timedelta(days=7 * (self.tests_per_course - n)), 100)
+
+    def result(self):
+        for sid in range(1, self.students + 1):
+            course_id = self.student_course[sid - 1] if self.student_course else 1
+            skill = self.rng.gauss(60, 15)
+            for n in range(1, self.tests_per_course + 1):
+                if self.rng.random() < 0.1:
+                    continue        # missed the test
+                marks = max(0.0, min(100.0, round(self.rng.gauss(skill, 10), 1)))
+                grade = "A" if marks >= 80 else "B" if marks >= 60 else "C" if marks >= 40 else "D"
+                yield (sid, (course_id - 1) * self.tests_per_course + n, marks, grade, None)
+
+    def class_schedule(self):
+        slots = ["08:00:00", "09:00:00", "10:00:00", "11:00:00", "13:00:00", "14:00:00",
+                 "15:00:00", "16:00:00", "17:00:00", "18:00:00"]
+        for d in self._school_days()[-min(self.days, 6):]:
+            for bid in range(1, self.n_batches + 1):
+                for start in self.rng.sample(slots, 2):
+                    end = f"{int(start[:2]) + 1:02d}:00:00"
+                    yield (bid, (bid - 1) % len(COURSES) + 1, self.rng.randint(1, self.n_faculty),
+                           self.rng.randint(1, self.n_rooms), d, start, end)
+
+
+# Parents first, so ids referenced by later tables exist.
+TABLE_ORDER = ["course", "faculty", "room", "batch", "student", "attendance", "fee_payment",
+               "lead", "test", "result", "class_schedule"]
+
+
+# ========== TARGETS ==========
+def add_target_args(parser: argparse.ArgumentParser):
+    """Connection options shared with bench.py."""
+    parser.add_argument("--sqlite", metavar="PATH", help="use a SQLite file instead of MySQL")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="students_bench")
+
+
+def connect(args):
+    """``(connection, dialect)`` for the target named on the command line."""
+    if args.sqlite:
+        return sqlite3.connect(args.sqlite), "sqlite"
+    import mysql.connector
+
+    conn = mysql.connector.connect(host=args.host, user=args.user, password=args.password)
+    cur = conn.cursor()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`;")
+    cur.execute(f"USE `{args.database}`;")
+    cur.close()
+    return conn, "mysql"
+
+
+def create_sql(table: str, dialect: str) -> str:
+    cols = []
+    for name, kind in SCHEMA[table]:
+        if dialect == "sqlite":
+            kind = kind.replace("INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+        cols.append(f"`{name}` {kind}")
+    return f"CREATE TABLE IF NOT EXISTS `{table}` ({', '.join(cols)});"
+
+
+def _sqlite_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def fill(conn, dialect: str, gen: Generator, tables=TABLE_ORDER, drop: bool = False, log=print) -> dict:
+    """Create and fill the tables; returns ``{table: rows}``."""
+    mark = "?" if dialect == "sqlite" else "%s"
+    counts = {}
+    cur = conn.cursor()
+    for table in tables:
+        if drop:
+            cur.execute(f"DROP TABLE IF EXISTS `{table}`;")
+        cur.execute(create_sql(table, dialect))
+        columns = [name for name, _ in SCHEMA[table]][1:]
+        insert = (f"INSERT INTO `{table}` ({', '.join(f'`{c}`' for c in columns)}) "
+                  f"VALUES ({', '.join([mark] * len(columns))})")
+        started, n, chunk = time.perf_counter(), 0, []
+        for row in getattr(gen, table)():
+            chunk.append(tuple(map(_sqlite_value, row)) if dialect == "sqlite" else row)
+            if len(chunk) == CHUNK_ROWS:
+                cur.executemany(insert, chunk)
+                conn.commit()
+                n += len(chunk)
+                chunk = []
+        if chunk:
+            cur.executemany(insert, chunk)
+            conn.commit()
+            n += len(chunk)
+        counts[table] = n
+        seconds = time.perf_counter() - started
+        log(f"{table:<15} {n:>12,} rows  {seconds:7.1f} s  ({n / seconds if seconds else 0:,.0f} rows/s)")
+    cur.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic ERP data")
+    add_target_args(parser)
+    parser.add_argument("--students", type=int, default=10000, help="scale (other tables follow from it)")
+    parser.add_argument("--days", type=int, default=30, help="school days of attendance per student")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drop", action="store_true", help="drop and recreate the generated tables first")
+    args = parser.parse_args()
+
+    conn, dialect = connect(args)
+    try:
+        counts = fill(conn, dialect, Generator(args.students, args.days, args.seed), drop=args.drop)
+        print(f"{'total':<15} {sum(counts.values()):>12,} rows")
+    finally:
+        conn.close()
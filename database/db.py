@@ -0,0 +1,2909 @@
+"""Data access for the ERP: connection pool, cached and instrumented loaders, writes.
+
+The Streamlit pages (DBMS.py), the command-line jobs (jobs.py) and the
+benchmarks (bench.py) all go through the functions here, so they share one
+pool, one query cache and one set of query statistics per process.
+
+Layering: only DBMS.py imports Streamlit. This module and the helper modules
+it uses (search, snapshot, timetable, scheduler, funnel, resultstats,
+importer, metadata) do not, and the helpers never open connections: db.py
+passes them rows, DataFrames or a query function. pandas, the MySQL driver
+and the helpers are only imported when first used, so ``import db`` stays
+fast for jobs that never touch them.
+"""
+from __future__ import annotations
+
+import contextvars
+import csv
+import gzip
+import functools
+import importlib.util
+import logging
+import os
+import queue
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, date
+
+
+# ========== DB CONFIG (YAHAN APNA CHANGE KARO) ==========
+DB_HOST = "localhost"
+DB_USER = "root"              # ← apna MySQL user
+DB_PASSWORD = "fazilraza" # ← apna MySQL password
+DB_NAME = "students"          # ← apna database name
+
+# ========== POOL CONFIG ==========
+DB_POOL_SIZE = 10             # max connections shared by all sessions (mysql-connector caps this at 32)
+DB_POOL_TIMEOUT = 30          # seconds to wait for a free connection before giving up
+
+# ========== WRITE QUEUE CONFIG ==========
+WRITE_QUEUE_ENABLED = True    # page form writes are committed in groups by one writer thread
+WRITE_QUEUE_MAX = 500         # queued writes before submitters wait (and fail after DB_POOL_TIMEOUT)
+WRITE_FLUSH_MS = 10           # a group takes the writes arriving this long after its first one
+WRITE_BATCH_MAX = 100         # max writes committed in one transaction
+WRITE_TIMEOUT_S = 30          # a page stops waiting for its write's acknowledgement after this
+IDEMPOTENCY_TTL_S = 600       # a repeat submit with the same key within this gets the first result
+
+# ========== READ REPLICA CONFIG ==========
+DB_REPLICAS = []              # e.g. [{"host": "10.0.0.12", "weight": 2}, {"host": "10.0.0.13", "port": 3307}]
+REPLICA_PAGES = ("Dashboard", "Results", "Rooms Utilization", "All Tables")  # pages whose reads may use a replica
+REPLICA_POOL_SIZE = 5         # connections per replica
+REPLICA_MAX_LAG_S = 30        # replicas further behind than this are skipped
+REPLICA_CHECK_S = 10          # seconds between health checks of one replica
+READ_YOUR_WRITES_S = 5        # after a write, the session (and loaders of the written tables) read the primary
+
+# ========== CACHE CONFIG ==========
+CACHE_MAX_ENTRIES = 256       # LRU bound on cached query results (all sessions together)
+CACHE_TTL = 300               # default seconds before a cached result is re-read
+CACHE_STALE_S = 600           # expired results are still served this long while the refresher re-reads them
+REFRESH_ENABLED = True        # background refresher: pre-warm WARM_LOADERS and re-read them before they expire
+REFRESH_INTERVAL_S = 10       # how often the refresher looks for warm entries close to expiry
+REFRESH_AHEAD = 0.2           # re-read a warm entry once less than this share of its TTL is left
+PAGE_ROWS = 1000              # max rows a module page lists at once
+METADATA_CHECK_S = 60         # seconds between schema-version checks (new columns/indexes, row estimates)
+UNINDEXED_WARN_ROWS = 100000  # All Tables asks before filtering/sorting this many rows without an index
+# CHAR/VARCHAR columns with few distinct values; All Tables pages show them (and ENUMs) as category
+CATEGORY_COLUMNS = ("STATUS", "GENDER", "CITY", "STATE", "SOURCE", "PAYMENT_MODE", "GRADE",
+                    "COURSE_NAME", "COURSE_INTERESTED", "SUBJECT", "DAY", "DAY_OF_WEEK")
+
+# ========== SNAPSHOT CONFIG (needs pyarrow) ==========
+SNAPSHOTS_ENABLED = True      # keep Parquet copies of fully loaded tables on local disk
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+SNAPSHOT_MAX_AGE_S = 6 * 3600 # full rebuild after this (the only way deletes made outside the app are seen)
+SNAPSHOT_UPDATED_COLUMNS = ("UPDATED_AT", "LAST_UPDATED", "MODIFIED_AT")
+BULK_CHUNK_ROWS = 500         # rows per multi-row INSERT in bulk writes
+IMPORT_CHUNK_ROWS = 2000      # file rows validated and committed per import transaction
+
+# ========== METRICS CONFIG ==========
+SLOW_QUERY_MS = 500           # statements slower than this are logged as warnings
+METRICS_PORT = None           # e.g. 9108 to serve Prometheus metrics at http://host:9108/metrics
+
+# ========== PARALLEL QUERY CONFIG ==========
+EXECUTOR_WORKERS = 8          # threads for concurrent page queries (keep <= DB_POOL_SIZE)
+QUERY_TIMEOUT_S = 10          # per-widget deadline on pages that load in parallel
+
+# ========== SEARCH CONFIG ==========
+SEARCH_TABLES = ("student", "lead")   # search boxes on these tables use the in-memory index (search.py)
+SEARCH_MAX_HITS = 1000        # best matches one search returns
+SEARCH_SYNC_S = 5             # pick up new/changed rows at most this often
+SEARCH_MAX_AGE_S = 1800       # full index rebuild after this (catches deletes made outside the app)
+
+# ========== TIMETABLE CONFIG ==========
+ROOM_OPEN = "08:00"           # rooms count as available between these times every scheduled day
+ROOM_CLOSE = "20:00"
+PERIOD_MINUTES = 60           # length of one class placed by the timetable generator
+SESSIONS_PER_WEEK = 5         # classes the generator places for every batch
+FACULTY_MAX_PER_DAY = 5       # daily class limit for faculty rows without their own limit column
+SOLVER_TIME_LIMIT_S = 10      # the generator reports classes it could not place after this
+
+logger = logging.getLogger("erp.db")
+
+
+# ========== LAZY IMPORTS / PROCESS-WIDE CACHES ==========
+def _lazy(name: str):
+    """Import ``name`` on first attribute access instead of now."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+pd = _lazy("pandas")
+funnel = _lazy("funnel")
+importer = _lazy("importer")
+metadata = _lazy("metadata")
+scheduler = _lazy("scheduler")
+resultstats = _lazy("resultstats")
+search = _lazy("search")
+timetable = _lazy("timetable")
+
+
+@functools.lru_cache(maxsize=None)
+def _mysql():
+    """The mysql.connector package (with ``pooling`` and ``errorcode`` loaded)."""
+    import mysql.connector.errorcode
+    import mysql.connector.pooling
+    return mysql.connector
+
+
+@functools.lru_cache(maxsize=None)
+def _snapshot():
+    """The snapshot module, or None when pyarrow is not installed."""
+    try:
+        import snapshot
+    except ImportError:
+        return None
+    return snapshot
+
+
+def cache_resource(func):
+    """Share one result per argument tuple across the process (what ``st.cache_resource`` did)."""
+    made, lock = {}, threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        if args not in made:
+            with lock:
+                if args not in made:
+                    made[args] = func(*args)
+        return made[args]
+
+    wrapper.clear = made.clear
+    return wrapper
+
+
+# ========== DB CONNECTION POOL ==========
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections with health-checks and metrics.
+
+    Every query checks a connection out, uses it and returns it, so concurrent
+    reruns never share a socket. Checkouts block (up to ``timeout`` seconds)
+    when all connections are busy instead of failing straight away.
+    """
+
+    def __init__(self, size: int, timeout: float, name: str = "erp_pool", **conn_args):
+        self.size = size
+        self.timeout = timeout
+        self._pool = _mysql().pooling.MySQLConnectionPool(
+            pool_name=name,
+            pool_size=size,
+            pool_reset_session=True,
+            **conn_args
+        )
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+            "wait_total_s": 0.0,
+            "wait_max_s": 0.0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "errors": 0,
+        }
+
+    def _bump(self, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                self._stats[key] += value
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._stats["in_use"])
+
+    @contextmanager
+    def connection(self):
+        """Check a healthy connection out of the pool and return it afterwards."""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._bump(timeouts=1)
+            raise TimeoutError(
+                f"No free DB connection after {self.timeout}s (pool size {self.size})."
+            )
+        waited = time.perf_counter() - started
+        conn = None
+        try:
+            conn = self._pool.get_connection()
+            # Health-check: a dropped socket (server restart, wait_timeout) is
+            # reopened here instead of failing the page.
+            if not conn.is_connected():
+                conn.reconnect(attempts=3, delay=1)
+                self._bump(reconnects=1)
+            with self._lock:
+                self._stats["wait_max_s"] = max(self._stats["wait_max_s"], waited)
+            self._bump(checkouts=1, in_use=1, wait_total_s=waited)
+            try:
+                yield conn
+            except Exception:
+                self._bump(errors=1)
+                if conn.is_connected():
+                    conn.rollback()
+                raise
+            finally:
+                self._bump(in_use=-1)
+        finally:
+            if conn is not None:
+                conn.close()  # returns the connection to the pool
+            self._slots.release()
+
+    def metrics(self) -> dict:
+        """Snapshot of pool counters (wait times in milliseconds)."""
+        with self._lock:
+            stats = dict(self._stats)
+        checkouts = stats["checkouts"] or 1
+        return {
+            "pool_size": self.size,
+            "in_use": stats["in_use"],
+            "peak_in_use": stats["peak_in_use"],
+            "checkouts": stats["checkouts"],
+            "avg_wait_ms": round(stats["wait_total_s"] / checkouts * 1000, 2),
+            "max_wait_ms": round(stats["wait_max_s"] * 1000, 2),
+            "timeouts": stats["timeouts"],
+            "reconnects": stats["reconnects"],
+            "errors": stats["errors"],
+        }
+
+
+@cache_resource
+def get_pool() -> ConnectionPool:
+    return ConnectionPool(
+        DB_POOL_SIZE,
+        DB_POOL_TIMEOUT,
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME
+    )
+
+
+def get_connection():
+    """Context manager yielding a pooled connection: ``with get_connection() as conn:``."""
+    return get_pool().connection()
+
+
+# ========== READ REPLICAS ==========
+_current_session = contextvars.ContextVar("erp_session", default="-")
+_read_primary = contextvars.ContextVar("erp_read_primary", default=False)
+_recent_writes = {}             # ("session", id) / ("table", name) -> monotonic time of the last write
+_recent_writes_lock = threading.Lock()
+
+
+def set_session(session_id: str):
+    """Identify the browser session running in this context (for read-your-writes)."""
+    _current_session.set(session_id)
+
+
+def note_write(tables):
+    """Remember that this session wrote ``tables`` (None: unknown, i.e. any table)."""
+    now = time.monotonic()
+    with _recent_writes_lock:
+        if len(_recent_writes) > 1000:
+            for key in [k for k, t in _recent_writes.items() if now - t > READ_YOUR_WRITES_S]:
+                del _recent_writes[key]
+        _recent_writes[("session", _current_session.get())] = now
+        for table in tables:
+            _recent_writes[("table", table)] = now
+
+
+def wrote_recently(tables=()) -> bool:
+    """Whether this session, or anyone on one of ``tables``, wrote within READ_YOUR_WRITES_S."""
+    since = time.monotonic() - READ_YOUR_WRITES_S
+    keys = [("session", _current_session.get()), ("table", None)] + [("table", t) for t in tables]
+    with _recent_writes_lock:
+        return any(_recent_writes.get(key, since) > since for key in keys)
+
+
+def on_primary(func, *args, **kwargs):
+    """Call ``func`` with every read in it going to the primary."""
+    token = _read_primary.set(True)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _read_primary.reset(token)
+
+
+class Replica:
+    """One DB_REPLICAS entry: its pool (opened on first use) and health state."""
+
+    def __init__(self, index: int, spec: dict):
+        self.conn_args = {
+            "host": spec["host"],
+            "port": spec.get("port", 3306),
+            "user": spec.get("user", DB_USER),
+            "password": spec.get("password", DB_PASSWORD),
+            "database": spec.get("database", DB_NAME),
+        }
+        self.name = f"{self.conn_args['host']}:{self.conn_args['port']}"
+        self.pool_name = f"erp_replica_{index}"
+        self.weight = spec.get("weight", 1)
+        self.current = 0                # smooth weighted round-robin counter
+        self.healthy = True
+        self.lag_s = None
+        self.next_check = 0.0
+        self.reads = 0
+        self.failures = 0
+        self.checking = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def connection(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ConnectionPool(REPLICA_POOL_SIZE, DB_POOL_TIMEOUT, self.pool_name, **self.conn_args)
+        return self._pool.connection()
+
+
+class ReplicaRouter:
+    """Spreads reads over DB_REPLICAS by smooth weighted round-robin.
+
+    Each replica is health-checked at most every ``check_every`` seconds by
+    whichever read comes along (the others do not wait for it). A replica
+    that is unreachable, has replication stopped or is more than ``max_lag``
+    seconds behind is skipped until a later check passes; with none
+    healthy, reads go to the primary.
+    """
+
+    def __init__(self, replicas: list, max_lag: float, check_every: float):
+        self.replicas = [Replica(i, spec) for i, spec in enumerate(replicas)]
+        self.max_lag = max_lag
+        self.check_every = check_every
+        self._lock = threading.Lock()
+
+    def pick(self):
+        """The replica for the next read, or None for the primary."""
+        now = time.monotonic()
+        for replica in self.replicas:
+            if now >= replica.next_check and replica.checking.acquire(blocking=False):
+                try:
+                    self._check(replica)
+                finally:
+                    replica.checking.release()
+        with self._lock:
+            healthy = [r for r in self.replicas if r.healthy]
+            if not healthy:
+                return None
+            for replica in healthy:
+                replica.current += replica.weight
+            best = max(healthy, key=lambda r: r.current)
+            best.current -= sum(r.weight for r in healthy)
+            best.reads += 1
+        return best
+
+    def _check(self, replica: Replica):
+        try:
+            with replica.connection() as conn:
+                cur = conn.cursor(dictionary=True)
+                try:
+                    status = {}
+                    # MySQL 8.0.22+ / older MySQL and MariaDB; without the
+                    # REPLICATION CLIENT privilege the lag is unknown and taken as 0.
+                    for statement in ("SHOW REPLICA STATUS;", "SHOW SLAVE STATUS;"):
+                        try:
+                            cur.execute(statement)
+                            status = (cur.fetchall() or [{}])[0]
+                            break
+                        except _mysql().Error:
+                            continue
+                finally:
+                    cur.close()
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master", 0)) if status else 0
+            healthy = lag is not None and lag <= self.max_lag
+            reason = "replication stopped" if lag is None else f"{lag}s behind"
+        except Exception as e:
+            lag, healthy, reason = None, False, str(e)
+        self._set_health(replica, healthy, lag, reason)
+
+    def failed(self, replica: Replica, error):
+        """A checkout failed: skip the replica until its next health check."""
+        with self._lock:
+            replica.failures += 1
+        self._set_health(replica, False, replica.lag_s, str(error))
+
+    def _set_health(self, replica: Replica, healthy: bool, lag, reason: str):
+        with self._lock:
+            changed = healthy != replica.healthy
+            replica.healthy, replica.lag_s = healthy, lag
+            replica.next_check = time.monotonic() + self.check_every
+        if changed:
+            logger.warning("replica %s %s (%s)", replica.name, "back in rotation" if healthy else "skipped", reason)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                r.name: {"healthy": r.healthy, "lag_s": r.lag_s, "weight": r.weight,
+                         "reads": r.reads, "failures": r.failures}
+                for r in self.replicas
+            }
+
+
+@cache_resource
+def get_replica_router() -> ReplicaRouter:
+    return ReplicaRouter(DB_REPLICAS, REPLICA_MAX_LAG_S, REPLICA_CHECK_S)
+
+
+def replica_metrics() -> dict:
+    """Per-replica health and read counts ({} without DB_REPLICAS)."""
+    return get_replica_router().metrics() if DB_REPLICAS else {}
+
+
+@contextmanager
+def get_read_connection():
+    """Like get_connection(), but on a replica for reads that may use one.
+
+    That is: DB_REPLICAS is set, the current page is in REPLICA_PAGES, the
+    read is not pinned with on_primary() and this session has not written
+    within READ_YOUR_WRITES_S. A replica whose checkout fails is marked down
+    and the read goes to the primary.
+    """
+    replica = None
+    if (DB_REPLICAS and not _read_primary.get() and _current_page.get() in REPLICA_PAGES
+            and not wrote_recently()):
+        replica = get_replica_router().pick()
+    with ExitStack() as stack:
+        conn = None
+        if replica is not None:
+            try:
+                conn = stack.enter_context(replica.connection())
+            except Exception as e:
+                get_replica_router().failed(replica, e)
+        if conn is None:
+            conn = stack.enter_context(get_connection())
+        yield conn
+
+
+def configure(**settings):
+    """Override module settings (``DB_HOST=...``, ``DB_PASSWORD=...``, ...) before use.
+
+    Jobs and benchmarks call this with their command-line options; the pool
+    and every cache are dropped so the next query uses the new settings.
+    """
+    for name, value in settings.items():
+        if not name.isupper() or name not in globals():
+            raise ValueError(f"Unknown setting: {name}")
+        globals()[name] = value
+    for cached in (get_pool, get_replica_router, get_table_cache, get_schema_registry, get_table_search):
+        cached.clear()
+
+
+# ========== QUERY INSTRUMENTATION ==========
+_current_page = contextvars.ContextVar("erp_page", default="-")
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+
+
+def set_page(name: str):
+    """Label the statements run from now on in this context (page name, job name)."""
+    _current_page.set(name)
+
+
+def fingerprint(query: str) -> str:
+    """Normalise a statement so the same query with different literals groups together."""
+    return _LITERALS.sub("?", " ".join(query.split())).rstrip(" ;")
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _estimate_bytes(rows, sample: int = 100) -> int:
+    """Approximate payload size from the first ``sample`` rows (cheap for big results)."""
+    if not rows:
+        return 0
+    head = rows[:sample]
+    size = sum(
+        len(v) if isinstance(v, (str, bytes)) else 8
+        for row in head
+        for v in (row.values() if isinstance(row, dict) else row)
+    )
+    return int(size * len(rows) / len(head))
+
+
+class QueryStats:
+    """In-memory per-statement metrics: latency percentiles over a rolling window,
+    rows, bytes, errors, calling pages, plus cache hit/miss per loader."""
+
+    def __init__(self, window: int = 500, keep_slowest: int = 50):
+        self.window = window
+        self.keep_slowest = keep_slowest
+        self._lock = threading.Lock()
+        self._queries = {}      # fingerprint -> counters + deque of latencies
+        self._slowest = []      # [(seconds, query, params, page, at)]
+        self._cache = {}        # (loader, page) -> [hits, misses]
+
+    def record(self, query: str, params, seconds: float, rows: int = 0, nbytes: int = 0, error=None):
+        key = fingerprint(query)
+        page = _current_page.get()
+        with self._lock:
+            q = self._queries.get(key)
+            if q is None:
+                q = self._queries[key] = {
+                    "latencies": deque(maxlen=self.window), "count": 0, "errors": 0,
+                    "total_s": 0.0, "rows": 0, "bytes": 0, "pages": set(),
+                }
+            q["latencies"].append(seconds)
+            q["count"] += 1
+            q["total_s"] += seconds
+            q["rows"] += rows
+            q["bytes"] += nbytes
+            q["errors"] += error is not None
+            q["pages"].add(page)
+            if len(self._slowest) < self.keep_slowest or seconds > self._slowest[-1][0]:
+                self._slowest.append((seconds, query, params, page, datetime.now()))
+                self._slowest.sort(key=lambda item: item[0], reverse=True)
+                del self._slowest[self.keep_slowest:]
+        if error is not None:
+            logger.error("query failed on page %s: %s (%s)", page, key, error)
+        elif seconds * 1000 >= SLOW_QUERY_MS:
+            logger.warning("slow query on page %s: %.0f ms, %d rows: %s", page, seconds * 1000, rows, key)
+
+    def record_cache(self, loader: str, hit: bool):
+        with self._lock:
+            counts = self._cache.setdefault((loader, _current_page.get()), [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def summary(self) -> pd.DataFrame:
+        with self._lock:
+            items = [(k, dict(v, latencies=sorted(v["latencies"]))) for k, v in self._queries.items()]
+        out = []
+        for key, q in items:
+            lat = q["latencies"]
+            out.append({
+                "query": key,
+                "count": q["count"],
+                "p50_ms": round(_percentile(lat, 0.50) * 1000, 1),
+                "p95_ms": round(_percentile(lat, 0.95) * 1000, 1),
+                "p99_ms": round(_percentile(lat, 0.99) * 1000, 1),
+                "max_ms": round((lat[-1] if lat else 0) * 1000, 1),
+                "avg_rows": round(q["rows"] / q["count"], 1),
+                "total_kb": round(q["bytes"] / 1024, 1),
+                "errors": q["errors"],
+                "pages": ", ".join(sorted(q["pages"])),
+            })
+        return pd.DataFrame(out)
+
+    def slowest(self, n: int = 10) -> list:
+        with self._lock:
+            return list(self._slowest[:n])
+
+    def cache_summary(self) -> pd.DataFrame:
+        with self._lock:
+            items = list(self._cache.items())
+        return pd.DataFrame(
+            [{"loader": loader, "page": page, "hits": h, "misses": m} for (loader, page), (h, m) in items]
+        )
+
+    def prometheus_text(self, pool: dict = None, cache: dict = None, writes: dict = None,
+                        replicas: dict = None) -> str:
+        """Render metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP erp_query_duration_seconds Statement latency over the rolling window.",
+            "# TYPE erp_query_duration_seconds summary",
+        ]
+        with self._lock:
+            items = [(k, sorted(v["latencies"]), v["count"], v["total_s"], v["errors"], v["rows"])
+                     for k, v in self._queries.items()]
+            cache_items = list(self._cache.items())
+        for key, lat, count, total, errors, rows in items:
+            label = key[:120].replace("\\", "\\\\").replace('"', '\\"')
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'erp_query_duration_seconds{{query="{label}",quantile="{q}"}} {_percentile(lat, q):.6f}')
+            lines.append(f'erp_query_duration_seconds_count{{query="{label}"}} {count}')
+            lines.append(f'erp_query_duration_seconds_sum{{query="{label}"}} {total:.6f}')
+            lines.append(f'erp_query_errors_total{{query="{label}"}} {errors}')
+            lines.append(f'erp_query_rows_total{{query="{label}"}} {rows}')
+        for (loader, page), (hits, misses) in cache_items:
+            lines.append(f'erp_loader_cache_hits_total{{loader="{loader}",page="{page}"}} {hits}')
+            lines.append(f'erp_loader_cache_misses_total{{loader="{loader}",page="{page}"}} {misses}')
+        for prefix, metrics in (("erp_pool_", pool or {}), ("erp_cache_", cache or {}),
+                                ("erp_write_queue_", writes or {})):
+            for name, value in metrics.items():
+                lines.append(f"{prefix}{name} {value}")
+        for name, replica in (replicas or {}).items():
+            lines.append(f'erp_replica_healthy{{replica="{name}"}} {int(replica["healthy"])}')
+            if replica["lag_s"] is not None:
+                lines.append(f'erp_replica_lag_seconds{{replica="{name}"}} {replica["lag_s"]}')
+            lines.append(f'erp_replica_reads_total{{replica="{name}"}} {replica["reads"]}')
+            lines.append(f'erp_replica_failures_total{{replica="{name}"}} {replica["failures"]}')
+        return "\n".join(lines) + "\n"
+
+
+@cache_resource
+def get_query_stats() -> QueryStats:
+    return QueryStats()
+
+
+@contextmanager
+def instrumented(query: str, params=None):
+    """Time a statement; the caller fills ``probe["rows"]`` / ``probe["bytes"]``."""
+    probe = {"rows": 0, "bytes": 0}
+    started = time.perf_counter()
+    try:
+        yield probe
+    except Exception as e:
+        get_query_stats().record(query, params, time.perf_counter() - started, error=e)
+        raise
+    get_query_stats().record(
+        query, params, time.perf_counter() - started, probe["rows"], probe["bytes"]
+    )
+
+
+@cache_resource
+def start_metrics_server(port: int):
+    """Serve ``/metrics`` in Prometheus text format from a daemon thread (once per process)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    stats, pool, cache = get_query_stats(), get_pool(), get_table_cache()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = stats.prometheus_text(
+                pool.metrics(), {**cache.metrics(), **refresher_metrics()}, write_queue_metrics(),
+                replica_metrics()
+            ).encode("utf-8")
+            self.send_response(200 if self.path == "/metrics" else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.end_headers()
+            if self.path == "/metrics":
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="erp-metrics", daemon=True).start()
+    return server
+
+
+# ========== TABLE-AWARE QUERY CACHE ==========
+class TableCache:
+    """Process-wide LRU + TTL cache whose entries remember the tables they read.
+
+    Writes invalidate only the entries that depend on the written table, so
+    updating a lead keeps the cached student/attendance data warm. Expired
+    entries are kept ``stale_s`` seconds longer for callers that accept a stale
+    result while it is re-read (see CacheRefresher); invalidated ones are not.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, stale_s: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_s = stale_s
+        self._entries = OrderedDict()   # key -> (value, tables, expires_at, ttl)
+        self._by_table = {}             # table -> set of keys
+        self._versions = {}             # table -> times invalidated, see version()
+        self._cleared = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0,
+                       "discarded_loads": 0}
+
+    def _drop(self, key):
+        tables = self._entries.pop(key)[1]
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get(self, key, allow_stale: bool = False):
+        """Return ``(found, value, stale)``; expired entries only count with ``allow_stale``."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] + self.stale_s < now:
+                self._drop(key)
+                entry = None
+            stale = entry is not None and entry[2] < now
+            if entry is None or (stale and not allow_stale):
+                self._stats["misses"] += 1
+                return False, None, False
+            self._entries.move_to_end(key)
+            self._stats["stale_hits" if stale else "hits"] += 1
+            return True, entry[0], stale
+
+    def peek(self, key):
+        """``(found, value)`` for an unexpired entry, without touching LRU order or counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                return False, None
+            return True, entry[0]
+
+    def expires_in(self, key):
+        """``(seconds left, ttl)`` of an entry (negative while stale), or None if absent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else (entry[2] - time.monotonic(), entry[3])
+
+    def version(self, tables) -> int:
+        """Grows whenever a write invalidates one of ``tables``; pass it to ``set(seen=...)``."""
+        with self._lock:
+            return self._cleared + sum(self._versions.get(t, 0) for t in set(tables))
+
+    def set(self, key, value, tables, ttl: float = None, seen: int = None) -> bool:
+        """Store ``value``, replacing any older entry in one step.
+
+        ``seen`` is ``version(tables)`` taken before the value was read; if a
+        write invalidated those tables meanwhile the value is discarded, so a
+        slow read never puts data older than the write back into the cache.
+        """
+        tables = frozenset(tables)
+        ttl = ttl or self.ttl
+        with self._lock:
+            if seen is not None and seen != self._cleared + sum(self._versions.get(t, 0) for t in tables):
+                self._stats["discarded_loads"] += 1
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, tables, time.monotonic() + ttl, ttl)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate(self, *tables) -> list:
+        """Drop the entries reading ``tables``; returns their keys."""
+        dropped = []
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+                    dropped.append(key)
+                    self._stats["invalidations"] += 1
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._cleared += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+@cache_resource
+def get_table_cache() -> TableCache:
+    return TableCache(CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_STALE_S)
+
+
+_loading = {}                   # cache key -> lock held by the thread loading it
+_loading_lock = threading.Lock()
+
+
+def _load_into_cache(key, load, deps, ttl, force: bool = False):
+    """Run ``load()`` and cache its result, one thread per key at a time.
+
+    Threads missing the same key wait for the one already loading it and take
+    its result instead of running the query again. ``force`` re-reads even if
+    a fresh entry exists (the refresher).
+    """
+    cache = get_table_cache()
+    with _loading_lock:
+        lock = _loading.setdefault(key, threading.Lock())
+    with lock:
+        try:
+            if not force:
+                found, value = cache.peek(key)
+                if found:
+                    return value
+            seen = cache.version(deps)
+            value = load()
+            cache.set(key, value, deps, ttl, seen=seen)
+            return value
+        finally:
+            with _loading_lock:
+                if _loading.get(key) is lock:
+                    del _loading[key]
+
+
+def table_cached(tables, ttl: float = None):
+    """Cache a loader's result in the shared TableCache.
+
+    ``tables`` is either a tuple of table names the query reads, or a callable
+    receiving the loader's arguments and returning them (e.g. for
+    ``get_table_df(table_name)``). DataFrames are copied on the way out so
+    callers can modify them freely, like with ``st.cache_data``. While the
+    refresher runs, an expired result is returned at once and re-read in the
+    background. ``loader.refresh(*args)`` re-reads and replaces an entry.
+    """
+    def decorator(func):
+        def cache_key(*args, **kwargs):
+            return (func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+        def load(args, kwargs, force=False):
+            deps = tables(*args, **kwargs) if callable(tables) else tables
+            fetch = functools.partial(func, *args, **kwargs)
+            if DB_REPLICAS and wrote_recently(deps):
+                # A lagging replica would put pre-write data back into the shared cache.
+                fetch = functools.partial(on_primary, fetch)
+            return _load_into_cache(cache_key(*args, **kwargs), fetch, deps, ttl, force)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            refresher = _refresher
+            key = cache_key(*args, **kwargs)
+            found, value, stale = get_table_cache().get(key, allow_stale=refresher is not None)
+            get_query_stats().record_cache(func.__qualname__, found)
+            if stale:
+                refresher.request(key, functools.partial(wrapper.refresh, *args, **kwargs))
+            elif not found:
+                value = load(args, kwargs)
+            return value.copy() if isinstance(value, pd.DataFrame) else value
+
+        wrapper.cache_key = cache_key
+        wrapper.refresh = lambda *args, **kwargs: load(args, kwargs, force=True)
+        return wrapper
+    return decorator
+
+
+# ========== BACKGROUND CACHE REFRESH ==========
+class CacheRefresher:
+    """One daemon thread that keeps cached loader results warm.
+
+    Tracked loaders (WARM_LOADERS) are loaded when the thread starts, re-read
+    once less than ``ahead`` of their TTL is left and re-read right after a
+    write invalidates them. A stale hit on any loader queues that entry too,
+    while the page gets the stale result straight away. New results replace
+    old ones in a single ``TableCache.set``, so a rerun sees either version
+    and never waits on MySQL for data that is already cached.
+    """
+
+    def __init__(self, interval: float, ahead: float):
+        self.interval = interval
+        self.ahead = ahead
+        self._tracked = {}          # cache key -> reload callable
+        self._queue = deque()       # (key, reload) waiting to be re-read
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._stats = {"refreshes": 0, "failures": 0, "refresh_total_s": 0.0}
+
+    def track(self, loader, *args, **kwargs):
+        """Keep ``loader(*args, **kwargs)`` (a table_cached loader) warm from now on."""
+        key = loader.cache_key(*args, **kwargs)
+        reload = functools.partial(loader.refresh, *args, **kwargs)
+        with self._cond:
+            self._tracked[key] = reload
+        self.request(key, reload)
+
+    def request(self, key, reload):
+        """Queue one entry for re-reading (no-op if it is already queued)."""
+        with self._cond:
+            if key not in self._queued:
+                self._queued.add(key)
+                self._queue.append((key, reload))
+                self._cond.notify()
+
+    def rewarm(self, keys=None):
+        """Queue the tracked entries among ``keys`` (all of them if None)."""
+        with self._cond:
+            items = [(k, r) for k, r in self._tracked.items() if keys is None or k in keys]
+        for key, reload in items:
+            self.request(key, reload)
+
+    def _queue_due(self):
+        # Entries a page never managed to load are left to the pages.
+        cache = get_table_cache()
+        with self._cond:
+            tracked = list(self._tracked.items())
+        for key, reload in tracked:
+            left = cache.expires_in(key)
+            if left is not None and left[0] < self.ahead * left[1]:
+                self.request(key, reload)
+
+    def _run(self):
+        set_page("refresher")
+        next_scan = time.monotonic() + self.interval
+        while True:
+            with self._cond:
+                while not self._queue and time.monotonic() < next_scan:
+                    self._cond.wait(max(next_scan - time.monotonic(), 0))
+                key, reload = self._queue.popleft() if self._queue else (None, None)
+                # Requests arriving while it is re-read (e.g. a write) queue it again.
+                self._queued.discard(key)
+            if time.monotonic() >= next_scan:
+                self._queue_due()
+                next_scan = time.monotonic() + self.interval
+            if reload is None:
+                continue
+            started = time.perf_counter()
+            try:
+                reload()
+                self._bump(refreshes=1)
+            except Exception as e:
+                self._bump(failures=1)
+                logger.warning("background refresh of %s%r failed: %s", key[0], key[1], e)
+            self._bump(refresh_total_s=time.perf_counter() - started)
+
+    def _bump(self, **changes):
+        with self._cond:
+            for name, value in changes.items():
+                self._stats[name] += value
+
+    def start(self):
+        threading.Thread(target=self._run, name="erp-cache-refresher", daemon=True).start()
+
+    def metrics(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats, tracked=len(self._tracked), queued=len(self._queue))
+        runs = (stats["refreshes"] + stats["failures"]) or 1
+        stats["avg_refresh_ms"] = round(stats.pop("refresh_total_s") / runs * 1000, 1)
+        return stats
+
+
+_refresher = None               # the running CacheRefresher, set by start_cache_refresher()
+
+
+@cache_resource
+def start_cache_refresher() -> CacheRefresher:
+    """Start the background refresher (once per process) and pre-warm WARM_LOADERS."""
+    global _refresher
+    pd.DataFrame    # LazyLoader is not thread-safe before Python 3.12: finish importing pandas first
+    refresher = CacheRefresher(REFRESH_INTERVAL_S, REFRESH_AHEAD)
+    refresher.start()
+    for loader, args, kwargs in WARM_LOADERS:
+        refresher.track(loader, *args, **kwargs)
+    _refresher = refresher
+    return refresher
+
+
+def refresher_metrics() -> dict:
+    """Refresher counters, or {} when it is not running (jobs, benchmarks)."""
+    return {} if _refresher is None else {f"refresher_{k}": v for k, v in _refresher.metrics().items()}
+
+
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?",
+    re.IGNORECASE
+)
+
+
+def written_table(query: str):
+    """Name of the table a write statement modifies (None if not recognised)."""
+    match = _WRITE_TARGET.match(query)
+    return match.group(1) if match else None
+
+
+def invalidate_tables(*tables):
+    dropped = get_table_cache().invalidate(*tables)
+    if _refresher is not None:
+        _refresher.rewarm(set(dropped))
+
+
+def after_write(*queries):
+    """Invalidate cached results for the tables the statements wrote.
+
+    A DELETE, or any change to existing rows of a table without an updated-at
+    column, is invisible to an incremental snapshot sync, so the table's disk
+    snapshot is then marked for a full rebuild.
+    """
+    tables = {written_table(q) for q in queries}
+    note_write(tables)
+    if None in tables:
+        get_table_cache().clear()
+        if _refresher is not None:
+            _refresher.rewarm()
+    else:
+        invalidate_tables(*tables)
+    for table in tables & set(SEARCH_TABLES):
+        try:
+            get_table_search(table).stale = True    # new rows are picked up on the next lookup
+        except Exception as e:
+            logger.warning("search index of %s unavailable: %s", table, e)
+    snapshot = _snapshot()
+    if snapshot is not None:
+        for q in queries:
+            head = q.lstrip().upper()
+            table = written_table(q)
+            if not table or (head.startswith("INSERT") and "ON DUPLICATE KEY" not in head):
+                continue
+            try:
+                tracks_updates = not head.startswith(("DELETE", "REPLACE", "TRUNCATE")) \
+                    and snapshot_keys(table)[1] is not None
+            except Exception:
+                tracks_updates = False
+            if not tracks_updates:
+                snapshot.mark_dirty(SNAPSHOT_DIR, table)
+
+
+_query_timeout_ms = contextvars.ContextVar("erp_query_timeout_ms", default=None)
+_SELECT_HEAD = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+def run_query(query, params=None):
+    timeout_ms = _query_timeout_ms.get()
+    if timeout_ms:
+        # Server-side deadline so an abandoned slow aggregate stops using a connection.
+        query = _SELECT_HEAD.sub(f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */", query, count=1)
+    with instrumented(query, params) as probe:
+        with get_read_connection() as conn:
+            cur = conn.cursor(dictionary=True)
+            try:
+                cur.execute(query, params or ())
+                rows = cur.fetchall()
+            finally:
+                cur.close()
+        probe["rows"], probe["bytes"] = len(rows), _estimate_bytes(rows)
+    return rows
+
+
+def run_execute(query, params=None):
+    with instrumented(query, params) as probe:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(query, params or ())
+                conn.commit()
+                probe["rows"] = cur.rowcount
+            finally:
+                cur.close()
+    after_write(query)
+
+
+def explain(query: str, params=None) -> pd.DataFrame:
+    return pd.DataFrame(run_query(f"EXPLAIN {query}", params))
+
+
+def run_transaction(statements):
+    """Run ``[(query, params), ...]`` in one transaction (all or nothing)."""
+    if not statements:
+        return
+    label = f"/* transaction x{len(statements)} */ {statements[0][0]}"
+    with instrumented(label) as probe:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            try:
+                conn.start_transaction()
+                for query, params in statements:
+                    cur.execute(query, params or ())
+                    probe["rows"] += max(cur.rowcount, 0)
+                conn.commit()
+            finally:
+                cur.close()
+    after_write(*(query for query, _ in statements))
+
+
+def bulk_upsert(table_name: str, columns, rows, update_columns=(), chunk_size: int = BULK_CHUNK_ROWS,
+                before_commit=None) -> dict:
+    """Write many rows in ONE transaction using chunked multi-row INSERTs.
+
+    ``update_columns`` turns the statement into INSERT ... ON DUPLICATE KEY
+    UPDATE for those columns. A chunk that fails is rolled back to a savepoint
+    and retried row by row, so good rows are still saved and each bad row is
+    reported as ``(row_index, error)``. ``before_commit(cursor, written, errors)``
+    may run extra statements in the same transaction (e.g. a rollup recount).
+    Returns ``{"written": int, "errors": [...], "seconds": float}``.
+    """
+    cols_sql = ", ".join(f"`{c}`" for c in columns)
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    upsert = ""
+    if update_columns:
+        upsert = " ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"`{c}` = VALUES(`{c}`)" for c in update_columns
+        )
+    insert = f"INSERT INTO `{table_name}` ({cols_sql}) VALUES "
+
+    rows = [tuple(r) for r in rows]
+    written, errors = 0, []
+    started = time.perf_counter()
+    with instrumented(f"{insert}(bulk){upsert}") as probe, get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            conn.start_transaction()
+            for offset in range(0, len(rows), chunk_size):
+                chunk = rows[offset:offset + chunk_size]
+                cur.execute("SAVEPOINT bulk_chunk;")
+                try:
+                    cur.execute(
+                        insert + ", ".join([row_sql] * len(chunk)) + upsert + ";",
+                        [value for row in chunk for value in row]
+                    )
+                    written += len(chunk)
+                except _mysql().Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT bulk_chunk;")
+                    for i, row in enumerate(chunk, start=offset):
+                        cur.execute("SAVEPOINT bulk_row;")
+                        try:
+                            cur.execute(insert + row_sql + upsert + ";", row)
+                            written += 1
+                        except _mysql().Error as e:
+                            cur.execute("ROLLBACK TO SAVEPOINT bulk_row;")
+                            errors.append((i, str(e)))
+            if before_commit:
+                before_commit(cur, written, errors)
+            conn.commit()
+            probe["rows"] = written
+        finally:
+            cur.close()
+    after_write(insert + upsert)
+    return {"written": written, "errors": errors, "seconds": time.perf_counter() - started}
+
+
+@table_cached(lambda table_name: (table_name,))
+def get_table_df(table_name: str) -> pd.DataFrame:
+    df = None
+    if snapshots_available():
+        try:
+            df = load_table_snapshot(table_name)
+        except Exception as e:
+            logger.warning("snapshot of %s unavailable, reading MySQL: %s", table_name, e)
+    if df is None:
+        query = f"SELECT * FROM `{table_name}`;"
+        with instrumented(query) as probe:
+            with get_read_connection() as conn:
+                df = pd.read_sql(query, conn)
+            probe["rows"], probe["bytes"] = len(df), int(df.memory_usage(deep=True).sum())
+    before = int(df.memory_usage(deep=True).sum())
+    df = compact_frame(df, table_name)
+    after = int(df.memory_usage(deep=True).sum())
+    get_memory_report()[table_name] = {
+        "rows": len(df),
+        "before_kb": round(before / 1024, 1),
+        "after_kb": round(after / 1024, 1),
+        "saved_pct": round(100 * (1 - after / before), 1) if before else 0.0,
+    }
+    return df
+
+
+# ========== SCHEMA METADATA (metadata.py) ==========
+# Changes whenever a column or index is added, dropped or altered (or a table created / dropped).
+SCHEMA_VERSION_QUERY = """
+    SELECT
+        (SELECT CONCAT(COUNT(*), ':', IFNULL(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME,
+                    ORDINAL_POSITION, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, COLUMN_KEY, EXTRA))), 0))
+         FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s) AS columns_version,
+        (SELECT CONCAT(COUNT(*), ':', IFNULL(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, INDEX_NAME,
+                    SEQ_IN_INDEX, COLUMN_NAME, NON_UNIQUE))), 0))
+         FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s) AS indexes_version;
+"""
+SCHEMA_QUERIES = {
+    "tables": """
+        SELECT TABLE_NAME, TABLE_ROWS
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s;
+    """,
+    "columns": """
+        SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT,
+               EXTRA, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE, COLUMN_KEY
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s
+        ORDER BY TABLE_NAME, ORDINAL_POSITION;
+    """,
+    "indexes": """
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;
+    """,
+}
+
+
+class SchemaRegistry:
+    """Process-wide metadata.Schema of DB_NAME, reloaded only when its version changes.
+
+    ``current()`` checks the schema version (two aggregate queries) and
+    refreshes the row estimates at most every ``check_every`` seconds; the
+    full column/index load only runs when the version differs. One caller
+    does the check while the others keep using the loaded copy, and a new
+    Schema object replaces the old one in a single assignment.
+    """
+
+    def __init__(self, check_every: float):
+        self.check_every = check_every
+        self._schema = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def current(self) -> metadata.Schema:
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=self._schema is None):
+            try:
+                if time.monotonic() >= self._next_check:
+                    self._refresh()
+            except Exception as e:
+                if self._schema is None:
+                    raise
+                logger.warning("schema version check failed, keeping loaded metadata: %s", e)
+                self._next_check = time.monotonic() + self.check_every
+            finally:
+                self._lock.release()
+        return self._schema
+
+    def _refresh(self):
+        version = tuple(run_query(SCHEMA_VERSION_QUERY, (DB_NAME, DB_NAME))[0].values())
+        tables = run_query(SCHEMA_QUERIES["tables"], (DB_NAME,))
+        old = self._schema
+        if old is not None and old.version == version:
+            self._schema = old.with_row_estimates(tables)
+        else:
+            self._schema = metadata.build(
+                version, tables,
+                run_query(SCHEMA_QUERIES["columns"], (DB_NAME,)),
+                run_query(SCHEMA_QUERIES["indexes"], (DB_NAME,)),
+            )
+            self.loads += 1
+            if old is not None:
+                # Cached pages and search indexes may rely on the old columns.
+                logger.info("schema of %s changed, metadata reloaded", DB_NAME)
+                get_table_cache().clear()
+                get_table_search.clear()
+        self._next_check = time.monotonic() + self.check_every
+
+    def expire(self):
+        """Check the version on the next ``current()`` (after DDL run by the app itself)."""
+        self._next_check = 0.0
+
+
+@cache_resource
+def get_schema_registry() -> SchemaRegistry:
+    return SchemaRegistry(METADATA_CHECK_S)
+
+
+def get_metadata() -> metadata.Schema:
+    """Tables, columns, keys, indexes and row estimates of DB_NAME (see metadata.py)."""
+    return get_schema_registry().current()
+
+
+def get_table_info(table_name: str):
+    """metadata.Table for ``table_name``, or None if there is no such table."""
+    return get_metadata().table(table_name)
+
+
+def get_all_tables() -> list:
+    """Return all table names from current DB."""
+    return list(get_metadata().table_names)
+
+
+def get_table_columns(table_name: str) -> list:
+    """Column names of a table in ordinal order (also used as an identifier whitelist)."""
+    info = get_table_info(table_name)
+    return list(info.column_names) if info else []
+
+
+def get_table_schema(table_name: str) -> list:
+    """information_schema.COLUMNS rows (type, nullability, default, length, precision) for a table."""
+    info = get_table_info(table_name)
+    return [c.as_row() for c in info.columns] if info else []
+
+
+def keyset_column(table_name: str):
+    """Single-column primary key the viewer can page by (``WHERE key > last``), or None."""
+    info = get_table_info(table_name)
+    return info.single_key if info else None
+
+
+def scan_warnings(table_name: str, search_text: str = "", filters: tuple = (), order_by: str = None) -> list:
+    """Reasons a viewer query would read the whole table, for tables over UNINDEXED_WARN_ROWS."""
+    info = get_table_info(table_name)
+    if info is None or (info.row_estimate or 0) < UNINDEXED_WARN_ROWS:
+        return []
+    rows = f"~{info.row_estimate:,}"
+    warnings = []
+    if search_text.strip() and table_name not in SEARCH_TABLES:
+        warnings.append(f"Search compares every column with LIKE, reading all {rows} rows.")
+    for column, op, _ in filters:
+        if op == "contains":
+            warnings.append(f"'contains' on {column} cannot use an index, reading all {rows} rows.")
+        elif not info.indexed(column):
+            warnings.append(f"{column} is not indexed: filtering on it reads all {rows} rows.")
+    if order_by and not info.indexed(order_by):
+        warnings.append(f"{order_by} is not indexed: sorting on it reads and sorts all {rows} rows.")
+    return warnings
+
+
+# ========== GROUP-COMMIT WRITE QUEUE ==========
+class _QueuedWrite:
+    __slots__ = ("work", "label", "key", "written", "future", "context", "queued_at")
+
+    def __init__(self, work, label: str, key, written=None):
+        self.work = work
+        self.label = label
+        self.key = key
+        self.written = written      # queries for after_write, or a function of the result
+        self.future = Future()
+        self.context = contextvars.copy_context()   # submitting page, for the query statistics
+        self.queued_at = time.perf_counter()
+
+
+class WriteQueue:
+    """Bounded queue of form writes, committed in groups by one writer thread.
+
+    Each submitted write is a ``work(cursor)`` callable. The writer takes
+    whatever arrived within ``flush_ms`` of the first pending write (up to
+    ``batch_max``) and runs them in ONE transaction, each inside its own
+    savepoint: a write that fails is rolled back alone and its error goes
+    back to the submitter, the rest are committed together. Submitters wait
+    on a Future for their own result. A repeated ``idempotency_key`` (a double
+    click, a rerun) within ``idempotency_ttl`` seconds gets the first
+    submission's Future instead of writing again; failed writes may be retried.
+    Caches of the written tables are invalidated by the writer right after the
+    commit, before any submitter is woken, so a submitter that gave up waiting
+    still leaves no stale cache behind.
+    """
+
+    def __init__(self, max_pending: int, flush_ms: float, batch_max: int, idempotency_ttl: float):
+        self.flush_s = flush_ms / 1000
+        self.batch_max = batch_max
+        self.idempotency_ttl = idempotency_ttl
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._recent = OrderedDict()    # idempotency key -> (Future, submitted at)
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0, "deduplicated": 0, "committed": 0, "failed": 0, "rejected": 0,
+            "flushes": 0, "flush_total_s": 0.0, "flush_max_s": 0.0, "wait_total_s": 0.0, "peak_depth": 0,
+        }
+        threading.Thread(target=self._run, name="erp-writer", daemon=True).start()
+
+    def _bump(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                self._stats[name] += value
+
+    def submit(self, work, idempotency_key: str = None, label: str = None, written=None) -> Future:
+        item = _QueuedWrite(work, label or getattr(work, "__qualname__", "write"), idempotency_key, written)
+        if idempotency_key is not None:
+            with self._lock:
+                now = time.monotonic()
+                while self._recent and next(iter(self._recent.values()))[1] < now - self.idempotency_ttl:
+                    self._recent.popitem(last=False)
+                if idempotency_key in self._recent:
+                    self._stats["deduplicated"] += 1
+                    return self._recent[idempotency_key][0]
+                self._recent[idempotency_key] = (item.future, now)
+            item.future.add_done_callback(functools.partial(self._forget_failed, idempotency_key))
+        try:
+            self._queue.put(item, timeout=DB_POOL_TIMEOUT)
+        except queue.Full:
+            self._bump(rejected=1)
+            error = TimeoutError(f"Write queue full ({self._queue.maxsize} pending) for {DB_POOL_TIMEOUT}s.")
+            item.future.set_exception(error)
+            raise error from None
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["peak_depth"] = max(self._stats["peak_depth"], self._queue.qsize())
+        return item.future
+
+    def _forget_failed(self, key, future):
+        if future.exception() is None:
+            return
+        with self._lock:
+            if key in self._recent and self._recent[key][0] is future:
+                del self._recent[key]
+
+    def _run(self):
+        set_page("writer")
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.flush_s
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    @staticmethod
+    def _apply(item, cur):
+        with instrumented(item.label) as probe:
+            result = item.work(cur)
+            probe["rows"] = max(cur.rowcount, 0)
+        return result
+
+    def _flush(self, batch: list):
+        started = time.perf_counter()
+        done = []
+        try:
+            with get_connection() as conn:
+                cur = conn.cursor(dictionary=True, buffered=True)
+                try:
+                    conn.start_transaction()
+                    for item in batch:
+                        cur.execute("SAVEPOINT queued_write;")
+                        try:
+                            result = item.context.run(self._apply, item, cur)
+                        except Exception as e:
+                            cur.execute("ROLLBACK TO SAVEPOINT queued_write;")
+                            item.future.set_exception(e)
+                        else:
+                            done.append((item, result))
+                    conn.commit()
+                finally:
+                    cur.close()
+        except Exception as e:
+            # Lost connection, failed commit or a non-SQL error: nothing in the group was saved.
+            logger.error("group commit of %d writes failed: %s", len(batch), e)
+            done = []
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        finished = time.perf_counter()
+        for item, result in done:
+            item.context.run(_invalidate_written, item.written, result)
+            item.future.set_result(result)
+        seconds = finished - started
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["committed"] += len(done)
+            self._stats["failed"] += len(batch) - len(done)
+            self._stats["flush_total_s"] += seconds
+            self._stats["flush_max_s"] = max(self._stats["flush_max_s"], seconds)
+            self._stats["wait_total_s"] += sum(finished - item.queued_at for item in batch)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        flushes, writes = stats["flushes"] or 1, (stats["committed"] + stats["failed"]) or 1
+        return {
+            "depth": self._queue.qsize(),
+            "peak_depth": stats["peak_depth"],
+            "submitted": stats["submitted"],
+            "deduplicated": stats["deduplicated"],
+            "committed": stats["committed"],
+            "failed": stats["failed"],
+            "rejected": stats["rejected"],
+            "flushes": stats["flushes"],
+            "avg_batch": round((stats["committed"] + stats["failed"]) / flushes, 2),
+            "avg_flush_ms": round(stats["flush_total_s"] / flushes * 1000, 2),
+            "max_flush_ms": round(stats["flush_max_s"] * 1000, 2),
+            "avg_ack_ms": round(stats["wait_total_s"] / writes * 1000, 2),
+        }
+
+
+_write_queue = None             # the running WriteQueue, set by get_write_queue()
+
+
+@cache_resource
+def get_write_queue() -> WriteQueue:
+    global _write_queue
+    _write_queue = WriteQueue(WRITE_QUEUE_MAX, WRITE_FLUSH_MS, WRITE_BATCH_MAX, IDEMPOTENCY_TTL_S)
+    return _write_queue
+
+
+def write_queue_metrics() -> dict:
+    """WriteQueue counters, or {} before the first queued write."""
+    return {} if _write_queue is None else _write_queue.metrics()
+
+
+def _invalidate_written(written, result):
+    if written is None:
+        return
+    try:
+        after_write(*(written(result) if callable(written) else written))
+    except Exception as e:
+        logger.error("cache invalidation after a write failed: %s", e)
+
+
+def submit_write(work, idempotency_key: str = None, label: str = None, written=None):
+    """Run ``work(cursor)`` in a transaction and return its result (or raise its error).
+
+    With WRITE_QUEUE_ENABLED it becomes one savepoint in the writer's next
+    group commit; otherwise it gets a transaction of its own. ``written`` (the
+    queries, or a function of the result returning them) goes to
+    ``after_write`` once the write commits, even if WRITE_TIMEOUT_S ran out
+    before that.
+    """
+    if WRITE_QUEUE_ENABLED:
+        future = get_write_queue().submit(work, idempotency_key, label, written)
+        return future.result(timeout=WRITE_TIMEOUT_S)
+    with instrumented(label or work.__qualname__) as probe, get_connection() as conn:
+        cur = conn.cursor(dictionary=True, buffered=True)
+        try:
+            conn.start_transaction()
+            result = work(cur)
+            probe["rows"] = max(cur.rowcount, 0)
+            conn.commit()
+        finally:
+            cur.close()
+    _invalidate_written(written, result)
+    return result
+
+
+def write_statements(statements, idempotency_key: str = None) -> list:
+    """``[(query, params), ...]`` as one all-or-nothing write; returns each statement's rowcount."""
+    def work(cur):
+        counts = []
+        for query, params in statements:
+            cur.execute(query, params or ())
+            counts.append(cur.rowcount)
+        return counts
+
+    return submit_write(work, idempotency_key, label=statements[0][0],
+                        written=[query for query, _ in statements])
+
+
+# ========== PARALLEL PAGE QUERIES ==========
+@cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="erp-query")
+
+
+def run_parallel(tasks: dict, timeout: float = QUERY_TIMEOUT_S):
+    """Run independent loaders concurrently; yield ``(name, result, error)`` as each finishes.
+
+    ``tasks`` maps a name to ``(callable, args)``. A task not finished when
+    ``timeout`` passes is reported as a TimeoutError so the rest of the page
+    can render, but only tasks still waiting for a worker are cancelled. One
+    already running keeps its worker and pooled connection until its SELECTs
+    end; the MAX_EXECUTION_TIME hint they carry (the same ``timeout``) is what
+    stops a slow one, on the server. Tasks run in a copy of the caller's
+    context, so the current page label carries over to their statistics.
+    """
+    timeout_ms = int(timeout * 1000)
+
+    def call(fn, args):
+        _query_timeout_ms.set(timeout_ms)
+        return fn(*args)
+
+    executor = get_executor()
+    futures = {
+        executor.submit(contextvars.copy_context().run, call, fn, args): name
+        for name, (fn, args) in tasks.items()
+    }
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    except FuturesTimeout:
+        for future, name in futures.items():
+            if not future.done():
+                future.cancel()     # no-op once running; see MAX_EXECUTION_TIME above
+                yield name, None, TimeoutError(f"{name} did not finish within {timeout:.0f}s")
+
+
+# ========== COMPACT DATAFRAME DTYPES ==========
+# information_schema DATA_TYPE -> (signed, unsigned) smallest nullable pandas dtype
+_INT_DTYPES = {
+    "tinyint": ("Int8", "UInt8"),
+    "smallint": ("Int16", "UInt16"),
+    "mediumint": ("Int32", "UInt32"),
+    "int": ("Int32", "UInt32"),
+    "integer": ("Int32", "UInt32"),
+    "bigint": ("Int64", "UInt64"),
+}
+# DECIMAL/NUMERIC (fees, payments, balances) stay exact Decimal objects.
+_FLOAT_DTYPES = {"double": "float64", "real": "float64", "float": "float32"}
+
+
+@cache_resource
+def get_memory_report() -> dict:
+    """table -> memory before/after compact_frame() for the last full load."""
+    return {}
+
+
+def compact_frame(df: pd.DataFrame, table_name: str, categories: bool = False) -> pd.DataFrame:
+    """Convert columns to compact dtypes using the table's information_schema types.
+
+    Integers get the smallest nullable int type, FLOAT/DOUBLE become numpy
+    floats and dates become datetime64; DECIMAL stays exact. With
+    ``categories`` (only for frames nobody writes to: a categorical column
+    rejects new values) ENUMs and the CHAR/VARCHAR columns in
+    CATEGORY_COLUMNS become ``category``, the same on every page.
+    """
+    if df.empty:
+        return df
+    try:
+        schema = {c["COLUMN_NAME"]: c for c in get_table_schema(table_name)}
+    except Exception as e:
+        logger.info("no schema for %s, keeping default dtypes: %s", table_name, e)
+        return df
+
+    for column in df.columns:
+        info = schema.get(column)
+        if info is None:
+            continue
+        kind = info["DATA_TYPE"].lower()
+        values = df[column]
+        try:
+            if kind in _INT_DTYPES:
+                unsigned = "unsigned" in info["COLUMN_TYPE"].lower()
+                df[column] = pd.to_numeric(values).astype(_INT_DTYPES[kind][unsigned])
+            elif kind in _FLOAT_DTYPES:
+                df[column] = pd.to_numeric(values, errors="coerce").astype(_FLOAT_DTYPES[kind])
+            elif kind in ("date", "datetime", "timestamp"):
+                df[column] = pd.to_datetime(values, errors="coerce")
+            elif categories and (
+                kind == "enum" or (kind in ("char", "varchar") and column.upper() in CATEGORY_COLUMNS)
+            ):
+                df[column] = values.astype("category")
+        except (TypeError, ValueError, OverflowError) as e:
+            logger.info("kept %s.%s as %s: %s", table_name, column, values.dtype, e)
+    return df
+
+
+# ========== PARQUET SNAPSHOTS ==========
+def snapshots_available() -> bool:
+    return SNAPSHOTS_ENABLED and _snapshot() is not None
+
+
+def snapshot_keys(table_name: str) -> tuple:
+    """(integer primary key column or None, updated-at column or None) for snapshot syncs."""
+    info = get_table_info(table_name)
+    if info is None:
+        return None, None
+    updated = next(
+        (c.name for c in info.columns
+         if c.name.upper() in SNAPSHOT_UPDATED_COLUMNS and c.data_type in ("datetime", "timestamp")),
+        None
+    )
+    return info.int_key, updated
+
+
+def load_table_snapshot(table_name: str) -> pd.DataFrame:
+    """Bring the table's local Parquet snapshot up to date and load it (memory-mapped).
+
+    Only rows above the key high-water mark (or changed since the updated-at
+    mark) cross the network; cold starts and other workers reuse the files.
+    """
+    key, updated = snapshot_keys(table_name)
+    with instrumented(f"/* snapshot sync */ SELECT * FROM `{table_name}`") as probe:
+        data = _snapshot().sync(
+            get_read_connection, SNAPSHOT_DIR, table_name,
+            arrow_schema(table_name, get_table_columns(table_name)), key, updated,
+            max_age=SNAPSHOT_MAX_AGE_S, chunk_rows=EXPORT_CHUNK_ROWS
+        )
+        probe["rows"], probe["bytes"] = data.num_rows, data.nbytes
+    return data.to_pandas()
+
+
+# ========== SERVER-SIDE PAGINATION (ALL TABLES VIEWER) ==========
+FILTER_OPERATORS = {
+    "equals": "= %s",
+    "contains": "LIKE %s",
+    ">=": ">= %s",
+    "<=": "<= %s",
+}
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_where(table_name: str, search_text: str = "", filters: tuple = (), hits=None) -> tuple:
+    """Build a parameterized WHERE clause for the viewer.
+
+    ``search_text`` goes through the search index for SEARCH_TABLES and
+    matches any column (case-insensitive LIKE over CONCAT_WS) elsewhere;
+    ``filters`` is a tuple of ``(column, operator, value)`` with operators from
+    FILTER_OPERATORS. Column names are checked against the table's columns so
+    they can be safely quoted into the SQL. ``hits`` are the
+    ``indexed_search`` keys when the caller already has them.
+    """
+    columns = get_table_columns(table_name)
+    clauses, params = [], []
+
+    if hits is None and search_text.strip():
+        hits = indexed_search(table_name, search_text)
+    if hits is not None:
+        key = get_table_search(table_name).key_column
+        clauses.append(f"`{key}` IN ({', '.join(['%s'] * len(hits))})" if hits else "FALSE")
+        params.extend(hits)
+    elif search_text.strip() and columns:
+        concat = ", ".join(f"`{c}`" for c in columns)
+        clauses.append(f"LOWER(CONCAT_WS(' ', {concat})) LIKE %s")
+        params.append(_like_pattern(search_text.strip().lower()))
+
+    for column, op, value in filters:
+        if column not in columns or op not in FILTER_OPERATORS:
+            raise ValueError(f"Invalid filter: {column} {op}")
+        clauses.append(f"`{column}` {FILTER_OPERATORS[op]}")
+        params.append(_like_pattern(value) if op == "contains" else value)
+
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, tuple(params)
+
+
+@table_cached(lambda table_name, *args, **kwargs: (table_name,), ttl=60)
+def get_table_page(table_name: str, search_text: str = "", filters: tuple = (),
+                   order_by: str = None, descending: bool = False,
+                   limit: int = 500, offset: int = 0, after=None) -> pd.DataFrame:
+    """Fetch one page of a table with search, filters and ORDER BY done in MySQL.
+
+    With ``after`` (the last primary key of the previous page, ``order_by``
+    being that key) the page starts right after it instead of at ``offset``,
+    so deep pages cost the same as the first one.
+    """
+    hits = indexed_search(table_name, search_text) if search_text.strip() else None
+    where, params = build_where(table_name, search_text, filters, hits)
+    if after is not None:
+        if order_by is None or order_by != keyset_column(table_name):
+            raise ValueError(f"Keyset paging of {table_name} must order by its single-column primary key")
+        where = f"{where} AND " if where else "WHERE "
+        where += f"`{order_by}` {'<' if descending else '>'} %s"
+        params += (after,)
+        offset = 0
+    order = ""
+    if order_by:
+        if order_by not in get_table_columns(table_name):
+            raise ValueError(f"Unknown column: {order_by}")
+        order = f"ORDER BY `{order_by}` {'DESC' if descending else 'ASC'}"
+    elif hits:
+        # Best matches first, in the index's ranking.
+        order = f"ORDER BY FIELD(`{get_table_search(table_name).key_column}`, " \
+                f"{', '.join(['%s'] * len(hits))})"
+        params += tuple(hits)
+    rows = run_query(
+        f"SELECT * FROM `{table_name}` {where} {order} LIMIT %s OFFSET %s;",
+        params + (int(limit), int(offset))
+    )
+    return compact_frame(pd.DataFrame(rows, columns=get_table_columns(table_name)), table_name, categories=True)
+
+
+@table_cached(lambda table_name, *args, **kwargs: (table_name,))
+def count_table_rows(table_name: str, search_text: str = "", filters: tuple = ()) -> tuple:
+    """Return ``(row_count, is_estimate)``.
+
+    Unfiltered tables use the InnoDB estimate from information_schema (no scan);
+    filtered counts are exact but cached for a few minutes.
+    """
+    if not search_text.strip() and not filters:
+        info = get_table_info(table_name)
+        if info is not None and info.row_estimate is not None:
+            return info.row_estimate, True
+    where, params = build_where(table_name, search_text, filters)
+    rows = run_query(f"SELECT COUNT(*) AS c FROM `{table_name}` {where};", params)
+    return int(rows[0]["c"]), False
+
+
+@table_cached(lambda table_name, column: (table_name,))
+def get_distinct_values(table_name: str, column: str) -> list:
+    """Sorted distinct non-NULL values of a column, for filter dropdowns."""
+    if column not in get_table_columns(table_name):
+        raise ValueError(f"Unknown column: {column}")
+    rows = run_query(
+        f"SELECT DISTINCT `{column}` AS v FROM `{table_name}` "
+        f"WHERE `{column}` IS NOT NULL ORDER BY `{column}`;"
+    )
+    return [r["v"] for r in rows]
+
+
+# ========== TEXT SEARCH (search.py) ==========
+
+@cache_resource
+def get_table_search(table_name: str) -> search.TableSearch:
+    """Process-wide search index of one table; rows are loaded on the first lookup."""
+    info = get_table_info(table_name)
+    if info is None or info.single_key is None:
+        raise ValueError(f"{table_name} needs a single-column primary key to be indexed")
+    text = [
+        c.name for c in info.columns
+        if c.is_text or any(hint in c.name.upper() for hint in ("MOBILE", "PHONE"))
+    ]
+    updated = next((c for c in SNAPSHOT_UPDATED_COLUMNS if info.has(c)), None)
+    return search.TableSearch(table_name, info.single_key, text, updated)
+
+
+def indexed_search(table_name: str, text: str):
+    """Ranked primary keys matching ``text``, or None when the table is not indexed."""
+    if table_name not in SEARCH_TABLES:
+        return None
+    try:
+        index = get_table_search(table_name)
+        index.sync(run_query, SEARCH_MAX_AGE_S, SEARCH_SYNC_S)
+    except Exception as e:
+        logger.warning("search index of %s unavailable, using LIKE: %s", table_name, e)
+        return None
+    return index.search(text, SEARCH_MAX_HITS)
+
+
+def search_refresh(table_name: str, *keys):
+    """Re-index rows the app just updated or deleted."""
+    if table_name not in SEARCH_TABLES:
+        return
+    try:
+        if get_table_info(table_name).int_key:
+            # Page inputs are strings; the index holds the ints MySQL returns.
+            keys = tuple(int(k) for k in keys)
+        get_table_search(table_name).refresh(run_query, keys)
+    except Exception as e:
+        logger.warning("could not refresh search index of %s: %s", table_name, e)
+
+
+# ========== SUMMARY TABLES (migrations/002) ==========
+# name -> (query on the summary table, equivalent live query, tables read)
+SUMMARY_QUERIES = {
+    "course_headcount": (
+        "SELECT COURSE_NAME, student_count FROM summary_course_headcount ORDER BY student_count DESC;",
+        """SELECT COURSE_NAME, COUNT(STUDENT_ID) AS student_count
+           FROM student GROUP BY COURSE_NAME ORDER BY student_count DESC;""",
+        ("summary_course_headcount", "student"),
+    ),
+    "fee_monthly": (
+        "SELECT ym, total_paid FROM summary_fee_monthly ORDER BY ym;",
+        """SELECT DATE_FORMAT(PAYMENT_DATE, '%Y-%m') AS ym, SUM(AMOUNT_PAID) AS total_paid
+           FROM fee_payment GROUP BY ym ORDER BY ym;""",
+        ("summary_fee_monthly", "fee_payment"),
+    ),
+    "lead_status": (
+        "SELECT STATUS, lead_count AS count FROM summary_lead_status;",
+        "SELECT STATUS, COUNT(*) AS count FROM lead GROUP BY STATUS;",
+        ("summary_lead_status", "lead"),
+    ),
+}
+
+
+@table_cached(lambda name: SUMMARY_QUERIES[name][2])
+def load_summary(name: str) -> pd.DataFrame:
+    """Read a pre-aggregated summary; falls back to the live GROUP BY if not migrated."""
+    summary_sql, live_sql, _ = SUMMARY_QUERIES[name]
+    try:
+        rows = run_query(summary_sql)
+    except _mysql().Error as e:
+        if e.errno != _mysql().errorcode.ER_NO_SUCH_TABLE:
+            raise
+        rows = run_query(live_sql)
+    return pd.DataFrame(rows)
+
+
+def _refresh_summary_rows(statements):
+    """Apply summary refresh statements, ignoring a database whose migration
+    has not created the summary tables yet."""
+    try:
+        run_transaction(statements)
+    except _mysql().Error as e:
+        if e.errno != _mysql().errorcode.ER_NO_SUCH_TABLE:
+            raise
+
+
+def summaries_ready() -> bool:
+    return "summary_course_headcount" in get_all_tables()
+
+
+# The *_statements builders let a page write recount its summary rows in its own
+# transaction; they return [] until migration 002 is applied. '' stands for NULL
+# like in refresh_summaries(): "x = %s OR (%s = '' AND x IS NULL)" is
+# IFNULL(x, '') = %s written so the index on x can still be used.
+def course_headcount_statements(*course_names) -> list:
+    statements = []
+    for name in set(course_names) if summaries_ready() else ():
+        key = name or ""
+        statements += [
+            ("DELETE FROM summary_course_headcount WHERE COURSE_NAME = %s;", (key,)),
+            ("""INSERT INTO summary_course_headcount (COURSE_NAME, student_count)
+                SELECT %s, COUNT(*) FROM student
+                WHERE COURSE_NAME = %s OR (%s = '' AND COURSE_NAME IS NULL)
+                HAVING COUNT(*) > 0;""", (key, key, key)),
+        ]
+    return statements
+
+
+def lead_status_statements(*statuses) -> list:
+    statements = []
+    for status in set(statuses) if summaries_ready() else ():
+        key = status or ""
+        statements += [
+            ("DELETE FROM summary_lead_status WHERE STATUS = %s;", (key,)),
+            ("""INSERT INTO summary_lead_status (STATUS, lead_count)
+                SELECT %s, COUNT(*) FROM lead
+                WHERE STATUS = %s OR (%s = '' AND STATUS IS NULL)
+                HAVING COUNT(*) > 0;""", (key, key, key)),
+        ]
+    return statements
+
+
+def fee_month_statements(*payment_dates) -> list:
+    statements = []
+    for month_start in {date(d.year, d.month, 1) for d in payment_dates} if summaries_ready() else ():
+        ym = month_start.strftime("%Y-%m")
+        statements += [
+            ("DELETE FROM summary_fee_monthly WHERE ym = %s;", (ym,)),
+            ("""INSERT INTO summary_fee_monthly (ym, total_paid, payment_count)
+                SELECT %s, SUM(AMOUNT_PAID), COUNT(*) FROM fee_payment
+                WHERE PAYMENT_DATE >= %s AND PAYMENT_DATE < %s + INTERVAL 1 MONTH
+                HAVING COUNT(*) > 0;""", (ym, month_start, month_start)),
+        ]
+    return statements
+
+
+def rebuild_summaries():
+    """Recount every summary row, dropping rows of values that no longer occur,
+    with the refresh_summaries() procedure of migrations/002."""
+    with instrumented("CALL refresh_summaries()"):
+        with get_connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.callproc("refresh_summaries")
+                conn.commit()
+            finally:
+                cur.close()
+    invalidate_tables("summary_course_headcount", "summary_lead_status", "summary_fee_monthly")
+
+
+# ========== ATTENDANCE QUERIES ==========
+ATTENDANCE_STATUSES = ["Present", "Absent", "Leave"]
+
+
+@table_cached(("attendance",))
+def get_attendance_bounds() -> tuple:
+    """(min_date, max_date) of ATTENDANCE_DATE — resolved from the index, no scan."""
+    rows = run_query("SELECT MIN(ATTENDANCE_DATE) AS lo, MAX(ATTENDANCE_DATE) AS hi FROM attendance;")
+    return (rows[0]["lo"], rows[0]["hi"]) if rows else (None, None)
+
+
+@table_cached(lambda start, end, student_id=None, use_rollup=True:
+              ("attendance", "summary_attendance_daily"))
+def get_daily_present(start: date, end: date, student_id=None, use_rollup: bool = True) -> pd.DataFrame:
+    """Daily 'Present' counts between two dates, aggregated in MySQL.
+
+    Without a student filter the pre-aggregated summary_attendance_daily
+    rollup is used when available (migrations/003).
+    """
+    if student_id is None and use_rollup:
+        try:
+            rows = run_query("""
+                SELECT ATTENDANCE_DATE, present_count
+                FROM summary_attendance_daily
+                WHERE ATTENDANCE_DATE BETWEEN %s AND %s
+                ORDER BY ATTENDANCE_DATE;
+            """, (start, end))
+            return pd.DataFrame(rows, columns=["ATTENDANCE_DATE", "present_count"])
+        except _mysql().Error as e:
+            if e.errno != _mysql().errorcode.ER_NO_SUCH_TABLE:
+                raise
+
+    where = "WHERE STATUS = 'Present' AND ATTENDANCE_DATE BETWEEN %s AND %s"
+    params = (start, end)
+    if student_id is not None:
+        where += " AND STUDENT_ID = %s"
+        params += (student_id,)
+    rows = run_query(f"""
+        SELECT ATTENDANCE_DATE, COUNT(*) AS present_count
+        FROM attendance
+        {where}
+        GROUP BY ATTENDANCE_DATE
+        ORDER BY ATTENDANCE_DATE;
+    """, params)
+    return pd.DataFrame(rows, columns=["ATTENDANCE_DATE", "present_count"])
+
+
+def attendance_daily_statements(*days) -> list:
+    """Statements recounting the summary_attendance_daily rows of ``days`` ([] before migration 003)."""
+    statements = []
+    for day in set(days) if "summary_attendance_daily" in get_all_tables() else ():
+        statements += [
+            ("DELETE FROM summary_attendance_daily WHERE ATTENDANCE_DATE = %s;", (day,)),
+            ("""INSERT INTO summary_attendance_daily (ATTENDANCE_DATE, present_count, total_count)
+                SELECT %s, SUM(STATUS = 'Present'), COUNT(*) FROM attendance
+                WHERE ATTENDANCE_DATE = %s
+                HAVING COUNT(*) > 0;""", (day, day)),
+        ]
+    return statements
+
+
+def mark_attendance(day, student_ids, statuses) -> dict:
+    """Save one day's attendance sheet with bulk_upsert (re-marking a student
+    updates their row) and recount the day's rollup row in the same transaction."""
+    daily = attendance_daily_statements(day)
+
+    def recount(cur, written, errors):
+        for query, params in daily:
+            cur.execute(query, params)
+
+    return bulk_upsert(
+        "attendance", ["STUDENT_ID", "ATTENDANCE_DATE", "STATUS"],
+        [(student_id, day, status) for student_id, status in zip(student_ids, statuses)],
+        update_columns=["STATUS"], before_commit=recount
+    )
+
+
+# ========== FEE LEDGER (migrations/006) ==========
+LEDGER_UPSERT = """
+    INSERT INTO fee_ledger (STUDENT_ID, COURSE_ID, TOTAL_FEES, TOTAL_PAID, PAYMENT_COUNT, LAST_PAYMENT_DATE)
+    SELECT %s, c.COURSE_ID, c.FEES, %s, %s, %s FROM course c WHERE c.COURSE_ID = %s
+    ON DUPLICATE KEY UPDATE
+        TOTAL_PAID = TOTAL_PAID + VALUES(TOTAL_PAID),
+        PAYMENT_COUNT = PAYMENT_COUNT + VALUES(PAYMENT_COUNT),
+        LAST_PAYMENT_DATE = GREATEST(IFNULL(LAST_PAYMENT_DATE, VALUES(LAST_PAYMENT_DATE)),
+                                     VALUES(LAST_PAYMENT_DATE));
+"""
+
+
+def apply_payments_to_ledger(cur, columns: list, rows: list):
+    """Add fee_payment rows to fee_ledger using the caller's cursor (same transaction)."""
+    col = {c: i for i, c in enumerate(columns)}
+    if not rows or not {"STUDENT_ID", "COURSE_ID", "AMOUNT_PAID"} <= set(col):
+        return
+    totals = {}
+    for r in rows:
+        key = (r[col["STUDENT_ID"]], r[col["COURSE_ID"]])
+        paid, count, last = totals.get(key, (0, 0, None))
+        day = r[col["PAYMENT_DATE"]] if "PAYMENT_DATE" in col else None
+        totals[key] = (
+            paid + (r[col["AMOUNT_PAID"]] or 0),
+            count + 1,
+            max(d for d in (last, day) if d is not None) if (last or day) else None,
+        )
+    for (student_id, course_id), (paid, count, last) in totals.items():
+        cur.execute(LEDGER_UPSERT, (student_id, paid, count, last, course_id))
+
+
+def record_payment(values: dict, idempotency_key: str = None):
+    """Insert one fee_payment row and update its ledger row in one transaction."""
+    columns = list(values)
+    row = tuple(values.values())
+    insert = (
+        f"INSERT INTO fee_payment ({', '.join(f'`{c}`' for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))});"
+    )
+
+    summary = fee_month_statements(values["PAYMENT_DATE"])
+
+    def work(cur):
+        cur.execute(insert, row)
+        apply_payments_to_ledger(cur, columns, [row])
+        for query, params in summary:
+            cur.execute(query, params)
+
+    submit_write(work, idempotency_key, label=insert,
+                 written=(insert, LEDGER_UPSERT, *(query for query, _ in summary)))
+
+
+FEE_LEDGER_DRIFT = """
+    SELECT a.STUDENT_ID, a.COURSE_ID,
+           a.total_fees, a.paid AS expected_paid, a.n AS expected_count,
+           l.TOTAL_FEES AS ledger_fees, l.TOTAL_PAID AS ledger_paid, l.PAYMENT_COUNT AS ledger_count
+    FROM (
+        SELECT fp.STUDENT_ID, fp.COURSE_ID, c.FEES AS total_fees,
+               SUM(fp.AMOUNT_PAID) AS paid, COUNT(*) AS n
+        FROM fee_payment fp JOIN course c ON c.COURSE_ID = fp.COURSE_ID
+        GROUP BY fp.STUDENT_ID, fp.COURSE_ID, c.FEES
+    ) a
+    LEFT JOIN fee_ledger l ON l.STUDENT_ID = a.STUDENT_ID AND l.COURSE_ID = a.COURSE_ID
+    WHERE l.STUDENT_ID IS NULL
+       OR l.TOTAL_PAID <> a.paid OR l.PAYMENT_COUNT <> a.n OR l.TOTAL_FEES <> a.total_fees
+    UNION ALL
+    SELECT l.STUDENT_ID, l.COURSE_ID, NULL, 0, 0, l.TOTAL_FEES, l.TOTAL_PAID, l.PAYMENT_COUNT
+    FROM fee_ledger l
+    WHERE NOT EXISTS (
+        SELECT 1 FROM fee_payment fp
+        WHERE fp.STUDENT_ID = l.STUDENT_ID AND fp.COURSE_ID = l.COURSE_ID
+    );
+"""
+
+
+def verify_fee_ledger(fix: bool = False) -> pd.DataFrame:
+    """Reconcile fee_ledger against fee_payment; return drifted rows (and rebuild them if ``fix``)."""
+    drift = pd.DataFrame(run_query(FEE_LEDGER_DRIFT))
+    if fix and not drift.empty:
+        statements = []
+        for student_id, course_id in drift[["STUDENT_ID", "COURSE_ID"]].itertuples(index=False):
+            key = (int(student_id), int(course_id))
+            statements += [
+                ("DELETE FROM fee_ledger WHERE STUDENT_ID = %s AND COURSE_ID = %s;", key),
+                ("""INSERT INTO fee_ledger
+                    (STUDENT_ID, COURSE_ID, TOTAL_FEES, TOTAL_PAID, PAYMENT_COUNT, LAST_PAYMENT_DATE)
+                    SELECT fp.STUDENT_ID, fp.COURSE_ID, c.FEES, SUM(fp.AMOUNT_PAID), COUNT(*),
+                           MAX(fp.PAYMENT_DATE)
+                    FROM fee_payment fp JOIN course c ON c.COURSE_ID = fp.COURSE_ID
+                    WHERE fp.STUDENT_ID = %s AND fp.COURSE_ID = %s
+                    GROUP BY fp.STUDENT_ID, fp.COURSE_ID, c.FEES;""", key),
+            ]
+        run_transaction(statements)
+    return drift
+
+
+@table_cached(("fee_ledger", "student", "course"), ttl=60)
+def get_fee_ledger_page(pending_only: bool, limit: int, offset: int) -> pd.DataFrame:
+    """One page of per-student-per-course balances, read from the ledger by index."""
+    where, order = "", "ORDER BY l.STUDENT_ID, l.COURSE_ID"
+    if pending_only:
+        where, order = "WHERE l.BALANCE > 0", "ORDER BY l.BALANCE DESC"
+    rows = run_query(f"""
+        SELECT l.STUDENT_ID, s.NAME, c.COURSE_NAME,
+               l.TOTAL_FEES AS total_fees, l.TOTAL_PAID AS total_paid, l.BALANCE AS balance,
+               l.LAST_PAYMENT_DATE
+        FROM fee_ledger l
+        JOIN student s ON s.STUDENT_ID = l.STUDENT_ID
+        JOIN course c  ON c.COURSE_ID = l.COURSE_ID
+        {where}
+        {order}
+        LIMIT %s OFFSET %s;
+    """, (int(limit), int(offset)))
+    return pd.DataFrame(rows)
+
+
+@table_cached(("fee_ledger",))
+def count_fee_ledger(pending_only: bool) -> int:
+    where = "WHERE BALANCE > 0" if pending_only else ""
+    return int(run_query(f"SELECT COUNT(*) AS c FROM fee_ledger {where};")[0]["c"])
+
+
+@table_cached(("fee_ledger", "course"))
+def get_fee_by_course() -> pd.DataFrame:
+    rows = run_query("""
+        SELECT c.COURSE_NAME, SUM(l.TOTAL_FEES) AS total_fees, SUM(l.TOTAL_PAID) AS total_paid
+        FROM fee_ledger l JOIN course c ON c.COURSE_ID = l.COURSE_ID
+        GROUP BY c.COURSE_NAME;
+    """)
+    return pd.DataFrame(rows)
+
+
+# ========== STUDENTS / COURSES / LEADS ==========
+STUDENT_FIELDS = ("NAME", "GENDER", "DOB", "MOBILE", "EMAIL_ID", "ADDRESS", "CITY", "STATE", "PINCODE",
+                  "PARENT_NAME", "PARENT_MOBILE", "COURSE_NAME", "JOIN_DATE", "STATUS")
+COURSE_FIELDS = ("COURSE_NAME", "CATEGORY", "DURATION_MONTHS", "FEES", "LEVEL", "STATUS")
+
+
+# Page forms pass an ``idempotency_key`` so a double submit writes once (see WriteQueue).
+def _insert_row(table_name: str, fields: tuple, values: dict, idempotency_key: str = None, then=()):
+    """INSERT one row, followed by the ``then`` statements in the same transaction."""
+    unknown = set(values) - set(fields)
+    if unknown:
+        raise ValueError(f"Unknown {table_name} field(s): {', '.join(sorted(unknown))}")
+    columns = [c for c in fields if c in values]
+    write_statements([(
+        f"INSERT INTO `{table_name}` ({', '.join(f'`{c}`' for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))});",
+        tuple(values[c] for c in columns)
+    ), *then], idempotency_key)
+
+
+def add_student(values: dict, idempotency_key: str = None):
+    """Insert one student (keys from STUDENT_FIELDS) and update its course headcount."""
+    _insert_row("student", STUDENT_FIELDS, values, idempotency_key,
+                then=course_headcount_statements(values.get("COURSE_NAME")))
+
+
+@table_cached(("student",))
+def student_exists(student_id) -> bool:
+    """Primary-key lookup for STUDENT_IDs typed into a page."""
+    return bool(run_query("SELECT 1 AS found FROM student WHERE STUDENT_ID = %s;", (int(student_id),)))
+
+
+def update_student_status(student_id, status: str, idempotency_key: str = None):
+    write_statements([("UPDATE student SET STATUS = %s WHERE STUDENT_ID = %s;", (status, student_id))],
+                     idempotency_key)
+    search_refresh("student", student_id)
+
+
+def delete_student(student_id, idempotency_key: str = None) -> bool:
+    """Delete one student; returns whether it existed."""
+    gone = run_query("SELECT COURSE_NAME FROM student WHERE STUDENT_ID = %s;", (student_id,))
+    write_statements([
+        ("DELETE FROM student WHERE STUDENT_ID = %s;", (student_id,)),
+        *(course_headcount_statements(gone[0]["COURSE_NAME"]) if gone else ()),
+    ], idempotency_key)
+    search_refresh("student", student_id)
+    return bool(gone)
+
+
+def add_course(values: dict, idempotency_key: str = None):
+    """Insert one course (keys from COURSE_FIELDS)."""
+    _insert_row("course", COURSE_FIELDS, values, idempotency_key)
+
+
+def update_course_status(course_id, status: str, idempotency_key: str = None):
+    write_statements([("UPDATE course SET STATUS = %s WHERE COURSE_ID = %s;", (status, course_id))],
+                     idempotency_key)
+
+
+@table_cached(("course", "fee_payment"))
+def get_course_fee_summary() -> pd.DataFrame:
+    """Course fees against payments received, per course."""
+    rows = run_query("""
+        SELECT 
+            c.COURSE_NAME,
+            SUM(c.FEES) AS total_course_fees, 
+            IFNULL(SUM(fp.AMOUNT_PAID),0) AS total_paid
+        FROM course c
+        LEFT JOIN fee_payment fp ON fp.COURSE_ID = c.COURSE_ID
+        GROUP BY c.COURSE_NAME;
+    """)
+    return pd.DataFrame(rows)
+
+
+def update_lead_status(lead_id, status: str, idempotency_key: str = None):
+    """Change a lead's status; once migration 009 is applied the change is also
+    logged and counted in the funnel tables in the same transaction."""
+    before = run_query("SELECT STATUS FROM lead WHERE LEAD_ID = %s;", (lead_id,))
+    update = "UPDATE lead SET STATUS = %s WHERE LEAD_ID = %s;"
+    summary = lead_status_statements(before[0]["STATUS"], status) if before else []
+    if before and funnel_ready():
+        transition = _lead_transition(lead_id, status, update, get_lead_columns())
+
+        def work(cur):
+            executed = transition(cur)
+            for query, params in summary:
+                cur.execute(query, params)
+            return executed + [query for query, _ in summary]
+
+        submit_write(work, idempotency_key, label=f"/* lead transition */ {update}",
+                     written=lambda queries: queries)
+    else:
+        write_statements([(update, (status, lead_id)), *summary], idempotency_key)
+    search_refresh("lead", lead_id)
+
+
+# ========== LEAD FUNNEL (funnel.py, migrations/009) ==========
+def funnel_ready() -> bool:
+    return "lead_status_event" in get_all_tables()
+
+
+def get_lead_columns() -> dict:
+    """lead column for each funnel role (see funnel.COLUMN_CANDIDATES)."""
+    return funnel.resolve_columns(get_table_columns("lead"))
+
+
+def _lead_transition(lead_id, status: str, update: str, cols: dict):
+    """Write for submit_write: log and count one status change and apply ``update``.
+
+    The write returns the statements it ran, for cache invalidation.
+    """
+    select_state = "SELECT * FROM lead_funnel_state WHERE LEAD_ID = %s FOR UPDATE;"
+
+    def work(cur):
+        executed = [update]
+        cur.execute(select_state, (lead_id,))
+        state = cur.fetchone()
+        if state is None:
+            # Lead created outside the app or before tracking: count it first.
+            for query, params in funnel.add_leads_statements(cols, [lead_id]):
+                cur.execute(query, params)
+                executed.append(query)
+            cur.execute(select_state, (lead_id,))
+            state = cur.fetchone()
+        if state is not None and state["STATUS"] != status:
+            for query, params in funnel.transition_statements(state, status, datetime.now().replace(microsecond=0)):
+                cur.execute(query, params)
+                executed.append(query)
+        cur.execute(update, (status, lead_id))
+        return executed
+
+    return work
+
+
+def sync_lead_funnel(lead_ids=None):
+    """Count leads the funnel tables do not know yet (imports, rows added outside the app)."""
+    run_transaction(funnel.add_leads_statements(get_lead_columns(), lead_ids))
+
+
+@table_cached(("lead_funnel_counts",))
+def get_lead_funnel(by: str = None) -> pd.DataFrame:
+    """Leads reaching each funnel stage, overall or per COHORT / SOURCE."""
+    rows = run_query("SELECT COHORT, SOURCE, FURTHEST_STAGE, LEADS FROM lead_funnel_counts WHERE LEADS > 0;")
+    return funnel.funnel_table(pd.DataFrame(rows), by)
+
+
+@table_cached(("lead_period_counts",))
+def get_lead_periods(source: str = None) -> pd.DataFrame:
+    """Status changes per month, optionally for one source."""
+    where, params = ("WHERE SOURCE = %s", (source,)) if source is not None else ("", ())
+    rows = run_query(f"""
+        SELECT PERIOD, TO_STATUS, SUM(CHANGES) AS CHANGES
+        FROM lead_period_counts {where}
+        GROUP BY PERIOD, TO_STATUS;
+    """, params)
+    return funnel.period_table(pd.DataFrame(rows))
+
+
+@table_cached(("lead_stage_time",))
+def get_stage_times() -> pd.DataFrame:
+    return funnel.stage_time_table(pd.DataFrame(run_query("SELECT * FROM lead_stage_time;")))
+
+
+@table_cached(("lead_status_event",), ttl=60)
+def get_lead_history(lead_id) -> pd.DataFrame:
+    rows = run_query("""
+        SELECT CHANGED_AT, FROM_STATUS, TO_STATUS, ROUND(SECONDS_IN_STAGE / 86400, 1) AS DAYS_IN_PREVIOUS
+        FROM lead_status_event
+        WHERE LEAD_ID = %s
+        ORDER BY EVENT_ID;
+    """, (lead_id,))
+    return pd.DataFrame(rows)
+
+
+# ========== RESULT ANALYTICS (resultstats.py, migrations/008) ==========
+RESULT_JOIN = """
+    FROM result r
+    JOIN student s ON r.STUDENT_ID = s.STUDENT_ID
+    JOIN test t    ON r.TEST_ID = t.TEST_ID
+    JOIN course c  ON t.COURSE_ID = c.COURSE_ID
+"""
+RESULT_FIELDS = ["STUDENT_ID", "MARKS_OBTAINED", "GRADE", "REMARKS"]
+
+
+def _result_where(course_name=None, student_id=None) -> tuple:
+    clauses, params = [], []
+    for column, value in (("c.COURSE_NAME", course_name), ("r.STUDENT_ID", student_id)):
+        if value not in (None, ""):
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", tuple(params)
+
+
+def _stats_frame(rows) -> pd.DataFrame:
+    """Stat columns arrive as Decimal; charts need floats."""
+    df = pd.DataFrame(rows)
+    for column in resultstats.STAT_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+@table_cached(("result", "student", "test", "course"), ttl=60)
+def get_results(course_name=None, student_id=None, limit: int = PAGE_ROWS) -> pd.DataFrame:
+    """Newest result rows with student, test and course names; filters run inside the join."""
+    where, params = _result_where(course_name, student_id)
+    rows = run_query(f"""
+        SELECT 
+            r.RESULT_ID,
+            r.STUDENT_ID,
+            s.NAME AS STUDENT_NAME,
+            r.TEST_ID,
+            t.TEST_NAME,
+            t.COURSE_ID,
+            c.COURSE_NAME,
+            r.MARKS_OBTAINED,
+            r.GRADE,
+            r.REMARKS
+        {RESULT_JOIN}
+        {where}
+        ORDER BY r.RESULT_ID DESC
+        LIMIT %s;
+    """, params + (int(limit),))
+    return pd.DataFrame(rows)
+
+
+@table_cached(("result", "student", "test", "course"))
+def count_results(course_name=None, student_id=None) -> int:
+    where, params = _result_where(course_name, student_id)
+    return int(run_query(f"SELECT COUNT(*) AS n {RESULT_JOIN} {where};", params)[0]["n"])
+
+
+@table_cached(("result_test_stats", "result", "test", "course"))
+def load_test_stats(course_name=None) -> pd.DataFrame:
+    """One row of statistics per test; computed from the marks if migration 008 is missing."""
+    where, params = ("WHERE c.COURSE_NAME = %s", (course_name,)) if course_name else ("", ())
+    try:
+        return _stats_frame(run_query(f"""
+            SELECT t.TEST_ID, t.TEST_NAME, c.COURSE_NAME,
+                   {', '.join(f'x.{col}' for col in resultstats.STAT_COLUMNS)}
+            FROM result_test_stats x
+            JOIN test t   ON t.TEST_ID = x.TEST_ID
+            JOIN course c ON c.COURSE_ID = t.COURSE_ID
+            {where}
+            ORDER BY t.TEST_ID;
+        """, params))
+    except _mysql().Error as e:
+        if e.errno != _mysql().errorcode.ER_NO_SUCH_TABLE:
+            raise
+    marks = pd.DataFrame(run_query(f"""
+        SELECT t.TEST_ID, t.TEST_NAME, c.COURSE_NAME, r.MARKS_OBTAINED
+        FROM result r
+        JOIN test t   ON r.TEST_ID = t.TEST_ID
+        JOIN course c ON t.COURSE_ID = c.COURSE_ID
+        {where};
+    """, params))
+    if marks.empty:
+        return marks
+    names = marks[["TEST_ID", "TEST_NAME", "COURSE_NAME"]].drop_duplicates("TEST_ID")
+    return names.merge(resultstats.summarize(marks, "TEST_ID").reset_index(), on="TEST_ID")
+
+
+@table_cached(("result_course_stats", "result", "test", "course"))
+def load_course_stats() -> pd.DataFrame:
+    """One row of statistics per course; computed from the marks if migration 008 is missing."""
+    try:
+        return _stats_frame(run_query(f"""
+            SELECT c.COURSE_NAME, x.TEST_COUNT, x.STUDENT_COUNT,
+                   {', '.join(f'x.{col}' for col in resultstats.STAT_COLUMNS)}
+            FROM result_course_stats x
+            JOIN course c ON c.COURSE_ID = x.COURSE_ID
+            ORDER BY c.COURSE_NAME;
+        """))
+    except _mysql().Error as e:
+        if e.errno != _mysql().errorcode.ER_NO_SUCH_TABLE:
+            raise
+    marks = pd.DataFrame(run_query("""
+        SELECT c.COURSE_NAME, r.MARKS_OBTAINED
+        FROM result r
+        JOIN test t   ON r.TEST_ID = t.TEST_ID
+        JOIN course c ON t.COURSE_ID = c.COURSE_ID;
+    """))
+    return resultstats.summarize(marks, "COURSE_NAME").reset_index() if not marks.empty else marks
+
+
+@table_cached(("result_grade_counts", "test", "course"))
+def load_grade_counts(course_name=None) -> pd.DataFrame:
+    """Results per test and GRADE (empty until migration 008 is applied)."""
+    where, params = ("WHERE c.COURSE_NAME = %s", (course_name,)) if course_name else ("", ())
+    try:
+        rows = run_query(f"""
+            SELECT t.TEST_NAME, g.GRADE, g.RESULT_COUNT
+            FROM result_grade_counts g
+            JOIN test t   ON t.TEST_ID = g.TEST_ID
+            JOIN course c ON c.COURSE_ID = t.COURSE_ID
+            {where};
+        """, params)
+    except _mysql().Error as e:
+        if e.errno != _mysql().errorcode.ER_NO_SUCH_TABLE:
+            raise
+        rows = []
+    return pd.DataFrame(rows)
+
+
+def refresh_result_stats(*test_ids):
+    """Recompute the statistics of the given tests and of their courses.
+
+    Only the marks of the affected courses are read (through
+    idx_test_course / idx_result_test_marks), so entering one test's marks
+    costs one course's worth of rows, not the whole result table.
+    """
+    test_ids = sorted({int(t) for t in test_ids if t is not None})
+    if not test_ids:
+        return
+    marks_sql = ", ".join(["%s"] * len(test_ids))
+    course_of = {
+        r["TEST_ID"]: r["COURSE_ID"]
+        for r in run_query(f"SELECT TEST_ID, COURSE_ID FROM test WHERE TEST_ID IN ({marks_sql});", tuple(test_ids))
+    }
+    statements = []
+    for test_id in test_ids:
+        statements += [
+            ("DELETE FROM result_test_stats WHERE TEST_ID = %s;", (test_id,)),
+            ("DELETE FROM result_grade_counts WHERE TEST_ID = %s;", (test_id,)),
+        ]
+
+    stat_cols = ", ".join(resultstats.STAT_COLUMNS)
+    stat_marks = ", ".join(["%s"] * len(resultstats.STAT_COLUMNS))
+    value = resultstats.to_sql_value
+    for course_id in set(course_of.values()):
+        marks = pd.DataFrame(run_query("""
+            SELECT r.TEST_ID, r.STUDENT_ID, r.MARKS_OBTAINED, r.GRADE
+            FROM test t
+            JOIN result r ON r.TEST_ID = t.TEST_ID
+            WHERE t.COURSE_ID = %s;
+        """, (course_id,)), columns=["TEST_ID", "STUDENT_ID", "MARKS_OBTAINED", "GRADE"])
+        changed = marks[marks["TEST_ID"].isin([t for t, c in course_of.items() if c == course_id])]
+
+        for test_id, row in resultstats.summarize(changed, "TEST_ID").iterrows():
+            statements.append((
+                f"INSERT INTO result_test_stats (TEST_ID, COURSE_ID, {stat_cols}) "
+                f"VALUES (%s, %s, {stat_marks});",
+                (value(test_id), course_id, *map(value, row)),
+            ))
+        for test_id, grade, count in resultstats.grade_counts(changed, "TEST_ID").itertuples(index=False):
+            statements.append((
+                "INSERT INTO result_grade_counts (TEST_ID, GRADE, RESULT_COUNT) VALUES (%s, %s, %s);",
+                (value(test_id), grade, value(count)),
+            ))
+
+        statements.append(("DELETE FROM result_course_stats WHERE COURSE_ID = %s;", (course_id,)))
+        course = resultstats.summarize(marks.assign(COURSE_ID=course_id), "COURSE_ID")
+        if not course.empty:
+            statements.append((
+                f"INSERT INTO result_course_stats (COURSE_ID, TEST_COUNT, STUDENT_COUNT, {stat_cols}) "
+                f"VALUES (%s, %s, %s, {stat_marks});",
+                (course_id, marks["TEST_ID"].nunique(), marks["STUDENT_ID"].nunique(),
+                 *map(value, course.iloc[0])),
+            ))
+    _refresh_summary_rows(statements)
+
+
+def rebuild_result_stats() -> int:
+    """Recompute every test and course (after writes made outside the app); returns the test count."""
+    test_ids = [r["TEST_ID"] for r in run_query("SELECT TEST_ID FROM test;")]
+    run_transaction([
+        ("DELETE FROM result_test_stats WHERE TEST_ID NOT IN (SELECT TEST_ID FROM test);", ()),
+        ("DELETE FROM result_grade_counts WHERE TEST_ID NOT IN (SELECT TEST_ID FROM test);", ()),
+    ])
+    refresh_result_stats(*test_ids)
+    return len(test_ids)
+
+
+@table_cached(("test", "course"))
+def get_tests(course_name=None) -> pd.DataFrame:
+    where, params = ("WHERE c.COURSE_NAME = %s", (course_name,)) if course_name else ("", ())
+    return pd.DataFrame(run_query(f"""
+        SELECT t.TEST_ID, t.TEST_NAME, c.COURSE_NAME
+        FROM test t JOIN course c ON c.COURSE_ID = t.COURSE_ID
+        {where}
+        ORDER BY t.TEST_ID DESC;
+    """, params))
+
+
+@table_cached(("test", "course", "student", "result"), ttl=60)
+def get_marks_sheet(test_id) -> pd.DataFrame:
+    """Active students of the test's course, with any marks already entered."""
+    rows = run_query("""
+        SELECT s.STUDENT_ID, s.NAME, r.MARKS_OBTAINED, r.GRADE, r.REMARKS
+        FROM test t
+        JOIN course c  ON c.COURSE_ID = t.COURSE_ID
+        JOIN student s ON s.COURSE_NAME = c.COURSE_NAME AND s.STATUS = 'Active'
+        LEFT JOIN result r ON r.TEST_ID = t.TEST_ID AND r.STUDENT_ID = s.STUDENT_ID
+        WHERE t.TEST_ID = %s
+        ORDER BY s.STUDENT_ID
+        LIMIT %s;
+    """, (test_id, PAGE_ROWS))
+    return pd.DataFrame(rows, columns=["STUDENT_ID", "NAME", "MARKS_OBTAINED", "GRADE", "REMARKS"])
+
+
+def record_marks(test_id, marks: pd.DataFrame) -> dict:
+    """Save one test's marks sheet (RESULT_FIELDS columns) in one transaction and refresh
+    that test's statistics; re-saving a student updates their row."""
+    values = marks[RESULT_FIELDS].astype(object)
+    values = values.where(values.notna(), None)
+    res = bulk_upsert(
+        "result", ["TEST_ID", *RESULT_FIELDS],
+        [(int(test_id), *row) for row in values.itertuples(index=False, name=None)],
+        update_columns=RESULT_FIELDS[1:]
+    )
+    refresh_result_stats(test_id)
+    return res
+
+
+@table_cached(("result", "test"))
+def get_student_performance(student_id) -> pd.DataFrame:
+    """The student's marks in every test they took, with rank, percentile and test average."""
+    rows = run_query("""
+        SELECT r.TEST_ID, t.TEST_NAME, r.STUDENT_ID, r.MARKS_OBTAINED
+        FROM result mine
+        JOIN result r ON r.TEST_ID = mine.TEST_ID
+        JOIN test t   ON t.TEST_ID = mine.TEST_ID
+        WHERE mine.STUDENT_ID = %s;
+    """, (student_id,))
+    if not rows:
+        return pd.DataFrame()
+    ranked = resultstats.rank_within(pd.DataFrame(rows))
+    average = ranked.groupby("TEST_ID")[resultstats.MARKS].mean().round(2).rename("TEST_AVG")
+    mine = ranked[ranked["STUDENT_ID"].astype(str) == str(student_id)]
+    return (mine.drop(columns="STUDENT_ID").join(average, on="TEST_ID")
+            .sort_values("TEST_ID").reset_index(drop=True))
+
+
+@table_cached(("result", "test", "course", "student"))
+def get_course_standings(course_name: str) -> pd.DataFrame:
+    """Students of a course ranked on their average percentile across its tests."""
+    rows = run_query("""
+        SELECT r.TEST_ID, r.STUDENT_ID, r.MARKS_OBTAINED
+        FROM course c
+        JOIN test t   ON t.COURSE_ID = c.COURSE_ID
+        JOIN result r ON r.TEST_ID = t.TEST_ID
+        WHERE c.COURSE_NAME = %s;
+    """, (course_name,))
+    if not rows:
+        return pd.DataFrame()
+    table = resultstats.standings(resultstats.rank_within(pd.DataFrame(rows)))
+    names = pd.DataFrame(
+        run_query("SELECT STUDENT_ID, NAME FROM student WHERE COURSE_NAME = %s;", (course_name,)),
+        columns=["STUDENT_ID", "NAME"]
+    ).set_index("STUDENT_ID")
+    return names.join(table, how="right")[["NAME", "RANK", "TESTS", "AVG_MARKS", "AVG_PERCENTILE"]]
+
+
+# ========== TIMETABLE (timetable.py) ==========
+def get_schedule_columns() -> dict:
+    """class_schedule column for each timetable role (see timetable.COLUMN_CANDIDATES)."""
+    return timetable.resolve_columns(get_table_columns("class_schedule"))
+
+
+def timetable_ready(cols: dict) -> bool:
+    return bool(cols["start"] and cols["end"])
+
+
+@table_cached(("class_schedule",))
+def get_timetable_indexes() -> dict:
+    """Room and faculty interval indexes, rebuilt only when class_schedule changes."""
+    df, cols = get_table_df("class_schedule"), get_schedule_columns()
+    return {
+        kind: timetable.IntervalIndex(df, cols, kind)
+        for kind in ("room", "faculty") if cols[kind] and timetable_ready(cols)
+    }
+
+
+# ========== TIMETABLE GENERATOR (scheduler.py, migrations/007) ==========
+def build_schedule_problem(keep_existing: bool, sessions_per_week: int) -> scheduler.Problem:
+    """Scheduling problem from the batch, faculty, room and class_schedule tables."""
+    unavailable = (
+        get_table_df("faculty_unavailability") if "faculty_unavailability" in get_all_tables() else None
+    )
+    open_m, close_m = timetable.to_minutes([ROOM_OPEN, ROOM_CLOSE])
+    return scheduler.problem_from_tables(
+        get_table_df("batch"), get_table_df("faculty"), get_table_df("room"),
+        schedule_df=get_table_df("class_schedule"), unavailable_df=unavailable,
+        open_minutes=int(open_m), close_minutes=int(close_m), period_minutes=PERIOD_MINUTES,
+        sessions_per_week=sessions_per_week, default_max_per_day=FACULTY_MAX_PER_DAY,
+        keep_existing=keep_existing,
+    )
+
+
+def save_generated_timetable(problem: scheduler.Problem, assignment: dict, week_start: date = None) -> dict:
+    """Insert generated classes into class_schedule (DATE day columns need ``week_start``)."""
+    cols = get_schedule_columns()
+    roles = ("batch", "faculty", "room", "day", "start", "end")
+    missing = [role for role in roles if not cols[role]]
+    if missing:
+        raise ValueError(f"class_schedule has no column for: {', '.join(missing)}")
+    types = {c["COLUMN_NAME"]: c["DATA_TYPE"].lower() for c in get_table_schema("class_schedule")}
+    dated = types[cols["day"]] in ("date", "datetime", "timestamp")
+    if dated and week_start is None:
+        raise ValueError(f"{cols['day']} is a date column; choose the week to save into.")
+
+    rows = []
+    for row in scheduler.to_rows(problem, assignment):
+        day = (
+            week_start + pd.Timedelta(days=scheduler.DAYS.index(row["day"])) if dated else row["day"]
+        )
+        values = (row["batch"], row["faculty"], row["room"], day,
+                  timetable.format_minutes(row["start"]) + ":00", timetable.format_minutes(row["end"]) + ":00")
+        rows.append(tuple(v.item() if hasattr(v, "item") else v for v in values))
+    return bulk_upsert("class_schedule", [cols[role] for role in roles], rows)
+
+
+# ========== BULK IMPORT (migrations/005) ==========
+IMPORT_TABLES = ["student", "lead", "fee_payment", "result"]
+
+
+def get_import_job(table_name: str, file_hash: str):
+    rows = run_query(
+        "SELECT * FROM import_job WHERE TABLE_NAME = %s AND FILE_SHA256 = %s;",
+        (table_name, file_hash)
+    )
+    return rows[0] if rows else None
+
+
+def start_import_job(table_name: str, file_name: str, file_hash: str, restart: bool = False) -> dict:
+    """Create (or reuse, or reset with ``restart``) the checkpoint row for a file."""
+    run_execute("""
+        INSERT INTO import_job (TABLE_NAME, FILE_NAME, FILE_SHA256)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE FILE_NAME = VALUES(FILE_NAME), STATUS = 'running';
+    """, (table_name, file_name, file_hash))
+    if restart:
+        run_execute("""
+            UPDATE import_job SET ROWS_COMMITTED = 0, ROWS_WRITTEN = 0, ROWS_REJECTED = 0
+            WHERE TABLE_NAME = %s AND FILE_SHA256 = %s;
+        """, (table_name, file_hash))
+    return get_import_job(table_name, file_hash)
+
+
+def import_summary_statements(table_name: str, columns: list, rows: list) -> list:
+    """Summary recounts for an imported chunk, run in the chunk's own transaction."""
+    col = {c: i for i, c in enumerate(columns)}
+    if table_name == "student" and "COURSE_NAME" in col:
+        return course_headcount_statements(*{r[col["COURSE_NAME"]] for r in rows})
+    if table_name == "lead" and "STATUS" in col:
+        return lead_status_statements(*{r[col["STATUS"]] for r in rows})
+    if table_name == "fee_payment" and "PAYMENT_DATE" in col:
+        return fee_month_statements(*{r[col["PAYMENT_DATE"]] for r in rows if r[col["PAYMENT_DATE"]]})
+    return []
+
+
+def after_import_chunk(table_name: str, columns: list, rows: list, summary=()):
+    """Keep derived tables in step with imported rows (``summary``: the chunk's
+    import_summary_statements, already committed)."""
+    if not rows:
+        return
+    if summary:
+        after_write(*(query for query, _ in summary))
+    col = {c: i for i, c in enumerate(columns)}
+    if table_name == "fee_payment":
+        after_write(LEDGER_UPSERT)
+    elif table_name == "result" and "TEST_ID" in col:
+        refresh_result_stats(*{r[col["TEST_ID"]] for r in rows})
+
+
+def run_import(table_name: str, upload, job: dict, on_progress=None) -> dict:
+    """Stream ``upload`` into ``table_name`` chunk by chunk, resuming after ``job``'s checkpoint.
+
+    Every chunk is validated, inserted and checkpointed in one transaction, so
+    a crash or a failed chunk loses nothing and re-running resumes exactly
+    where the last committed chunk ended.
+    """
+    schema = get_table_schema(table_name)
+    done = job["ROWS_COMMITTED"]
+    stats = {"rows": 0, "written": 0, "rejected": [], "seconds": 0.0, "unknown_columns": []}
+    started = time.perf_counter()
+    mapping = None
+
+    for chunk in importer.iter_chunks(upload, upload.name, IMPORT_CHUNK_ROWS, skip_rows=done):
+        if mapping is None:
+            mapping, stats["unknown_columns"], missing = importer.match_columns(chunk.columns, schema)
+            if missing:
+                raise ValueError(f"File is missing required column(s): {', '.join(missing)}")
+        columns, rows, rejects = importer.coerce_chunk(chunk, mapping, schema, first_row=done + 1)
+        first_row = done + 1
+        done += len(chunk)
+        summary = import_summary_statements(table_name, columns, rows)
+
+        def checkpoint(cur, written, errors, done=done, n_rejected=len(rejects),
+                       columns=columns, rows=rows, summary=summary):
+            if table_name == "fee_payment":
+                failed = {i for i, _ in errors}
+                apply_payments_to_ledger(cur, columns, [r for i, r in enumerate(rows) if i not in failed])
+            for query, params in summary:
+                cur.execute(query, params)
+            cur.execute("""
+                UPDATE import_job
+                SET ROWS_COMMITTED = %s,
+                    ROWS_WRITTEN = ROWS_WRITTEN + %s,
+                    ROWS_REJECTED = ROWS_REJECTED + %s
+                WHERE JOB_ID = %s;
+            """, (done, written, n_rejected + len(errors), job["JOB_ID"]))
+
+        res = bulk_upsert(table_name, columns, rows, before_commit=checkpoint)
+        after_import_chunk(table_name, columns, rows, summary)
+
+        # DB-rejected rows are indexed within the coerced rows; map them back to file rows.
+        rejected_rows = {r for r, _ in rejects}
+        good_rows = [n for n in range(first_row, done + 1) if n not in rejected_rows]
+        stats["rejected"] += rejects + [(good_rows[i], err) for i, err in res["errors"]]
+        stats["rows"] += len(chunk)
+        stats["written"] += res["written"]
+        stats["seconds"] = time.perf_counter() - started
+        if on_progress:
+            on_progress(stats, done)
+
+    if table_name == "lead" and funnel_ready():
+        sync_lead_funnel()
+    run_execute("UPDATE import_job SET STATUS = 'done' WHERE JOB_ID = %s;", (job["JOB_ID"],))
+    return stats
+
+
+def fail_import_job(table_name: str, file_hash: str):
+    run_execute(
+        "UPDATE import_job SET STATUS = 'failed' WHERE TABLE_NAME = %s AND FILE_SHA256 = %s;",
+        (table_name, file_hash)
+    )
+
+
+# ========== STREAMING EXPORT ==========
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "erp_exports")
+EXPORT_FORMATS = {
+    "CSV": ".csv",
+    "CSV (gzip)": ".csv.gz",
+    "Parquet": ".parquet",
+}
+# information_schema DATA_TYPE -> Arrow type name; DECIMAL keeps its declared precision and scale
+_ARROW_TYPES = {
+    **dict.fromkeys(("tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year", "bit"), "int64"),
+    **dict.fromkeys(("float", "double", "real"), "float64"),
+    "date": "date32",
+    **dict.fromkeys(("datetime", "timestamp"), "timestamp[us]"),
+    "time": "duration[us]",
+    **dict.fromkeys(("binary", "varbinary", "tinyblob", "blob", "mediumblob", "longblob"), "binary"),
+}
+
+
+def arrow_schema(table_name: str, columns):
+    """Arrow schema for ``columns`` of a table, from their declared MySQL types.
+
+    Parquet files need one type per column up front; taken from the first
+    rows read, a later DECIMAL with more digits or a column that was NULL so
+    far would not fit. Columns the metadata does not know become strings.
+    """
+    import pyarrow as pa
+
+    declared = {c["COLUMN_NAME"]: c for c in get_table_schema(table_name)}
+    fields = []
+    for name in columns:
+        info = declared.get(name) or {"DATA_TYPE": "", "COLUMN_TYPE": ""}
+        kind = info["DATA_TYPE"].lower()
+        if kind in ("decimal", "numeric"):
+            precision, scale = info["NUMERIC_PRECISION"], info["NUMERIC_SCALE"] or 0
+            type_ = (pa.decimal128 if precision <= 38 else pa.decimal256)(precision, scale)
+        elif kind == "bigint" and "unsigned" in info["COLUMN_TYPE"].lower():
+            type_ = pa.uint64()
+        else:
+            type_ = pa.type_for_alias(_ARROW_TYPES.get(kind, "string"))
+        fields.append(pa.field(name, type_))
+    return pa.schema(fields)
+
+
+def arrow_batch(rows, schema):
+    """Driver rows (tuples in ``schema`` order) as an Arrow table of exactly that schema."""
+    import pyarrow as pa
+
+    return pa.Table.from_arrays(
+        [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)],
+        schema=schema,
+    )
+
+
+def export_table(table_name: str, fmt: str = "CSV", search_text: str = "", filters: tuple = (),
+                 order_by: str = None, descending: bool = False, progress=None) -> str:
+    """Stream a (filtered) table to a file on disk and return its path.
+
+    Rows come from an unbuffered cursor in EXPORT_CHUNK_ROWS chunks, so memory
+    stays bounded by one chunk whatever the table size. ``progress`` is an
+    optional callback receiving the number of rows written so far.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "Parquet":
+        import pyarrow.parquet as pq
+
+    where, params = build_where(table_name, search_text, filters)
+    order = ""
+    if order_by:
+        if order_by not in get_table_columns(table_name):
+            raise ValueError(f"Unknown column: {order_by}")
+        order = f"ORDER BY `{order_by}` {'DESC' if descending else 'ASC'}"
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"{table_name}_", suffix=EXPORT_FORMATS[fmt], dir=EXPORT_DIR)
+    os.close(fd)
+
+    written = 0
+    with instrumented(f"/* export {fmt} */ SELECT * FROM `{table_name}` {where} {order}", params) as probe, \
+            get_read_connection() as conn:
+        cur = conn.cursor(buffered=False)
+        try:
+            cur.execute(f"SELECT * FROM `{table_name}` {where} {order};", params)
+            header = [d[0] for d in cur.description]
+
+            if fmt == "Parquet":
+                schema = arrow_schema(table_name, header)
+                with pq.ParquetWriter(path, schema) as writer:
+                    while True:
+                        chunk = cur.fetchmany(EXPORT_CHUNK_ROWS)
+                        if not chunk:
+                            break
+                        writer.write_table(arrow_batch(chunk, schema))
+                        written += len(chunk)
+                        if progress:
+                            progress(written)
+            else:
+                opener = gzip.open if fmt == "CSV (gzip)" else open
+                with opener(path, "wt", newline="", encoding="utf-8") as fh:
+                    out = csv.writer(fh)
+                    out.writerow(header)
+                    while True:
+                        chunk = cur.fetchmany(EXPORT_CHUNK_ROWS)
+                        if not chunk:
+                            break
+                        out.writerows(chunk)
+                        written += len(chunk)
+                        if progress:
+                            progress(written)
+        finally:
+            cur.close()
+        probe["rows"], probe["bytes"] = written, os.path.getsize(path)
+    return path
+
+
+# ========== PRE-WARMED LOADERS ==========
+# (loader, args, kwargs) loaded when the refresher starts and kept fresh by it:
+# the queries behind the first screen of each page, called exactly as the pages
+# call them so the cache keys match.
+WARM_LOADERS = [
+    (load_summary, ("course_headcount",), {}),
+    (load_summary, ("fee_monthly",), {}),
+    (load_summary, ("lead_status",), {}),
+    (count_table_rows, ("course", "", (("STATUS", "equals", "Active"),)), {}),
+    *((loader, (table_name, "", ()), kwargs)
+      for table_name in ("student", "course", "lead")
+      for loader, kwargs in ((count_table_rows, {}), (get_table_page, {"limit": PAGE_ROWS}))),
+    (get_distinct_values, ("student", "COURSE_NAME"), {}),
+    (get_distinct_values, ("student", "STATUS"), {}),
+    (get_distinct_values, ("course", "STATUS"), {}),
+    (get_distinct_values, ("lead", "STATUS"), {}),
+    (get_course_fee_summary, (), {}),
+    (get_attendance_bounds, (), {}),
+    (get_fee_ledger_page, (False, PAGE_ROWS, 0), {}),
+    (get_fee_by_course, (), {}),
+    (get_results, (None, None), {}),
+    (count_results, (None, None), {}),
+]
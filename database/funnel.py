@@ -0,0 +1,162 @@
+"""Lead funnel bookkeeping: status events and incremental funnel counters (migrations/009)."""
+import pandas as pd
+
+# In funnel order; a lead's furthest stage never moves back.
+FUNNEL_STAGES = ("New", "In Follow-up", "Converted")
+EXIT_STATUSES = ("Not Interested", "Lost")
+# upper bounds (seconds) of the lead_stage_time buckets
+STAGE_BUCKETS = {"UNDER_1D": 86400, "UNDER_7D": 7 * 86400, "UNDER_30D": 30 * 86400, "OVER_30D": None}
+
+# role -> accepted lead column names, first match wins
+COLUMN_CANDIDATES = {
+    "source": ("SOURCE", "LEAD_SOURCE"),
+    "created": ("CREATED_AT", "CREATED_ON", "ENQUIRY_DATE", "LEAD_DATE"),
+}
+
+
+def resolve_columns(columns) -> dict:
+    upper = {str(c).upper(): c for c in columns}
+    return {
+        role: next((upper[c] for c in names if c in upper), None)
+        for role, names in COLUMN_CANDIDATES.items()
+    }
+
+
+def stage_of(status) -> int:
+    """Funnel stage index of a status; exits and unknown statuses count as the first stage."""
+    return FUNNEL_STAGES.index(status) if status in FUNNEL_STAGES else 0
+
+
+def month(value) -> str:
+    return pd.Timestamp(value).strftime("%Y-%m")
+
+
+def add_leads_statements(cols: dict, lead_ids=None) -> list:
+    """Count leads that have no lead_funnel_state row yet and give them one.
+
+    Their furthest stage is their current status's stage (earlier history is
+    unknown), and their time in the current status only starts being measured
+    for leads still "New" (since they were created).
+    """
+    source = f"IFNULL(l.`{cols['source']}`, '')" if cols["source"] else "''"
+    # 'YYYY-MM' of the creation time
+    cohort = f"LEFT(IFNULL(l.`{cols['created']}`, NOW()), 7)" if cols["created"] else "LEFT(NOW(), 7)"
+    since = f"IFNULL(l.`{cols['created']}`, NOW())" if cols["created"] else "NOW()"
+    stage = "CASE l.STATUS " + " ".join(
+        f"WHEN '{status}' THEN {i}" for i, status in enumerate(FUNNEL_STAGES) if i
+    ) + " ELSE 0 END"
+    where, params = "WHERE f.LEAD_ID IS NULL", ()
+    if lead_ids is not None:
+        lead_ids = list(lead_ids)
+        if not lead_ids:
+            return []
+        where += f" AND l.LEAD_ID IN ({', '.join(['%s'] * len(lead_ids))})"
+        params = tuple(lead_ids)
+    missing = f"FROM lead l LEFT JOIN lead_funnel_state f ON f.LEAD_ID = l.LEAD_ID {where}"
+    return [
+        (f"""INSERT INTO lead_funnel_counts (COHORT, SOURCE, FURTHEST_STAGE, LEADS)
+             SELECT {cohort}, {source}, {stage}, COUNT(*) {missing}
+             GROUP BY 1, 2, 3
+             ON DUPLICATE KEY UPDATE LEADS = LEADS + VALUES(LEADS);""", params),
+        (f"""INSERT INTO lead_period_counts (PERIOD, SOURCE, TO_STATUS, CHANGES)
+             SELECT {cohort}, {source}, '{FUNNEL_STAGES[0]}', COUNT(*) {missing}
+             GROUP BY 1, 2
+             ON DUPLICATE KEY UPDATE CHANGES = CHANGES + VALUES(CHANGES);""", params),
+        (f"""INSERT INTO lead_funnel_state (LEAD_ID, COHORT, SOURCE, STATUS, FURTHEST_STAGE, STATUS_SINCE)
+             SELECT l.LEAD_ID, {cohort}, {source}, IFNULL(l.STATUS, ''), {stage},
+                    CASE WHEN l.STATUS = '{FUNNEL_STAGES[0]}' THEN {since} END
+             {missing};""", params),
+    ]
+
+
+def transition_statements(state: dict, new_status: str, now) -> list:
+    """Statements recording one lead's move from ``state`` (its lead_funnel_state row)
+    to ``new_status`` at ``now``."""
+    lead_id, cohort, source = state["LEAD_ID"], state["COHORT"], state["SOURCE"]
+    since = state["STATUS_SINCE"]
+    seconds = max(int((pd.Timestamp(now) - pd.Timestamp(since)).total_seconds()), 0) if since else None
+    statements = [(
+        """INSERT INTO lead_status_event (LEAD_ID, FROM_STATUS, TO_STATUS, SOURCE, CHANGED_AT, SECONDS_IN_STAGE)
+           VALUES (%s, %s, %s, %s, %s, %s);""",
+        (lead_id, state["STATUS"], new_status, source, now, seconds),
+    )]
+
+    if seconds is not None:
+        bucket = next(name for name, limit in STAGE_BUCKETS.items() if limit is None or seconds < limit)
+        statements.append((
+            f"""INSERT INTO lead_stage_time (STATUS, EXITS, TOTAL_SECONDS, MAX_SECONDS, {bucket})
+                VALUES (%s, 1, %s, %s, 1)
+                ON DUPLICATE KEY UPDATE EXITS = EXITS + 1,
+                    TOTAL_SECONDS = TOTAL_SECONDS + VALUES(TOTAL_SECONDS),
+                    MAX_SECONDS = GREATEST(MAX_SECONDS, VALUES(MAX_SECONDS)),
+                    {bucket} = {bucket} + 1;""",
+            (state["STATUS"], seconds, seconds),
+        ))
+
+    furthest = max(int(state["FURTHEST_STAGE"]), stage_of(new_status))
+    if furthest != state["FURTHEST_STAGE"]:
+        statements += [
+            ("""UPDATE lead_funnel_counts SET LEADS = LEADS - 1
+                WHERE COHORT = %s AND SOURCE = %s AND FURTHEST_STAGE = %s;""",
+             (cohort, source, state["FURTHEST_STAGE"])),
+            ("""INSERT INTO lead_funnel_counts (COHORT, SOURCE, FURTHEST_STAGE, LEADS) VALUES (%s, %s, %s, 1)
+                ON DUPLICATE KEY UPDATE LEADS = LEADS + 1;""",
+             (cohort, source, furthest)),
+        ]
+
+    statements += [
+        ("""INSERT INTO lead_period_counts (PERIOD, SOURCE, TO_STATUS, CHANGES) VALUES (%s, %s, %s, 1)
+            ON DUPLICATE KEY UPDATE CHANGES = CHANGES + 1;""",
+         (month(now), source, new_status)),
+        ("""UPDATE lead_funnel_state SET STATUS = %s, FURTHEST_STAGE = %s, STATUS_SINCE = %s
+            WHERE LEAD_ID = %s;""",
+         (new_status, furthest, now, lead_id)),
+    ]
+    return statements
+
+
+def funnel_table(counts: pd.DataFrame, by: str = None) -> pd.DataFrame:
+    """Leads that reached each stage (furthest stage at or beyond it) and the share converted.
+
+    ``counts`` has FURTHEST_STAGE and LEADS (plus ``by``, e.g. COHORT or SOURCE).
+    """
+    columns = list(FUNNEL_STAGES) + ["CONVERSION_PCT"]
+    if counts.empty:
+        return pd.DataFrame(columns=columns)
+    index = counts[by] if by else pd.Series("All", index=counts.index, name="FUNNEL")
+    per_stage = (
+        pd.to_numeric(counts["LEADS"]).groupby([index, counts["FURTHEST_STAGE"].astype(int)]).sum()
+        .unstack(fill_value=0).reindex(columns=range(len(FUNNEL_STAGES)), fill_value=0)
+    )
+    reached = per_stage.iloc[:, ::-1].cumsum(axis=1).iloc[:, ::-1]
+    reached.columns = list(FUNNEL_STAGES)
+    top = reached[FUNNEL_STAGES[0]].where(reached[FUNNEL_STAGES[0]] > 0)
+    reached["CONVERSION_PCT"] = (100 * reached[FUNNEL_STAGES[-1]] / top).round(1)
+    return reached[columns]
+
+
+def period_table(changes: pd.DataFrame) -> pd.DataFrame:
+    """Status changes per month (one column per status) and converted / new leads."""
+    if changes.empty:
+        return pd.DataFrame()
+    table = changes.pivot_table(index="PERIOD", columns="TO_STATUS", values="CHANGES",
+                                aggfunc="sum", fill_value=0).sort_index()
+    new, won = FUNNEL_STAGES[0], FUNNEL_STAGES[-1]
+    if new in table and won in table:
+        table["CONVERSION_PCT"] = (100 * table[won] / table[new].where(table[new] > 0)).round(1)
+    return table
+
+
+def stage_time_table(stage_time: pd.DataFrame) -> pd.DataFrame:
+    """Average and longest days spent in each status, with the bucket shares."""
+    if stage_time.empty:
+        return pd.DataFrame()
+    df = stage_time.set_index("STATUS").apply(pd.to_numeric)
+    out = pd.DataFrame({
+        "EXITS": df["EXITS"],
+        "AVG_DAYS": (df["TOTAL_SECONDS"] / df["EXITS"] / 86400).round(1),
+        "MAX_DAYS": (df["MAX_SECONDS"] / 86400).round(1),
+    })
+    for bucket in STAGE_BUCKETS:
+        out[f"{bucket}_PCT"] = (100 * df[bucket] / df["EXITS"]).round(1)
+    return out
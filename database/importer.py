@@ -0,0 +1,187 @@
+"""Spreadsheet import helpers: chunked reading and schema-driven validation."""
+import hashlib
+import re
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+
+INT_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+DECIMAL_TYPES = {"decimal", "numeric"}
+FLOAT_TYPES = {"float", "double", "real"}
+DATE_TYPES = {"date"}
+DATETIME_TYPES = {"datetime", "timestamp"}
+
+
+def file_sha256(fh, block_size: int = 1 << 20) -> str:
+    """Hash an uploaded file (used as the resume key) without reading it all at once."""
+    digest = hashlib.sha256()
+    fh.seek(0)
+    for block in iter(lambda: fh.read(block_size), b""):
+        digest.update(block)
+    fh.seek(0)
+    return digest.hexdigest()
+
+
+def iter_chunks(fh, file_name: str, chunk_rows: int, skip_rows: int = 0):
+    """Yield DataFrames of at most ``chunk_rows`` rows, every cell as a string.
+
+    ``skip_rows`` data rows (after the header) are skipped, which is how an
+    interrupted import resumes. CSV is parsed incrementally by pandas; Excel
+    is streamed with openpyxl's read-only mode.
+    """
+    fh.seek(0)
+    if file_name.lower().endswith((".xlsx", ".xlsm")):
+        yield from _iter_excel_chunks(fh, chunk_rows, skip_rows)
+        return
+    reader = pd.read_csv(
+        fh,
+        dtype=str,
+        keep_default_na=False,
+        na_values=[""],
+        skiprows=range(1, skip_rows + 1),
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        yield chunk
+
+
+def _iter_excel_chunks(fh, chunk_rows: int, skip_rows: int):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fh, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        buf = []
+        for i, row in enumerate(rows):
+            if i < skip_rows:
+                continue
+            buf.append(["" if v is None else str(v) for v in row[:len(header)]])
+            if len(buf) == chunk_rows:
+                yield pd.DataFrame(buf, columns=header).replace("", None)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header).replace("", None)
+    finally:
+        wb.close()
+
+
+def match_columns(file_columns, schema) -> tuple:
+    """Map file headers to table columns case-insensitively.
+
+    Returns ``(mapping, unknown_headers, missing_required)`` where ``mapping``
+    is ``{file_header: table_column}``. Required columns are NOT NULL without
+    a default and not auto-increment.
+    """
+    by_lower = {c["COLUMN_NAME"].lower(): c["COLUMN_NAME"] for c in schema}
+    mapping, unknown = {}, []
+    for header in file_columns:
+        column = by_lower.get(str(header).strip().lower())
+        if column:
+            mapping[header] = column
+        else:
+            unknown.append(header)
+    mapped = set(mapping.values())
+    missing = [
+        c["COLUMN_NAME"] for c in schema
+        if c["IS_NULLABLE"] == "NO"
+        and c["COLUMN_DEFAULT"] is None
+        and "auto_increment" not in (c["EXTRA"] or "")
+        and c["COLUMN_NAME"] not in mapped
+    ]
+    return mapping, unknown, missing
+
+
+def _enum_values(column_type: str) -> list:
+    return re.findall(r"'((?:[^']|'')*)'", column_type)
+
+
+def _decimal(text: str, precision: int, scale: int):
+    """Exact value of a DECIMAL(precision, scale) cell, or None if it is not one.
+
+    More fractional digits than ``scale`` are rejected rather than rounded.
+    """
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not value.is_finite():
+        return None
+    decimals = max(-value.normalize().as_tuple().exponent, 0)
+    if decimals > scale or (value and value.adjusted() + 1 > precision - scale):
+        return None
+    return value
+
+
+def coerce_chunk(chunk: pd.DataFrame, mapping: dict, schema, first_row: int) -> tuple:
+    """Validate and type-convert one chunk against the table schema.
+
+    Returns ``(columns, rows, errors)``: the table column names, a list of
+    value tuples ready for the driver (None for NULL) and a list of
+    ``(file_row_number, message)`` for rejected rows. ``first_row`` is the
+    1-based data row number of the chunk's first row.
+    """
+    meta = {c["COLUMN_NAME"]: c for c in schema}
+    df = chunk[list(mapping)].rename(columns=mapping)
+    df = df.apply(lambda col: col.str.strip() if pd.api.types.is_string_dtype(col) else col)
+    bad = pd.Series("", index=df.index, dtype=object)
+
+    for column in df.columns:
+        info = meta[column]
+        kind = info["DATA_TYPE"].lower()
+        raw = df[column]
+        present = raw.notna()
+        expected = kind
+
+        if kind in INT_TYPES:
+            values = pd.to_numeric(raw, errors="coerce")
+            invalid = present & (values.isna() | (values % 1 != 0))
+            df[column] = values.where(~invalid).astype("Int64")
+        elif kind in DECIMAL_TYPES:
+            precision, scale = info["NUMERIC_PRECISION"], info["NUMERIC_SCALE"] or 0
+            values = raw.map(lambda v: _decimal(v, precision, scale), na_action="ignore")
+            invalid = present & values.isna()
+            df[column] = values.astype(object)
+            expected = info["COLUMN_TYPE"]
+        elif kind in FLOAT_TYPES:
+            values = pd.to_numeric(raw, errors="coerce")
+            invalid = present & values.isna()
+            df[column] = values
+        elif kind in DATE_TYPES or kind in DATETIME_TYPES:
+            # ISO dates first, then the day-first style Indian spreadsheets use.
+            values = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+            retry = present & values.isna()
+            if retry.any():
+                values[retry] = pd.to_datetime(raw[retry], errors="coerce", dayfirst=True)
+            invalid = present & values.isna()
+            df[column] = values.dt.date if kind in DATE_TYPES else values
+        elif kind == "enum":
+            allowed = _enum_values(info["COLUMN_TYPE"])
+            invalid = present & ~raw.isin(allowed)
+        else:
+            max_len = info["CHARACTER_MAXIMUM_LENGTH"]
+            invalid = present & (raw.str.len() > max_len) if max_len else present & False
+
+        if info["IS_NULLABLE"] == "NO" and info["COLUMN_DEFAULT"] is None \
+                and "auto_increment" not in (info["EXTRA"] or ""):
+            bad.loc[~present] += f"{column} is required; "
+        bad.loc[invalid] += f"{column}: invalid {expected} value; "
+
+    errors = [
+        (first_row + pos, msg.rstrip("; "))
+        for pos, msg in enumerate(bad.tolist()) if msg
+    ]
+    good = df[bad == ""]
+    rows = [tuple(_to_python(v) for v in row) for row in good.itertuples(index=False, name=None)]
+    return list(df.columns), rows, errors
+
+
+def _to_python(value):
+    """Turn pandas/numpy scalars into types mysql-connector can convert."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
@@ -0,0 +1,106 @@
+"""Scheduled jobs: run from cron / a task scheduler instead of a page.
+
+They go through the same cached, instrumented functions in db.py as the
+Streamlit pages, so query statistics and cache behaviour match the app.
+
+    python jobs.py --password ... verify-fee-ledger --fix
+    python jobs.py --password ... sync-snapshots student attendance
+    python jobs.py --password ... refresh-summaries
+    python jobs.py --password ... refresh-result-stats
+    python jobs.py --password ... sync-lead-funnel
+    python jobs.py --password ... export student --format "CSV (gzip)"
+
+``--stats`` prints the per-statement timings of the run at the end.
+"""
+import argparse
+import sys
+
+import db
+
+
+def verify_fee_ledger(args):
+    drift = db.verify_fee_ledger(fix=args.fix)
+    if drift.empty:
+        print("fee_ledger matches fee_payment")
+        return 0
+    print(drift.to_string(index=False))
+    print(f"{len(drift)} ledger rows differ{' (rebuilt)' if args.fix else ''}")
+    return 0 if args.fix else 1
+
+
+def sync_snapshots(args):
+    if not db.snapshots_available():
+        print("snapshots need pyarrow", file=sys.stderr)
+        return 1
+    for table_name in args.tables or db.get_all_tables():
+        df = db.load_table_snapshot(table_name)
+        print(f"{table_name}: {len(df):,} rows")
+    return 0
+
+
+def refresh_summaries(args):
+    """Recount every Dashboard summary row (what the nightly MySQL event does)."""
+    db.rebuild_summaries()
+    print("summary tables refreshed")
+    return 0
+
+
+def refresh_result_stats(args):
+    """Recompute every per-test / per-course result statistic (migrations/008)."""
+    print(f"statistics refreshed for {db.rebuild_result_stats():,} tests")
+    return 0
+
+
+def sync_lead_funnel(args):
+    """Count leads the funnel tables do not know yet (migrations/009)."""
+    db.sync_lead_funnel()
+    print("lead funnel counters up to date")
+    return 0
+
+
+def export(args):
+    path = db.export_table(args.table, args.format)
+    print(path)
+    return 0
+
+
+JOBS = {
+    "verify-fee-ledger": verify_fee_ledger,
+    "sync-snapshots": sync_snapshots,
+    "refresh-summaries": refresh_summaries,
+    "refresh-result-stats": refresh_result_stats,
+    "sync-lead-funnel": sync_lead_funnel,
+    "export": export,
+}
+
+
+def add_db_args(parser):
+    """Connection options; defaults come from db.py."""
+    parser.add_argument("--host", default=db.DB_HOST)
+    parser.add_argument("--user", default=db.DB_USER)
+    parser.add_argument("--password", default=db.DB_PASSWORD)
+    parser.add_argument("--database", default=db.DB_NAME)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an ERP maintenance job")
+    add_db_args(parser)
+    parser.add_argument("--stats", action="store_true", help="print query timings at the end")
+    jobs = parser.add_subparsers(dest="job", required=True)
+    jobs.add_parser("verify-fee-ledger").add_argument("--fix", action="store_true",
+                                                      help="rebuild drifted ledger rows")
+    jobs.add_parser("sync-snapshots").add_argument("tables", nargs="*", help="default: every table")
+    jobs.add_parser("refresh-summaries")
+    jobs.add_parser("refresh-result-stats")
+    jobs.add_parser("sync-lead-funnel")
+    p = jobs.add_parser("export")
+    p.add_argument("table")
+    p.add_argument("--format", default="CSV", choices=list(db.EXPORT_FORMATS))
+    args = parser.parse_args()
+
+    db.configure(DB_HOST=args.host, DB_USER=args.user, DB_PASSWORD=args.password, DB_NAME=args.database)
+    db.set_page(f"job:{args.job}")
+    status = JOBS[args.job](args)
+    if args.stats:
+        print(db.get_query_stats().summary().to_string())
+    sys.exit(status)
@@ -0,0 +1,159 @@
+"""Typed table metadata (columns, keys, indexes, row estimates) built from INFORMATION_SCHEMA rows."""
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from functools import cached_property
+
+INT_TYPES = frozenset({"tinyint", "smallint", "mediumint", "int", "integer", "bigint"})
+TEXT_TYPES = frozenset({"char", "varchar", "tinytext", "text", "mediumtext", "longtext"})
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    data_type: str                  # lower-case DATA_TYPE, e.g. "varchar"
+    column_type: str                # full COLUMN_TYPE, e.g. "int unsigned"
+    nullable: bool
+    default: object
+    extra: str
+    max_length: int | None
+    precision: int | None           # NUMERIC_PRECISION / NUMERIC_SCALE of numeric columns
+    scale: int | None
+    key: str                        # COLUMN_KEY: "PRI", "UNI", "MUL" or ""
+
+    @property
+    def is_integer(self) -> bool:
+        return self.data_type in INT_TYPES
+
+    @property
+    def is_text(self) -> bool:
+        return self.data_type in TEXT_TYPES
+
+    def as_row(self) -> dict:
+        """The information_schema.COLUMNS row (the shape db.get_table_schema returns)."""
+        return {
+            "COLUMN_NAME": self.name,
+            "DATA_TYPE": self.data_type,
+            "COLUMN_TYPE": self.column_type,
+            "IS_NULLABLE": "YES" if self.nullable else "NO",
+            "COLUMN_DEFAULT": self.default,
+            "EXTRA": self.extra,
+            "CHARACTER_MAXIMUM_LENGTH": self.max_length,
+            "NUMERIC_PRECISION": self.precision,
+            "NUMERIC_SCALE": self.scale,
+            "COLUMN_KEY": self.key,
+        }
+
+
+@dataclass(frozen=True)
+class Index:
+    name: str
+    columns: tuple                  # in SEQ_IN_INDEX order
+    unique: bool
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    columns: tuple                  # Column, in ordinal order
+    indexes: tuple                  # Index
+    row_estimate: int | None        # InnoDB TABLE_ROWS: approximate, refreshed on every version check
+
+    @cached_property
+    def column_names(self) -> tuple:
+        return tuple(c.name for c in self.columns)
+
+    @cached_property
+    def _by_name(self) -> dict:
+        return {c.name: c for c in self.columns}
+
+    def column(self, name: str) -> Column | None:
+        return self._by_name.get(name)
+
+    def has(self, *names: str) -> bool:
+        return all(n in self._by_name for n in names)
+
+    @cached_property
+    def primary_key(self) -> tuple:
+        return next((i.columns for i in self.indexes if i.name == "PRIMARY"), ())
+
+    @property
+    def single_key(self) -> str | None:
+        """The primary key column when the key is one column (keyset pagination, search)."""
+        return self.primary_key[0] if len(self.primary_key) == 1 else None
+
+    @property
+    def int_key(self) -> str | None:
+        """The primary key column when it is a single integer column (snapshot high-water marks)."""
+        key = self.single_key
+        return key if key and self._by_name[key].is_integer else None
+
+    @cached_property
+    def leading_columns(self) -> frozenset:
+        return frozenset(i.columns[0] for i in self.indexes if i.columns)
+
+    def indexed(self, column: str) -> bool:
+        """Whether an index starts with ``column`` (so equality, range and ORDER BY can use it)."""
+        return column in self.leading_columns
+
+
+@dataclass(frozen=True)
+class Schema:
+    version: tuple                  # changes whenever a column or index changes
+    tables: dict                    # name -> Table
+
+    @cached_property
+    def table_names(self) -> list:
+        return sorted(self.tables)
+
+    def table(self, name: str) -> Table | None:
+        return self.tables.get(name)
+
+    def with_row_estimates(self, table_rows) -> Schema:
+        """Same schema with TABLE_ROWS taken from fresh information_schema.TABLES rows."""
+        rows = {r["TABLE_NAME"]: r["TABLE_ROWS"] for r in table_rows}
+        return Schema(self.version, {
+            name: dataclasses.replace(t, row_estimate=_count(rows.get(name))) for name, t in self.tables.items()
+        })
+
+
+def _count(value) -> int | None:
+    return None if value is None else int(value)
+
+
+def build(version: tuple, table_rows, column_rows, index_rows) -> Schema:
+    """Schema from information_schema.TABLES, COLUMNS (in ordinal order) and
+    STATISTICS (in SEQ_IN_INDEX order) rows of one database."""
+    columns, indexes = {}, {}
+    for r in column_rows:
+        columns.setdefault(r["TABLE_NAME"], []).append(Column(
+            name=r["COLUMN_NAME"],
+            data_type=r["DATA_TYPE"].lower(),
+            column_type=r["COLUMN_TYPE"],
+            nullable=r["IS_NULLABLE"] == "YES",
+            default=r["COLUMN_DEFAULT"],
+            extra=r["EXTRA"] or "",
+            max_length=_count(r["CHARACTER_MAXIMUM_LENGTH"]),
+            precision=_count(r["NUMERIC_PRECISION"]),
+            scale=_count(r["NUMERIC_SCALE"]),
+            key=r["COLUMN_KEY"] or "",
+        ))
+    for r in index_rows:
+        index = indexes.setdefault(r["TABLE_NAME"], {}).setdefault(
+            r["INDEX_NAME"], {"columns": [], "unique": not int(r["NON_UNIQUE"])}
+        )
+        if r["COLUMN_NAME"] is not None:     # NULL for functional key parts
+            index["columns"].append(r["COLUMN_NAME"])
+    return Schema(version, {
+        r["TABLE_NAME"]: Table(
+            name=r["TABLE_NAME"],
+            columns=tuple(columns.get(r["TABLE_NAME"], ())),
+            indexes=tuple(
+                Index(name, tuple(i["columns"]), i["unique"])
+                for name, i in indexes.get(r["TABLE_NAME"], {}).items()
+            ),
+            row_estimate=_count(r["TABLE_ROWS"]),
+        )
+        for r in table_rows
+    })
@@ -0,0 +1,13 @@
+-- Indexes backing the filtered queries on the Students, Courses and Leads pages.
+-- Apply once:  mysql -u root -p students < migrations/001_page_filter_indexes.sql
+
+-- Students page: WHERE COURSE_NAME = ? [AND STATUS = ?], DISTINCT COURSE_NAME
+CREATE INDEX idx_student_course_status ON student (COURSE_NAME, STATUS);
+-- Students page: WHERE STATUS = ? alone, DISTINCT STATUS
+CREATE INDEX idx_student_status ON student (STATUS);
+
+-- Leads page: WHERE STATUS = ?, DISTINCT STATUS, GROUP BY STATUS
+CREATE INDEX idx_lead_status ON lead (STATUS);
+
+-- Courses page / Dashboard: WHERE STATUS = ?
+CREATE INDEX idx_course_status ON course (STATUS);
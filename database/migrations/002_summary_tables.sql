@@ -0,0 +1,60 @@
+-- Pre-aggregated summary tables read by the Dashboard (and the Students/Leads charts).
+-- The app refreshes the affected rows after each write; refresh_summaries() rebuilds
+-- everything and is scheduled below as a safety net for writes made outside the app.
+-- Apply once:  mysql -u root -p students < migrations/002_summary_tables.sql
+
+CREATE TABLE IF NOT EXISTS summary_course_headcount (
+    COURSE_NAME   VARCHAR(255) NOT NULL PRIMARY KEY,   -- '' stands for NULL
+    student_count INT NOT NULL,
+    updated_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS summary_lead_status (
+    STATUS     VARCHAR(64) NOT NULL PRIMARY KEY,       -- '' stands for NULL
+    lead_count INT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS summary_fee_monthly (
+    ym            CHAR(7) NOT NULL PRIMARY KEY,        -- 'YYYY-MM'
+    total_paid    DECIMAL(14, 2) NOT NULL,
+    payment_count INT NOT NULL,
+    updated_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Month refreshes scan one month of payments through this index.
+CREATE INDEX idx_fee_payment_date ON fee_payment (PAYMENT_DATE);
+
+DROP PROCEDURE IF EXISTS refresh_summaries;
+
+DELIMITER //
+CREATE PROCEDURE refresh_summaries()
+BEGIN
+    START TRANSACTION;
+
+    DELETE FROM summary_course_headcount;
+    INSERT INTO summary_course_headcount (COURSE_NAME, student_count)
+    SELECT IFNULL(COURSE_NAME, ''), COUNT(*) FROM student GROUP BY IFNULL(COURSE_NAME, '');
+
+    DELETE FROM summary_lead_status;
+    INSERT INTO summary_lead_status (STATUS, lead_count)
+    SELECT IFNULL(STATUS, ''), COUNT(*) FROM lead GROUP BY IFNULL(STATUS, '');
+
+    DELETE FROM summary_fee_monthly;
+    INSERT INTO summary_fee_monthly (ym, total_paid, payment_count)
+    SELECT DATE_FORMAT(PAYMENT_DATE, '%Y-%m'), SUM(AMOUNT_PAID), COUNT(*)
+    FROM fee_payment
+    WHERE PAYMENT_DATE IS NOT NULL
+    GROUP BY DATE_FORMAT(PAYMENT_DATE, '%Y-%m');
+
+    COMMIT;
+END //
+DELIMITER ;
+
+CALL refresh_summaries();
+
+-- Nightly full rebuild (needs: SET GLOBAL event_scheduler = ON;)
+DROP EVENT IF EXISTS ev_refresh_summaries;
+CREATE EVENT ev_refresh_summaries
+    ON SCHEDULE EVERY 1 DAY STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 2 HOUR)
+    DO CALL refresh_summaries();
@@ -0,0 +1,40 @@
+-- Attendance page: indexed date-range / student predicates and a daily rollup
+-- so long trend charts read one row per day instead of the raw attendance rows.
+-- Apply once:  mysql -u root -p students < migrations/003_attendance_indexes_rollup.sql
+
+-- WHERE ATTENDANCE_DATE BETWEEN ? AND ? [AND STATUS = 'Present'], MIN/MAX(ATTENDANCE_DATE)
+CREATE INDEX idx_attendance_date_status ON attendance (ATTENDANCE_DATE, STATUS);
+-- WHERE STUDENT_ID = ? AND ATTENDANCE_DATE BETWEEN ? AND ?, DISTINCT STUDENT_ID
+CREATE INDEX idx_attendance_student_date ON attendance (STUDENT_ID, ATTENDANCE_DATE);
+
+CREATE TABLE IF NOT EXISTS summary_attendance_daily (
+    ATTENDANCE_DATE DATE NOT NULL PRIMARY KEY,
+    present_count   INT NOT NULL,
+    total_count     INT NOT NULL,
+    updated_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+DROP PROCEDURE IF EXISTS refresh_attendance_daily;
+
+DELIMITER //
+CREATE PROCEDURE refresh_attendance_daily(IN d_from DATE, IN d_to DATE)
+BEGIN
+    START TRANSACTION;
+    DELETE FROM summary_attendance_daily WHERE ATTENDANCE_DATE BETWEEN d_from AND d_to;
+    INSERT INTO summary_attendance_daily (ATTENDANCE_DATE, present_count, total_count)
+    SELECT ATTENDANCE_DATE, SUM(STATUS = 'Present'), COUNT(*)
+    FROM attendance
+    WHERE ATTENDANCE_DATE BETWEEN d_from AND d_to
+    GROUP BY ATTENDANCE_DATE;
+    COMMIT;
+END //
+DELIMITER ;
+
+-- Initial backfill of the whole history.
+CALL refresh_attendance_daily('1000-01-01', '9999-12-31');
+
+-- Nightly: re-roll the last week to pick up late corrections (needs event_scheduler=ON).
+DROP EVENT IF EXISTS ev_refresh_attendance_daily;
+CREATE EVENT ev_refresh_attendance_daily
+    ON SCHEDULE EVERY 1 DAY STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 2 HOUR)
+    DO CALL refresh_attendance_daily(CURRENT_DATE - INTERVAL 7 DAY, CURRENT_DATE);
@@ -0,0 +1,10 @@
+-- Bulk attendance marking saves with INSERT ... ON DUPLICATE KEY UPDATE, so
+-- re-saving a batch for the same day updates the STATUS instead of duplicating.
+-- This needs one row per student per day; remove existing duplicates first, e.g.
+--   SELECT STUDENT_ID, ATTENDANCE_DATE, COUNT(*) FROM attendance
+--   GROUP BY STUDENT_ID, ATTENDANCE_DATE HAVING COUNT(*) > 1;
+-- Apply once:  mysql -u root -p students < migrations/004_attendance_unique_day.sql
+
+ALTER TABLE attendance
+    DROP INDEX idx_attendance_student_date,
+    ADD UNIQUE KEY uq_attendance_student_date (STUDENT_ID, ATTENDANCE_DATE);
@@ -0,0 +1,18 @@
+-- Checkpoints for the Bulk Import page. One row per (table, file content);
+-- ROWS_COMMITTED is advanced in the same transaction as each imported chunk,
+-- so an interrupted import resumes right after the last committed chunk.
+-- Apply once:  mysql -u root -p students < migrations/005_import_jobs.sql
+
+CREATE TABLE IF NOT EXISTS import_job (
+    JOB_ID         INT AUTO_INCREMENT PRIMARY KEY,
+    TABLE_NAME     VARCHAR(64)  NOT NULL,
+    FILE_NAME      VARCHAR(255) NOT NULL,
+    FILE_SHA256    CHAR(64)     NOT NULL,
+    ROWS_COMMITTED INT NOT NULL DEFAULT 0,   -- file data rows processed (written + rejected)
+    ROWS_WRITTEN   INT NOT NULL DEFAULT 0,
+    ROWS_REJECTED  INT NOT NULL DEFAULT 0,
+    STATUS         VARCHAR(16) NOT NULL DEFAULT 'running',   -- running / failed / done
+    STARTED_AT     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UPDATED_AT     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_import_job_file (TABLE_NAME, FILE_SHA256)
+);
@@ -0,0 +1,51 @@
+-- Per-student-per-course fee balance ledger for the Fees page.
+-- The app updates it in the same transaction as every payment insert (and
+-- bulk fee_payment import); verify_fee_ledger reports drift against fee_payment.
+-- Apply once:  mysql -u root -p students < migrations/006_fee_ledger.sql
+
+CREATE TABLE IF NOT EXISTS fee_ledger (
+    STUDENT_ID        INT NOT NULL,
+    COURSE_ID         INT NOT NULL,
+    TOTAL_FEES        DECIMAL(12, 2) NOT NULL,
+    TOTAL_PAID        DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    BALANCE           DECIMAL(12, 2) AS (TOTAL_FEES - TOTAL_PAID) STORED,
+    PAYMENT_COUNT     INT NOT NULL DEFAULT 0,
+    LAST_PAYMENT_DATE DATE NULL,
+    PRIMARY KEY (STUDENT_ID, COURSE_ID),
+    KEY idx_fee_ledger_balance (BALANCE)
+);
+
+-- Backfill from the payment history.
+DELETE FROM fee_ledger;
+INSERT INTO fee_ledger (STUDENT_ID, COURSE_ID, TOTAL_FEES, TOTAL_PAID, PAYMENT_COUNT, LAST_PAYMENT_DATE)
+SELECT fp.STUDENT_ID, fp.COURSE_ID, c.FEES, SUM(fp.AMOUNT_PAID), COUNT(*), MAX(fp.PAYMENT_DATE)
+FROM fee_payment fp
+JOIN course c ON c.COURSE_ID = fp.COURSE_ID
+GROUP BY fp.STUDENT_ID, fp.COURSE_ID, c.FEES;
+
+-- Lookups of one student's payments when reconciling a ledger row.
+CREATE INDEX idx_fee_payment_student_course ON fee_payment (STUDENT_ID, COURSE_ID);
+
+-- Nightly verification: drifted rows land in fee_ledger_drift for review
+-- (needs event_scheduler=ON). The Fees page can rebuild them.
+CREATE TABLE IF NOT EXISTS fee_ledger_drift (
+    CHECKED_AT  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    STUDENT_ID  INT NOT NULL,
+    COURSE_ID   INT NOT NULL,
+    EXPECTED_PAID DECIMAL(12, 2) NULL,
+    LEDGER_PAID   DECIMAL(12, 2) NULL,
+    KEY idx_fee_ledger_drift_checked (CHECKED_AT)
+);
+
+DROP EVENT IF EXISTS ev_verify_fee_ledger;
+CREATE EVENT ev_verify_fee_ledger
+    ON SCHEDULE EVERY 1 DAY STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 3 HOUR)
+    DO
+        INSERT INTO fee_ledger_drift (STUDENT_ID, COURSE_ID, EXPECTED_PAID, LEDGER_PAID)
+        SELECT a.STUDENT_ID, a.COURSE_ID, a.paid, l.TOTAL_PAID
+        FROM (
+            SELECT STUDENT_ID, COURSE_ID, SUM(AMOUNT_PAID) AS paid
+            FROM fee_payment GROUP BY STUDENT_ID, COURSE_ID
+        ) a
+        LEFT JOIN fee_ledger l ON l.STUDENT_ID = a.STUDENT_ID AND l.COURSE_ID = a.COURSE_ID
+        WHERE l.STUDENT_ID IS NULL OR l.TOTAL_PAID <> a.paid;
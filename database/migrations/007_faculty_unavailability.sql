@@ -0,0 +1,14 @@
+-- Weekly time off for the timetable generator (scheduler.py). A faculty member
+-- is never scheduled in a period that overlaps one of their rows here.
+-- DAY_OF_WEEK uses the generator's day names (Mon .. Sat).
+-- Apply once:  mysql -u root -p students < migrations/007_faculty_unavailability.sql
+
+CREATE TABLE IF NOT EXISTS faculty_unavailability (
+    ID          INT AUTO_INCREMENT PRIMARY KEY,
+    FACULTY_ID  INT NOT NULL,
+    DAY_OF_WEEK ENUM('Mon','Tue','Wed','Thu','Fri','Sat') NOT NULL,
+    START_TIME  TIME NOT NULL,
+    END_TIME    TIME NOT NULL,
+    REASON      VARCHAR(255),
+    KEY idx_faculty_unavailability (FACULTY_ID, DAY_OF_WEEK)
+);
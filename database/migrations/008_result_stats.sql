@@ -0,0 +1,53 @@
+-- Results page: filtered result queries and pre-computed per-test / per-course
+-- statistics (mean, median, quartiles, 90th percentile, grade counts).
+-- The app recomputes the rows of every test whose marks it writes (and of that
+-- test's course); fill the tables once, and after writes made outside the app, with
+--   python jobs.py --password <pw> refresh-result-stats
+-- Marks entry saves one row per student per test; remove duplicates first, e.g.
+--   SELECT STUDENT_ID, TEST_ID, COUNT(*) FROM result
+--   GROUP BY STUDENT_ID, TEST_ID HAVING COUNT(*) > 1;
+-- Apply once:  mysql -u root -p students < migrations/008_result_stats.sql
+
+-- WHERE STUDENT_ID = ?, and the marks-entry upsert
+ALTER TABLE result ADD UNIQUE KEY uq_result_student_test (STUDENT_ID, TEST_ID);
+-- WHERE TEST_ID IN (...): a test's marks are read from the index alone
+CREATE INDEX idx_result_test_marks ON result (TEST_ID, MARKS_OBTAINED);
+-- WHERE c.COURSE_NAME = ? joins course -> test
+CREATE INDEX idx_test_course ON test (COURSE_ID);
+
+CREATE TABLE IF NOT EXISTS result_test_stats (
+    TEST_ID      INT NOT NULL PRIMARY KEY,
+    COURSE_ID    INT NULL,
+    RESULT_COUNT INT NOT NULL,
+    MEAN_MARKS   DECIMAL(8, 2) NULL,
+    MEDIAN_MARKS DECIMAL(8, 2) NULL,
+    P25_MARKS    DECIMAL(8, 2) NULL,
+    P75_MARKS    DECIMAL(8, 2) NULL,
+    P90_MARKS    DECIMAL(8, 2) NULL,
+    MIN_MARKS    DECIMAL(8, 2) NULL,
+    MAX_MARKS    DECIMAL(8, 2) NULL,
+    updated_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_result_test_stats_course (COURSE_ID)
+);
+
+CREATE TABLE IF NOT EXISTS result_grade_counts (
+    TEST_ID      INT NOT NULL,
+    GRADE        VARCHAR(16) NOT NULL,                 -- '' stands for NULL
+    RESULT_COUNT INT NOT NULL,
+    PRIMARY KEY (TEST_ID, GRADE)
+);
+
+CREATE TABLE IF NOT EXISTS result_course_stats (
+    COURSE_ID     INT NOT NULL PRIMARY KEY,
+    TEST_COUNT    INT NOT NULL,
+    STUDENT_COUNT INT NOT NULL,
+    RESULT_COUNT  INT NOT NULL,
+    MEAN_MARKS    DECIMAL(8, 2) NULL,
+    MEDIAN_MARKS  DECIMAL(8, 2) NULL,
+    P25_MARKS     DECIMAL(8, 2) NULL,
+    P75_MARKS     DECIMAL(8, 2) NULL,
+    P90_MARKS     DECIMAL(8, 2) NULL,
+    MIN_MARKS     DECIMAL(8, 2) NULL,
+    MAX_MARKS     DECIMAL(8, 2) NULL,
+    updated_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,56 @@
+-- Lead funnel analytics for the Leads page (funnel.py). Every status change made
+-- through "Update Lead" is appended to lead_status_event and folded into the
+-- counter tables in the same transaction. Existing (and imported) leads are
+-- counted with
+--   python jobs.py --password <pw> sync-lead-funnel
+-- which only adds leads that are not counted yet, so it is safe to re-run.
+-- Apply once:  mysql -u root -p students < migrations/009_lead_funnel.sql
+
+-- Append-only history; the app never updates or deletes these rows.
+CREATE TABLE IF NOT EXISTS lead_status_event (
+    EVENT_ID         BIGINT AUTO_INCREMENT PRIMARY KEY,
+    LEAD_ID          INT NOT NULL,
+    FROM_STATUS      VARCHAR(30) NULL,
+    TO_STATUS        VARCHAR(30) NOT NULL,
+    SOURCE           VARCHAR(50) NOT NULL DEFAULT '',   -- '' stands for NULL
+    CHANGED_AT       DATETIME NOT NULL,
+    SECONDS_IN_STAGE INT NULL,                          -- time spent in FROM_STATUS, if known
+    KEY idx_lead_status_event_lead (LEAD_ID, EVENT_ID),
+    KEY idx_lead_status_event_changed (CHANGED_AT)
+);
+
+CREATE TABLE IF NOT EXISTS lead_funnel_state (
+    LEAD_ID        INT NOT NULL PRIMARY KEY,
+    COHORT         CHAR(7) NOT NULL,                    -- 'YYYY-MM' the lead was created
+    SOURCE         VARCHAR(50) NOT NULL DEFAULT '',
+    STATUS         VARCHAR(30) NOT NULL DEFAULT '',
+    FURTHEST_STAGE TINYINT NOT NULL,                    -- index in funnel.FUNNEL_STAGES
+    STATUS_SINCE   DATETIME NULL                        -- NULL: unknown (counted before tracking)
+);
+
+CREATE TABLE IF NOT EXISTS lead_funnel_counts (
+    COHORT         CHAR(7) NOT NULL,
+    SOURCE         VARCHAR(50) NOT NULL,
+    FURTHEST_STAGE TINYINT NOT NULL,
+    LEADS          INT NOT NULL,
+    PRIMARY KEY (COHORT, SOURCE, FURTHEST_STAGE)
+);
+
+CREATE TABLE IF NOT EXISTS lead_period_counts (
+    PERIOD    CHAR(7) NOT NULL,                         -- 'YYYY-MM' of the change
+    SOURCE    VARCHAR(50) NOT NULL,
+    TO_STATUS VARCHAR(30) NOT NULL,
+    CHANGES   INT NOT NULL,
+    PRIMARY KEY (PERIOD, SOURCE, TO_STATUS)
+);
+
+CREATE TABLE IF NOT EXISTS lead_stage_time (
+    STATUS        VARCHAR(30) NOT NULL PRIMARY KEY,
+    EXITS         INT NOT NULL DEFAULT 0,
+    TOTAL_SECONDS BIGINT NOT NULL DEFAULT 0,
+    MAX_SECONDS   INT NOT NULL DEFAULT 0,
+    UNDER_1D      INT NOT NULL DEFAULT 0,
+    UNDER_7D      INT NOT NULL DEFAULT 0,
+    UNDER_30D     INT NOT NULL DEFAULT 0,
+    OVER_30D      INT NOT NULL DEFAULT 0
+);
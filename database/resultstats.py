@@ -0,0 +1,77 @@
+"""Result statistics and rankings, computed column-wise with pandas."""
+import numpy as np
+import pandas as pd
+
+MARKS = "MARKS_OBTAINED"
+
+# result_test_stats / result_course_stats columns, in this order
+STAT_COLUMNS = ["RESULT_COUNT", "MEAN_MARKS", "MEDIAN_MARKS", "P25_MARKS", "P75_MARKS", "P90_MARKS",
+                "MIN_MARKS", "MAX_MARKS"]
+QUANTILES = {"P25_MARKS": 0.25, "MEDIAN_MARKS": 0.5, "P75_MARKS": 0.75, "P90_MARKS": 0.9}
+
+
+def _marks(df: pd.DataFrame) -> pd.Series:
+    # DECIMAL columns arrive as Decimal objects
+    return pd.to_numeric(df[MARKS], errors="coerce").astype("float64")
+
+
+def summarize(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Count, mean, quartiles, 90th percentile, min and max of the marks per ``by`` value."""
+    if df.empty:
+        return pd.DataFrame(columns=STAT_COLUMNS, index=pd.Index([], name=by))
+    groups = _marks(df).groupby(df[by])
+    out = groups.agg(["count", "mean", "min", "max"])
+    out.columns = ["RESULT_COUNT", "MEAN_MARKS", "MIN_MARKS", "MAX_MARKS"]
+    quantiles = groups.quantile(list(QUANTILES.values())).unstack()
+    for column, q in QUANTILES.items():
+        out[column] = quantiles[q]
+    out = out[out["RESULT_COUNT"] > 0]
+    out.index.name = by
+    return out[STAT_COLUMNS].round(2)
+
+
+def grade_counts(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Results per ``by`` value and GRADE ('' stands for no grade)."""
+    if df.empty or "GRADE" not in df.columns:
+        return pd.DataFrame(columns=[by, "GRADE", "RESULT_COUNT"])
+    grades = df["GRADE"].astype("string").fillna("").str.strip()
+    return (df[[by]].assign(GRADE=grades)
+            .groupby([by, "GRADE"]).size().rename("RESULT_COUNT").reset_index())
+
+
+def rank_within(df: pd.DataFrame, group: str = "TEST_ID") -> pd.DataFrame:
+    """Add RANK (1 = best, ties share the better rank), OUT_OF and PERCENTILE per ``group``.
+
+    PERCENTILE is the share of the group scoring at or below the row, so the
+    top scorer is at 100. Rows without marks get no rank.
+    """
+    marks = _marks(df)
+    groups = marks.groupby(df[group])
+    return df.assign(
+        **{MARKS: marks},
+        RANK=groups.rank(method="min", ascending=False).astype("Int32"),
+        OUT_OF=groups.transform("count").astype("Int32"),
+        PERCENTILE=(groups.rank(method="max", pct=True) * 100).round(1),
+    )
+
+
+def standings(ranked: pd.DataFrame, student: str = "STUDENT_ID") -> pd.DataFrame:
+    """Per-student tests taken, average marks and average percentile, ranked on the latter.
+
+    Ranking on percentiles rather than raw marks keeps tests with different
+    maximum marks comparable.
+    """
+    if ranked.empty:
+        return pd.DataFrame(columns=["TESTS", "AVG_MARKS", "AVG_PERCENTILE", "RANK"])
+    out = ranked.groupby(student).agg(
+        TESTS=(MARKS, "count"), AVG_MARKS=(MARKS, "mean"), AVG_PERCENTILE=("PERCENTILE", "mean")
+    ).round(2)
+    out["RANK"] = out["AVG_PERCENTILE"].rank(method="min", ascending=False).astype("Int32")
+    return out.sort_values(["RANK", "AVG_MARKS"], ascending=[True, False])
+
+
+def to_sql_value(value):
+    """numpy / pandas scalars -> plain Python values for the driver (NaN -> None)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return None
+    return value.item() if hasattr(value, "item") else value
@@ -0,0 +1,389 @@
+"""Timetable generator: place each batch's weekly classes into periods and rooms."""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+import timetable
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat")
+
+# role -> accepted column names in the batch / faculty / room tables, first match wins
+BATCH_COLUMNS = {
+    "id": ("BATCH_ID",),
+    "size": ("STRENGTH", "BATCH_SIZE", "CAPACITY", "MAX_STUDENTS"),
+    "faculty": ("FACULTY_ID",),
+    "start": ("START_TIME", "BATCH_START_TIME"),
+    "end": ("END_TIME", "BATCH_END_TIME"),
+}
+FACULTY_COLUMNS = {
+    "id": ("FACULTY_ID",),
+    "max_per_day": ("MAX_CLASSES_PER_DAY", "MAX_HOURS_PER_DAY", "MAX_LOAD_PER_DAY"),
+}
+ROOM_COLUMNS = {
+    "id": ("ROOM_ID",),
+    "capacity": ("CAPACITY", "SEATING_CAPACITY", "SEATS"),
+}
+
+
+class Problem:
+    """Scheduling input as plain values.
+
+    ``periods`` are period start times in minutes after midnight, all
+    ``period_minutes`` long. ``batches`` maps a batch id to ``{"size",
+    "faculty" (candidate ids), "sessions" (classes per week), "window"
+    ((start, end) minutes or None)}``; ``faculty`` maps an id to
+    ``{"max_per_day" (or None), "unavailable" (set of (day, period))}``;
+    ``rooms`` maps a room id to its capacity (None = fits any batch).
+    ``busy`` lists bookings that already exist, as ``(kind, id, day,
+    period)`` with kind "room", "faculty" or "batch".
+    """
+
+    def __init__(self, days, periods, period_minutes, batches, faculty, rooms, busy=()):
+        self.days = list(days)
+        self.periods = sorted(periods)
+        self.period_minutes = period_minutes
+        self.batches = batches
+        self.faculty = faculty
+        self.rooms = rooms
+        self.busy = list(busy)
+
+    def sessions(self) -> list:
+        return [(b, n) for b, info in self.batches.items() for n in range(info["sessions"])]
+
+    def batch_periods(self, batch_id) -> list:
+        window = self.batches[batch_id].get("window")
+        if not window:
+            return self.periods
+        start, end = window
+        return [p for p in self.periods if p >= start and p + self.period_minutes <= end]
+
+    def fitting_rooms(self, batch_id) -> list:
+        """Rooms that hold the batch, smallest first."""
+        size = self.batches[batch_id].get("size") or 0
+        fits = [(cap if cap is not None else float("inf"), r) for r, cap in self.rooms.items()
+                if cap is None or cap >= size]
+        return [r for _, r in sorted(fits, key=lambda x: (x[0], str(x[1])))]
+
+    def faculty_free(self, faculty_id, day, period) -> bool:
+        info = self.faculty.get(faculty_id)
+        return info is not None and (day, period) not in info["unavailable"]
+
+
+class _State:
+    """Bookings made so far; place()/remove() keep every index in step."""
+
+    def __init__(self, problem: Problem):
+        self.p = problem
+        self.busy = set()                 # (kind, id, day, period)
+        self.load = defaultdict(int)      # (faculty, day) -> classes
+        self.per_day = defaultdict(int)   # (batch, day) -> classes
+        self.assignment = {}              # session -> (day, period, room, faculty)
+        for booking in problem.busy:
+            self.busy.add(tuple(booking))
+
+    def place(self, session, value):
+        day, period, room, fac = value
+        batch = session[0]
+        self.busy.update({("batch", batch, day, period), ("room", room, day, period),
+                          ("faculty", fac, day, period)})
+        self.load[(fac, day)] += 1
+        self.per_day[(batch, day)] += 1
+        self.assignment[session] = value
+
+    def remove(self, session):
+        day, period, room, fac = self.assignment.pop(session)
+        batch = session[0]
+        self.busy.difference_update({("batch", batch, day, period), ("room", room, day, period),
+                                     ("faculty", fac, day, period)})
+        self.load[(fac, day)] -= 1
+        self.per_day[(batch, day)] -= 1
+
+    def allowed(self, session, value) -> bool:
+        day, period, room, fac = value
+        batch = session[0]
+        info = self.p.batches[batch]
+        max_load = self.p.faculty.get(fac, {}).get("max_per_day")
+        return (
+            fac in info["faculty"]
+            and room in self.p.rooms
+            and room in self.p.fitting_rooms(batch)
+            and period in self.p.batch_periods(batch)
+            and self.p.faculty_free(fac, day, period)
+            and (max_load is None or self.load[(fac, day)] < max_load)
+            and not {("batch", batch, day, period), ("room", room, day, period),
+                     ("faculty", fac, day, period)} & self.busy
+        )
+
+    def candidates(self, session, rooms) -> list:
+        """Feasible values, best first; each (day, period, faculty) gets its smallest free room."""
+        batch = session[0]
+        info = self.p.batches[batch]
+        scored = []
+        for day in self.p.days:
+            spread = self.per_day[(batch, day)]
+            for period in self.p.batch_periods(batch):
+                if ("batch", batch, day, period) in self.busy:
+                    continue
+                for fac in info["faculty"]:
+                    max_load = self.p.faculty.get(fac, {}).get("max_per_day")
+                    if (
+                        not self.p.faculty_free(fac, day, period)
+                        or ("faculty", fac, day, period) in self.busy
+                        or (max_load is not None and self.load[(fac, day)] >= max_load)
+                    ):
+                        continue
+                    room = next((r for r in rooms if ("room", r, day, period) not in self.busy), None)
+                    if room is not None:
+                        scored.append(((spread, self.load[(fac, day)], period), (day, period, room, fac)))
+        scored.sort(key=lambda x: x[0])
+        return [value for _, value in scored]
+
+
+def _domain_size(problem: Problem, batch_id) -> int:
+    info = problem.batches[batch_id]
+    slots = sum(
+        problem.faculty_free(f, d, p)
+        for d in problem.days for p in problem.batch_periods(batch_id) for f in info["faculty"]
+    )
+    return slots * len(problem.fitting_rooms(batch_id))
+
+
+def solve(problem: Problem, fixed=None, time_limit: float = 10.0, max_backtracks: int = 5000) -> dict:
+    """Build a conflict-free weekly timetable, most-constrained batch first.
+
+    No batch, faculty member or room is booked twice in a period, rooms hold
+    the batch, and faculty availability, daily maximums and batch time
+    windows are respected. Dead ends backtrack at most ``max_backtracks``
+    times within ``time_limit`` seconds; what is left is reported unplaced.
+    ``fixed`` maps sessions (``(batch_id, n)``) to ``(day, period, room,
+    faculty)`` values that are kept as they are. Returns ``{assignment,
+    unplaced, backtracks, seconds}``.
+    """
+    started = time.perf_counter()
+    deadline = started + time_limit
+    state = _State(problem)
+    for session, value in (fixed or {}).items():
+        state.place(session, value)
+
+    # Most constrained batches first: fewest choices per class they need.
+    domain = {b: _domain_size(problem, b) for b in problem.batches}
+    todo = [s for s in problem.sessions() if s not in state.assignment]
+    todo.sort(key=lambda s: (domain[s[0]] / max(problem.batches[s[0]]["sessions"], 1), str(s[0]), s[1]))
+    rooms = {b: problem.fitting_rooms(b) for b in problem.batches}
+
+    frames = []         # per position in ``todo``: [candidates, next index]
+    backtracks = 0
+    i = 0
+    while i < len(todo):
+        session = todo[i]
+        if len(frames) == i:
+            frames.append([state.candidates(session, rooms[session[0]]), 0])
+        frame = frames[i]
+        if session in state.assignment:
+            state.remove(session)
+        if frame[1] < len(frame[0]):
+            state.place(session, frame[0][frame[1]])
+            frame[1] += 1
+            i += 1
+            continue
+        if i > 0 and backtracks < max_backtracks and time.perf_counter() < deadline:
+            # Dead end: undo the previous class and try its next option.
+            backtracks += 1
+            frames.pop()
+            i -= 1
+        else:
+            i += 1      # give up on this class; it is reported as unplaced
+
+    return {
+        "assignment": dict(state.assignment),
+        "unplaced": [s for s in problem.sessions() if s not in state.assignment],
+        "backtracks": backtracks,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def resolve(problem: Problem, previous: dict, **kwargs) -> dict:
+    """Re-solve after the problem changed (e.g. a faculty member became unavailable).
+
+    Every class of ``previous`` that is still valid under ``problem`` stays
+    where it is; only the others are placed again.
+    """
+    state = _State(problem)
+    kept = {}
+    for session, value in sorted(previous.items(), key=lambda kv: str(kv[0])):
+        if session[0] in problem.batches and state.allowed(session, value):
+            state.place(session, value)
+            kept[session] = value
+    return solve(problem, fixed=kept, **kwargs)
+
+
+def faculty_absent(problem: Problem, faculty_id) -> Problem:
+    """Copy of ``problem`` with one faculty member unavailable all week."""
+    faculty = dict(problem.faculty)
+    faculty[faculty_id] = dict(
+        faculty.get(faculty_id, {"max_per_day": None}),
+        unavailable={(d, p) for d in problem.days for p in problem.periods},
+    )
+    return Problem(problem.days, problem.periods, problem.period_minutes,
+                   problem.batches, faculty, problem.rooms, problem.busy)
+
+
+def to_rows(problem: Problem, assignment: dict) -> list:
+    """Solution as class rows: batch, faculty, room, day, start and end minutes."""
+    rows = [
+        {"batch": s[0], "faculty": f, "room": r, "day": d, "start": p, "end": p + problem.period_minutes}
+        for s, (d, p, r, f) in assignment.items()
+    ]
+    order = {d: i for i, d in enumerate(problem.days)}
+    return sorted(rows, key=lambda row: (order.get(row["day"], 0), row["start"], str(row["room"])))
+
+
+# ========== BUILDING A PROBLEM FROM THE TABLES ==========
+def _pick(df: pd.DataFrame, candidates: dict) -> dict:
+    upper = {str(c).upper(): c for c in df.columns}
+    return {role: next((upper[c] for c in names if c in upper), None) for role, names in candidates.items()}
+
+
+def _weekday(value) -> str:
+    """'Monday', 'mon', a date or '2024-07-01' -> 'Mon' (None if unrecognised)."""
+    text = str(value).strip()
+    if text[:3].title() in DAYS:
+        return text[:3].title()
+    stamp = pd.to_datetime(text, errors="coerce")
+    if pd.isna(stamp):
+        return None
+    return stamp.strftime("%a")
+
+
+def _overlapped_periods(periods, period_minutes, start, end) -> list:
+    return [p for p in periods if p < end and start < p + period_minutes]
+
+
+def problem_from_tables(batch_df, faculty_df, room_df, schedule_df=None, unavailable_df=None,
+                        open_minutes: int = 8 * 60, close_minutes: int = 20 * 60,
+                        period_minutes: int = 60, sessions_per_week: int = 5,
+                        default_max_per_day=None, keep_existing: bool = False) -> Problem:
+    """Build a Problem from the batch, faculty, room and (optional) other tables.
+
+    A batch is taught by its FACULTY_ID when the batch table has one,
+    otherwise by whoever taught it in ``schedule_df``, otherwise by anyone.
+    ``unavailable_df`` holds faculty_unavailability rows (migrations/007).
+    With ``keep_existing`` the classes already in ``schedule_df`` are
+    treated as booked.
+    """
+    periods = list(range(open_minutes, close_minutes - period_minutes + 1, period_minutes))
+    bc, fc, rc = _pick(batch_df, BATCH_COLUMNS), _pick(faculty_df, FACULTY_COLUMNS), _pick(room_df, ROOM_COLUMNS)
+
+    rooms = {
+        r[rc["id"]]: (int(r[rc["capacity"]]) if rc["capacity"] and pd.notna(r[rc["capacity"]]) else None)
+        for r in room_df.to_dict("records")
+    }
+    faculty = {}
+    for r in faculty_df.to_dict("records"):
+        limit = r[fc["max_per_day"]] if fc["max_per_day"] else None
+        faculty[r[fc["id"]]] = {
+            "max_per_day": int(limit) if limit is not None and pd.notna(limit) else default_max_per_day,
+            "unavailable": set(),
+        }
+    if unavailable_df is not None and not unavailable_df.empty:
+        starts = timetable.to_minutes(unavailable_df["START_TIME"])
+        ends = timetable.to_minutes(unavailable_df["END_TIME"])
+        for fac, day, start, end in zip(unavailable_df["FACULTY_ID"], unavailable_df["DAY_OF_WEEK"], starts, ends):
+            if fac in faculty and _weekday(day):
+                faculty[fac]["unavailable"].update(
+                    (_weekday(day), p) for p in _overlapped_periods(periods, period_minutes, start, end)
+                )
+
+    sc = timetable.resolve_columns(schedule_df.columns) if schedule_df is not None else None
+    taught_by = defaultdict(list)
+    if sc and sc["batch"] and sc["faculty"]:
+        for batch, fac in schedule_df[[sc["batch"], sc["faculty"]]].dropna().drop_duplicates().itertuples(index=False):
+            if fac in faculty:
+                taught_by[batch].append(fac)
+
+    if bc["start"] and bc["end"]:
+        windows = zip(timetable.to_minutes(batch_df[bc["start"]]), timetable.to_minutes(batch_df[bc["end"]]))
+    else:
+        windows = [(None, None)] * len(batch_df)
+    batches = {}
+    for r, (w_start, w_end) in zip(batch_df.to_dict("records"), windows):
+        bid = r[bc["id"]]
+        own = r[bc["faculty"]] if bc["faculty"] else None
+        batches[bid] = {
+            "size": int(r[bc["size"]]) if bc["size"] and pd.notna(r[bc["size"]]) else None,
+            "faculty": [own] if own in faculty else (taught_by.get(bid) or list(faculty)),
+            "sessions": sessions_per_week,
+            "window": (w_start, w_end) if pd.notna(w_start) and pd.notna(w_end) else None,
+        }
+
+    busy = []
+    if keep_existing and sc and sc["day"] and sc["start"] and sc["end"]:
+        starts, ends = timetable.to_minutes(schedule_df[sc["start"]]), timetable.to_minutes(schedule_df[sc["end"]])
+        for row, start, end in zip(schedule_df.to_dict("records"), starts, ends):
+            day = _weekday(row[sc["day"]])
+            if day is None or pd.isna(start) or pd.isna(end):
+                continue
+            for p in _overlapped_periods(periods, period_minutes, start, end):
+                busy.extend(
+                    (kind, row[sc[kind]], day, p) for kind in ("room", "faculty", "batch")
+                    if sc[kind] and pd.notna(row[sc[kind]])
+                )
+    return Problem(DAYS, periods, period_minutes, batches, faculty, rooms, busy)
+
+
+# ========== BENCHMARK ==========
+def generate_problem(n_batches: int, n_rooms: int, n_faculty: int, seed: int = 0,
+                     sessions: int = 5, max_per_day: int = 4) -> Problem:
+    """Random problem shaped like the institute's (60 batches, 25 rooms, 40 faculty)."""
+    rng = random.Random(seed)
+    periods = list(range(8 * 60, 20 * 60, 60))
+    windows = [None, (8 * 60, 13 * 60), (13 * 60, 20 * 60), (16 * 60, 20 * 60)]
+    rooms = {f"R{i}": rng.choice((30, 40, 60, 80)) for i in range(n_rooms)}
+    faculty = {
+        f"F{i}": {
+            "max_per_day": max_per_day,
+            "unavailable": {(d, p) for d in DAYS for p in periods if rng.random() < 0.1},
+        }
+        for i in range(n_faculty)
+    }
+    names = list(faculty)
+    batches = {
+        f"B{i}": {
+            "size": rng.randint(15, 75),
+            "faculty": rng.sample(names, k=min(2, len(names))),
+            "sessions": sessions,
+            "window": rng.choice(windows),
+        }
+        for i in range(n_batches)
+    }
+    return Problem(DAYS, periods, 60, batches, faculty, rooms)
+
+
+def benchmark(sizes=(15, 30, 60, 120, 240), seed: int = 0, time_limit: float = 10.0):
+    print(f"{'batches':>8} {'rooms':>6} {'faculty':>8} {'classes':>8} {'placed':>7} "
+          f"{'backtracks':>10} {'solve s':>8} {'re-solve s':>10}")
+    for n in sizes:
+        problem = generate_problem(n, max(1, n * 25 // 60), max(2, n * 40 // 60), seed)
+        result = solve(problem, time_limit=time_limit)
+        total = len(problem.sessions())
+        absent = faculty_absent(problem, next(iter(problem.faculty)))
+        again = resolve(absent, result["assignment"], time_limit=time_limit)
+        print(f"{n:>8} {len(problem.rooms):>6} {len(problem.faculty):>8} {total:>8} "
+              f"{total - len(result['unplaced']):>7} {result['backtracks']:>10} "
+              f"{result['seconds']:>8} {again['seconds']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Timetable generator")
+    parser.add_argument("--bench", action="store_true", help="time solves on generated problems")
+    parser.add_argument("--sizes", default="15,30,60,120,240", help="batch counts to benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    args = parser.parse_args()
+    if args.bench:
+        benchmark(tuple(int(s) for s in args.sizes.split(",")), args.seed, args.time_limit)
+    else:
+        parser.print_help()
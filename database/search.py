@@ -0,0 +1,275 @@
+"""In-memory search over a table's text columns: exact, prefix, substring and fuzzy."""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+
+MAX_EXPANSIONS = 200    # vocabulary tokens one query term may expand to
+_WORD = re.compile(r"\w+")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# match kind -> score; a row's score is the sum over query terms of its best match
+EXACT, PREFIX, SUBSTRING, FUZZY = 3.0, 2.0, 1.5, 1.0
+
+
+def tokenize(text) -> set:
+    """Lowercase word tokens; e-mail addresses are also kept whole, and values
+    with six or more digits also index their digits alone ("98765 43210")."""
+    if text is None:
+        return set()
+    text = str(text).lower()
+    tokens = set(_WORD.findall(text))
+    tokens.update(_EMAIL.findall(text))
+    digits = re.sub(r"\D", "", text)
+    if len(digits) >= 6:
+        tokens.add(digits)
+    return tokens
+
+
+def _trigrams(token: str) -> set:
+    # Whole e-mail tokens are only matched exactly or by prefix; their words
+    # are indexed separately.
+    if "@" in token:
+        return set()
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting a swap of neighbours as one typo; gives up past ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            cur.append(cost)
+        if min(cur) > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return prev[-1]
+
+
+class SearchIndex:
+    """Inverted + trigram index over documents made of a few text values.
+
+    ``postings`` (token -> keys) serves exact matches, the sorted vocabulary
+    prefix matches, and ``trigrams`` (3-gram -> tokens) substring and
+    typo-tolerant ones, so a lookup costs the same however many rows there are.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(set)    # token -> doc keys
+        self.trigrams = defaultdict(set)    # trigram -> tokens
+        self.doc_tokens = {}                # doc key -> tokens
+        self._vocabulary = []               # sorted tokens, for prefix lookups
+        self._sorted = True                 # False while bulk loading
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    @property
+    def vocabulary(self) -> list:
+        if not self._sorted:
+            self._vocabulary.sort()
+            self._sorted = True
+        return self._vocabulary
+
+    def load(self, items):
+        """Index many ``(key, values)`` at once, sorting the vocabulary only at the end."""
+        self._sorted = False
+        for key, values in items:
+            self.upsert(key, values)
+        self.vocabulary     # sort now rather than on the first lookup
+        return self
+
+    def upsert(self, key, values):
+        """(Re)index one row from its text values."""
+        tokens = set().union(*(tokenize(v) for v in values)) if values else set()
+        if key in self.doc_tokens:
+            self.remove(key)
+        self.doc_tokens[key] = tokens
+        for token in tokens:
+            if token not in self.postings:
+                if self._sorted:
+                    insort(self._vocabulary, token)
+                else:
+                    self._vocabulary.append(token)
+                for gram in _trigrams(token):
+                    self.trigrams[gram].add(token)
+            self.postings[token].add(key)
+
+    def remove(self, key):
+        for token in self.doc_tokens.pop(key, ()):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.discard(key)
+            if not docs:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+                for gram in _trigrams(token):
+                    tokens = self.trigrams.get(gram)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self.trigrams[gram]
+
+    def _term_matches(self, term: str) -> dict:
+        """token -> score for one query term."""
+        found = {}
+        if term in self.postings:
+            found[term] = EXACT
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and len(found) < MAX_EXPANSIONS:
+            token = self.vocabulary[i]
+            if not token.startswith(term):
+                break
+            found.setdefault(token, PREFIX)
+            i += 1
+        grams = _trigrams(term)
+        if not grams:
+            return found
+
+        # Substring: tokens holding every trigram of the term, then verified.
+        sets = sorted((self.trigrams.get(g, set()) for g in grams), key=len)
+        for token in set.intersection(*sets) if sets[0] else ():
+            if len(found) >= MAX_EXPANSIONS:
+                break
+            if term in token:
+                found.setdefault(token, SUBSTRING)
+
+        # Fuzzy: only when nothing matched literally and the term is long enough.
+        if not found and len(term) >= 4:
+            limit = 1 if len(term) <= 6 else 2
+            shared = Counter(t for g in grams for t in self.trigrams.get(g, ()))
+            need = max(1, len(grams) - 3 * limit)
+            for token, count in shared.most_common():
+                if count < need or len(found) >= MAX_EXPANSIONS:
+                    break
+                dist = _edit_distance(term, token, limit)
+                if dist <= limit:
+                    found[token] = FUZZY - 0.25 * (dist - 1)
+        return found
+
+    def search(self, query: str, limit: int = 1000) -> list:
+        """Keys of rows matching every query term, best match first."""
+        terms = [t for t in _WORD.findall(str(query).lower())]
+        if not terms:
+            return []
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token, score in self._term_matches(term).items():
+                for key in self.postings.get(token, ()):
+                    if score > term_scores.get(key, 0):
+                        term_scores[key] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {k: s + term_scores[k] for k, s in scores.items() if k in term_scores}
+            if not scores:
+                return []
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda kv: (-kv[1], str(kv[0])))
+        return [key for key, _ in ranked]
+
+
+class TableSearch:
+    """A SearchIndex over one table, kept in step with MySQL.
+
+    ``sync()`` picks up rows above the last key (inserts) and, when the table
+    has an updated-at column, rows changed since the last sync; a full
+    rebuild runs after ``max_age`` seconds to catch deletes and edits made
+    outside the app. ``refresh()`` re-reads specific rows right after the
+    app changed them. Rows are fetched without holding any lock; changing
+    the shared index and searching it both hold ``_index_lock``, so a lookup
+    never sees a half-applied update. A rebuild fills a new index and swaps
+    it in.
+    """
+
+    def __init__(self, table_name: str, key_column: str, text_columns, updated_column=None):
+        self.table_name = table_name
+        self.key_column = key_column
+        self.text_columns = list(text_columns)
+        self.updated_column = updated_column
+        self.index = SearchIndex()
+        self.built_at = 0.0
+        self.synced_at = 0.0
+        self.stale = True
+        self.key_high_water = None
+        self.updated_high_water = None
+        self._lock = threading.Lock()          # one sync / rebuild at a time
+        self._index_lock = threading.Lock()    # index changes vs. lookups
+
+    def _select(self, where: str = "") -> str:
+        cols = ", ".join(f"`{c}`" for c in [self.key_column, *self.text_columns])
+        extra = f", `{self.updated_column}`" if self.updated_column else ""
+        return f"SELECT {cols}{extra} FROM `{self.table_name}` {where};"
+
+    def _apply(self, index: SearchIndex, rows, removed=()):
+        # A new index being rebuilt is private until swapped in.
+        with self._index_lock if index is self.index else nullcontext():
+            for key in removed:
+                index.remove(key)
+            index.load((row[self.key_column], [row[c] for c in self.text_columns]) for row in rows)
+        for row in rows:
+            key = row[self.key_column]
+            if self.key_high_water is None or key > self.key_high_water:
+                self.key_high_water = key
+            stamp = row.get(self.updated_column) if self.updated_column else None
+            if stamp is not None and (self.updated_high_water is None or stamp > self.updated_high_water):
+                self.updated_high_water = stamp
+
+    def rebuild(self, fetch):
+        index = SearchIndex()
+        self.key_high_water = self.updated_high_water = None
+        self._apply(index, fetch(self._select()))
+        with self._index_lock:
+            self.index = index
+        self.built_at = self.synced_at = time.time()
+        self.stale = False
+
+    def sync(self, fetch, max_age: float, min_interval: float):
+        """Bring the index up to date; cheap enough to call before every lookup."""
+        now = time.time()
+        if not self.stale and now - self.synced_at < min_interval:
+            return
+        # Only the first build makes callers wait; otherwise a sync already
+        # running in another session is left to finish while this one searches.
+        if not self._lock.acquire(blocking=self.built_at == 0):
+            return
+        try:
+            if now - self.built_at > max_age or self.key_high_water is None:
+                self.rebuild(fetch)
+                return
+            self._apply(self.index, fetch(
+                self._select(f"WHERE `{self.key_column}` > %s"), (self.key_high_water,)
+            ))
+            if self.updated_column and self.updated_high_water is not None:
+                self._apply(self.index, fetch(
+                    self._select(f"WHERE `{self.updated_column}` >= %s"), (self.updated_high_water,)
+                ))
+            self.synced_at = time.time()
+            self.stale = False
+        finally:
+            self._lock.release()
+
+    def refresh(self, fetch, keys):
+        """Re-read the given rows; keys that no longer exist are dropped."""
+        keys = list(keys)
+        if not keys:
+            return
+        marks = ", ".join(["%s"] * len(keys))
+        rows = fetch(self._select(f"WHERE `{self.key_column}` IN ({marks})"), tuple(keys))
+        found = {row[self.key_column] for row in rows}
+        with self._lock:
+            self._apply(self.index, rows, removed=[key for key in keys if key not in found])
+
+    def search(self, query: str, limit: int) -> list:
+        with self._index_lock:
+            return self.index.search(query, limit)
@@ -0,0 +1,232 @@
+"""Local Parquet snapshots of MySQL tables, shared by every app process."""
+import json
+import os
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+META_FILE = "_meta.json"
+MAX_PARTS = 16          # appended parts are compacted into one beyond this
+PART_GRACE_S = 300      # replaced part files are kept this long for readers still opening them
+
+
+def _table_dir(snapshot_dir: str, table_name: str) -> str:
+    return os.path.join(snapshot_dir, table_name)
+
+
+def read_meta(snapshot_dir: str, table_name: str):
+    path = os.path.join(_table_dir(snapshot_dir, table_name), META_FILE)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(snapshot_dir: str, table_name: str, meta: dict):
+    folder = _table_dir(snapshot_dir, table_name)
+    tmp = os.path.join(folder, f".{META_FILE}.{uuid.uuid4().hex}")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, default=str)
+    os.replace(tmp, os.path.join(folder, META_FILE))
+
+
+def mark_dirty(snapshot_dir: str, table_name: str):
+    """Force the next sync to rebuild (used after changes an incremental sync cannot see)."""
+    meta = read_meta(snapshot_dir, table_name)
+    if meta and not meta.get("dirty"):
+        meta["dirty"] = True
+        _write_meta(snapshot_dir, table_name, meta)
+
+
+def _columns(schema: pa.Schema) -> list:
+    return [[f.name, str(f.type)] for f in schema]
+
+
+def _to_arrow(rows, schema: pa.Schema) -> pa.Table:
+    return pa.Table.from_arrays(
+        [pa.array([r[i] for r in rows], type=f.type) for i, f in enumerate(schema)], schema=schema
+    )
+
+
+def _stream_to_part(connect, query: str, params, folder: str, chunk_rows: int, schema: pa.Schema):
+    """Stream a query into a new part file of ``schema``; returns ``(file_name, rows)``."""
+    name = f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp = os.path.join(folder, "." + name)
+    writer, rows_written = None, 0
+    with connect() as conn:
+        cur = conn.cursor(buffered=False)
+        try:
+            cur.execute(query, params)
+            columns = [d[0] for d in cur.description]
+            if columns != schema.names:
+                raise ValueError(f"columns {columns} do not match the snapshot schema {schema.names}")
+            while True:
+                chunk = cur.fetchmany(chunk_rows)
+                if not chunk:
+                    break
+                batch = _to_arrow(chunk, schema)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, schema)
+                writer.write_table(batch)
+                rows_written += len(chunk)
+        finally:
+            cur.close()
+            if writer is not None:
+                writer.close()
+    if writer is None:
+        return None, 0
+    os.replace(tmp, os.path.join(folder, name))
+    return name, rows_written
+
+
+def _max_value(table: pa.Table, column: str):
+    if column is None or table.num_rows == 0:
+        return None
+    value = pc.max(table[column]).as_py()
+    return value.isoformat(sep=" ") if hasattr(value, "isoformat") else value
+
+
+def load(snapshot_dir: str, table_name: str, meta: dict = None) -> pa.Table:
+    """Memory-map the snapshot's live part files into one Arrow table."""
+    meta = meta or read_meta(snapshot_dir, table_name)
+    folder = _table_dir(snapshot_dir, table_name)
+    parts = [pq.read_table(os.path.join(folder, p), memory_map=True) for p in meta["parts"]]
+    if not parts:
+        return pa.schema([]).empty_table()
+    return pa.concat_tables(parts) if len(parts) > 1 else parts[0]
+
+
+def _cleanup(folder: str, keep):
+    """Delete part files listed neither in ``keep`` nor in the metadata on disk,
+    once PART_GRACE_S old, so readers (and other processes) still opening
+    them do not lose them."""
+    on_disk = read_meta(os.path.dirname(folder), os.path.basename(folder)) or {}
+    keep = set(keep) | set(on_disk.get("parts", ()))
+    cutoff = time.time() - PART_GRACE_S
+    for name in os.listdir(folder):
+        if not name.endswith(".parquet") or name in keep:
+            continue
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def rebuild(connect, snapshot_dir: str, table_name: str, schema: pa.Schema, key_column=None,
+            updated_column=None, chunk_rows: int = 10000) -> pa.Table:
+    """Stream the whole table into a fresh snapshot of ``schema``."""
+    folder = _table_dir(snapshot_dir, table_name)
+    os.makedirs(folder, exist_ok=True)
+    order = f" ORDER BY `{key_column}`" if key_column else ""
+    part, rows = _stream_to_part(
+        connect, f"SELECT * FROM `{table_name}`{order};", (), folder, chunk_rows, schema
+    )
+    meta = {
+        "table": table_name,
+        "columns": _columns(schema),
+        "parts": [part] if part else [],
+        "rows": rows,
+        "key_column": key_column,
+        "updated_column": updated_column,
+        "built_at": time.time(),
+        "synced_at": time.time(),
+        "dirty": False,
+    }
+    data = load(snapshot_dir, table_name, meta)
+    meta["key_high_water"] = _max_value(data, key_column)
+    meta["updated_high_water"] = _max_value(data, updated_column)
+    _write_meta(snapshot_dir, table_name, meta)
+    _cleanup(folder, set(meta["parts"]))
+    return data
+
+
+def sync(connect, snapshot_dir: str, table_name: str, schema: pa.Schema, key_column=None,
+         updated_column=None, max_age: float = 6 * 3600, chunk_rows: int = 10000) -> pa.Table:
+    """Return an up-to-date snapshot, reading only what changed when possible.
+
+    ``schema`` comes from the table's declared column types, so every part
+    file has the same types whatever values a chunk happens to hold; a
+    snapshot written with other columns or types is rebuilt.
+
+    ``key_column`` should be a single integer primary key (enables append by
+    high-water mark; without it every sync is a rebuild); ``updated_column`` a
+    DATETIME/TIMESTAMP maintained on every change (enables picking up updates
+    too). Deletes are only seen by a full rebuild, which happens after
+    ``max_age`` seconds or ``mark_dirty()``; db.py marks tables without an
+    updated-at column dirty on every UPDATE, so snapshots pay off for
+    append-mostly tables and tables with an updated-at column.
+    """
+    meta = read_meta(snapshot_dir, table_name)
+    if (
+        meta is None
+        or meta.get("dirty")
+        or meta.get("columns") != _columns(schema)
+        or time.time() - meta["built_at"] > max_age
+        or meta.get("key_column") != key_column
+        or meta.get("updated_column") != updated_column
+        or not key_column
+    ):
+        return rebuild(connect, snapshot_dir, table_name, schema, key_column, updated_column, chunk_rows)
+
+    folder = _table_dir(snapshot_dir, table_name)
+    current = load(snapshot_dir, table_name, meta)
+
+    if updated_column:
+        since = meta["updated_high_water"]
+        where, params = (f"WHERE `{updated_column}` >= %s", (since,)) if since is not None else ("", ())
+        part, rows = _stream_to_part(
+            connect, f"SELECT * FROM `{table_name}` {where};", params, folder, chunk_rows, schema
+        )
+        if not part:
+            return current
+        delta = pq.read_table(os.path.join(folder, part))
+        os.remove(os.path.join(folder, part))
+        changed = pc.is_in(current[key_column], value_set=delta[key_column])
+        old_rows = current.filter(changed).sort_by(key_column)
+        if old_rows.num_rows == delta.num_rows and old_rows.equals(delta.sort_by(key_column)):
+            # ">=" re-reads the rows stamped exactly at the high-water mark; nothing changed.
+            return current
+        current = current.filter(pc.invert(changed))
+        merged = pa.concat_tables([current, delta]) if current.num_rows else delta
+        # Compact into a single part so changed rows are not duplicated on disk.
+        meta["updated_high_water"] = _max_value(merged, updated_column)
+        return _compact(snapshot_dir, table_name, merged, meta)
+
+    hwm = meta["key_high_water"]
+    where, params = (f"WHERE `{key_column}` > %s", (hwm,)) if hwm is not None else ("", ())
+    part, rows = _stream_to_part(
+        connect, f"SELECT * FROM `{table_name}` {where} ORDER BY `{key_column}`;",
+        params, folder, chunk_rows, schema
+    )
+    if not part:
+        return current
+    meta["parts"].append(part)
+    meta["rows"] += rows
+    meta["synced_at"] = time.time()
+    appended = load(snapshot_dir, table_name, meta)
+    if len(meta["parts"]) > MAX_PARTS:
+        return _compact(snapshot_dir, table_name, appended, meta)
+    meta["key_high_water"] = _max_value(appended, key_column)
+    _write_meta(snapshot_dir, table_name, meta)
+    return appended
+
+
+def _compact(snapshot_dir: str, table_name: str, data: pa.Table, meta: dict) -> pa.Table:
+    """Rewrite ``data`` as the snapshot's single part and drop the old parts."""
+    folder = _table_dir(snapshot_dir, table_name)
+    name = f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet"
+    pq.write_table(data, os.path.join(folder, "." + name))
+    os.replace(os.path.join(folder, "." + name), os.path.join(folder, name))
+    meta["parts"] = [name]
+    meta["rows"] = data.num_rows
+    meta["key_high_water"] = _max_value(data, meta["key_column"])
+    meta["synced_at"] = time.time()
+    _write_meta(snapshot_dir, table_name, meta)
+    _cleanup(folder, {name})
+    return load(snapshot_dir, table_name, meta)
@@ -0,0 +1,153 @@
+"""Shared fixtures: a SQLite stand-in for the MySQL pool, filled by datagen.py.
+
+``SQLitePool`` replaces ``db.ConnectionPool``; its connections accept the
+mysql-connector calls db.py makes (``cursor(dictionary=True)``, ``%s``
+placeholders, ``start_transaction()``, savepoints, ``ON DUPLICATE KEY
+UPDATE``) and raise mysql-connector errors. ``SHOW REPLICA STATUS`` reads a
+``replica_status`` table, so tests can set a stand-in replica's lag.
+"""
+import os
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+
+_REPLICA_STATUS = re.compile(r"^\s*SHOW\s+(?:REPLICA|SLAVE)\s+STATUS", re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_OF = re.compile(r"\bVALUES\((`?\w+`?)\)", re.IGNORECASE)
+
+
+def _to_sqlite(query: str) -> str:
+    if _REPLICA_STATUS.match(query):
+        return "SELECT Seconds_Behind_Source FROM replica_status;"
+    parts = _ON_DUPLICATE.split(query, maxsplit=1)
+    if len(parts) == 2:
+        query = parts[0] + "ON CONFLICT DO UPDATE SET" + _VALUES_OF.sub(r"excluded.\1", parts[1])
+    return query.replace("%s", "?")
+
+
+def _driver_error(error: sqlite3.Error):
+    errors = db._mysql().errors
+    kind = errors.IntegrityError if isinstance(error, sqlite3.IntegrityError) else errors.DatabaseError
+    return kind(msg=str(error))
+
+
+class SQLiteCursor:
+    def __init__(self, cur, dictionary: bool):
+        self._cur = cur
+        self._dictionary = dictionary
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def execute(self, query, params=()):
+        try:
+            self._cur.execute(_to_sqlite(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise _driver_error(e) from e
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    def fetchmany(self, size):
+        return [self._row(r) for r in self._cur.fetchmany(size)]
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+
+    def cursor(self, dictionary: bool = False, buffered: bool = True):
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def start_transaction(self):
+        self._conn.execute("BEGIN;")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT;")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK;")
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLitePool:
+    """Drop-in for db.ConnectionPool; ``database`` is the SQLite file."""
+
+    def __init__(self, size: int, timeout: float, name: str = "erp_pool", **conn_args):
+        self.name = name
+        self.path = conn_args["database"]
+        if not os.path.isdir(os.path.dirname(self.path) or "."):
+            raise sqlite3.OperationalError(f"unable to open database file {self.path}")
+
+    @contextmanager
+    def connection(self):
+        conn = SQLiteConnection(self.path)
+        try:
+            yield conn
+        finally:
+            conn.rollback()     # like pool_reset_session: uncommitted work is dropped
+            conn.close()
+
+    def metrics(self) -> dict:
+        return {}
+
+
+def _table_names(path: str) -> list:
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';"))
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def settings():
+    """``settings(NAME=value, ...)`` applies db.configure() and restores the old values afterwards."""
+    saved = {}
+
+    def apply(**values):
+        for name in values:
+            saved.setdefault(name, getattr(db, name))
+        db.configure(**values)
+
+    yield apply
+    db.configure(**saved)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch, settings):
+    """A small generated database as db.py's primary; returns its path."""
+    path = str(tmp_path / "erp.db")
+    conn = sqlite3.connect(path)
+    datagen.fill(conn, "sqlite", datagen.Generator(200, days=5), log=lambda *_: None)
+    conn.close()
+    monkeypatch.setattr(db, "ConnectionPool", SQLitePool)
+    monkeypatch.setattr(db, "get_all_tables", lambda: _table_names(path))
+    settings(DB_NAME=path, SNAPSHOTS_ENABLED=False, REFRESH_ENABLED=False)
+    return path
@@ -0,0 +1,74 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+import db
+
+DAY = date(2024, 7, 1)
+
+
+@pytest.fixture
+def attendance(sqlite_db):
+    """Empty attendance with the unique day key (migration 004) and the daily rollup (migration 003)."""
+    conn = sqlite3.connect(sqlite_db)
+    conn.executescript("""
+        DELETE FROM attendance;
+        CREATE UNIQUE INDEX uq_attendance_student_day ON attendance (STUDENT_ID, ATTENDANCE_DATE);
+        CREATE TABLE summary_attendance_daily (
+            ATTENDANCE_DATE DATE PRIMARY KEY, present_count INT NOT NULL, total_count INT NOT NULL
+        );
+    """)
+    conn.close()
+
+    def query(sql):
+        conn = sqlite3.connect(sqlite_db)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+    return query
+
+
+def test_rows_are_written_in_chunks(attendance):
+    rows = [(sid, DAY.isoformat(), "Present") for sid in range(1, 8)]
+    res = db.bulk_upsert("attendance", ["STUDENT_ID", "ATTENDANCE_DATE", "STATUS"], rows, chunk_size=3)
+    assert res["written"] == 7 and res["errors"] == []
+    assert attendance("SELECT COUNT(*) FROM attendance;") == [(7,)]
+
+
+def test_bad_rows_are_reported_and_the_rest_saved(attendance):
+    rows = [(1, DAY, "Present"), (2, DAY, None), (3, DAY, "Absent"), (4, None, "Present"), (5, DAY, "Leave")]
+    res = db.bulk_upsert("attendance", ["STUDENT_ID", "ATTENDANCE_DATE", "STATUS"], rows, chunk_size=2)
+    assert res["written"] == 3
+    assert [i for i, _ in res["errors"]] == [1, 3]          # indexes into ``rows``
+    assert all("NOT NULL" in message for _, message in res["errors"])
+    assert attendance("SELECT STUDENT_ID FROM attendance ORDER BY STUDENT_ID;") == [(1,), (3,), (5,)]
+
+
+def test_update_columns_upsert_existing_rows(attendance):
+    columns = ["STUDENT_ID", "ATTENDANCE_DATE", "STATUS"]
+    db.bulk_upsert("attendance", columns, [(1, DAY, "Present"), (2, DAY, "Present")], update_columns=["STATUS"])
+    res = db.bulk_upsert("attendance", columns, [(2, DAY, "Absent"), (3, DAY, "Leave")], update_columns=["STATUS"])
+    assert res["errors"] == []
+    assert attendance("SELECT STUDENT_ID, STATUS FROM attendance ORDER BY STUDENT_ID;") == [
+        (1, "Present"), (2, "Absent"), (3, "Leave"),
+    ]
+
+
+def test_failing_before_commit_rolls_everything_back(attendance):
+    def checkpoint(cur, written, errors):
+        cur.execute("INSERT INTO no_such_table VALUES (1);")
+
+    with pytest.raises(db._mysql().Error):
+        db.bulk_upsert("attendance", ["STUDENT_ID", "ATTENDANCE_DATE", "STATUS"],
+                       [(1, DAY, "Present")], before_commit=checkpoint)
+    assert attendance("SELECT COUNT(*) FROM attendance;") == [(0,)]
+
+
+def test_mark_attendance_recounts_the_day_in_the_same_write(attendance):
+    res = db.mark_attendance(DAY, [1, 2, 3], ["Present", "Absent", "Present"])
+    assert res["written"] == 3
+    assert attendance("SELECT present_count, total_count FROM summary_attendance_daily;") == [(2, 3)]
+    db.mark_attendance(DAY, [2], ["Present"])                 # re-marking updates the student's row
+    assert attendance("SELECT present_count, total_count FROM summary_attendance_daily;") == [(3, 3)]
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+import db
+
+SCHEMA = [
+    {"COLUMN_NAME": "PAYMENT_ID", "DATA_TYPE": "int", "COLUMN_TYPE": "int"},
+    {"COLUMN_NAME": "ROLL_NO", "DATA_TYPE": "smallint", "COLUMN_TYPE": "smallint unsigned"},
+    {"COLUMN_NAME": "AMOUNT_PAID", "DATA_TYPE": "decimal", "COLUMN_TYPE": "decimal(10,2)"},
+    {"COLUMN_NAME": "RATING", "DATA_TYPE": "float", "COLUMN_TYPE": "float"},
+    {"COLUMN_NAME": "PAYMENT_DATE", "DATA_TYPE": "date", "COLUMN_TYPE": "date"},
+    {"COLUMN_NAME": "PAYMENT_MODE", "DATA_TYPE": "varchar", "COLUMN_TYPE": "varchar(20)"},
+    {"COLUMN_NAME": "REMARKS", "DATA_TYPE": "varchar", "COLUMN_TYPE": "varchar(255)"},
+]
+
+
+@pytest.fixture
+def payments(monkeypatch):
+    monkeypatch.setattr(db, "get_table_schema", lambda table_name: SCHEMA)
+    return lambda: pd.DataFrame({
+        "PAYMENT_ID": [1, 2, None],
+        "ROLL_NO": [10, 20, 30],
+        "AMOUNT_PAID": [Decimal("1000.10"), Decimal("2500.55"), Decimal("0.30")],
+        "RATING": [4.5, None, 3.0],
+        "PAYMENT_DATE": ["2024-07-01", "2024-07-02", "not a date"],
+        "PAYMENT_MODE": ["UPI", "Cash", "UPI"],
+        "REMARKS": ["first", "second", "third"],
+    })
+
+
+def test_numbers_and_dates_get_compact_types(payments):
+    df = db.compact_frame(payments(), "fee_payment")
+    assert str(df["PAYMENT_ID"].dtype) == "Int32" and df["PAYMENT_ID"].isna().sum() == 1
+    assert str(df["ROLL_NO"].dtype) == "UInt16"
+    assert str(df["RATING"].dtype) == "float32"
+    assert pd.api.types.is_datetime64_any_dtype(df["PAYMENT_DATE"])
+    assert df["PAYMENT_DATE"].isna().sum() == 1
+
+
+def test_decimal_stays_exact(payments):
+    df = db.compact_frame(payments(), "fee_payment")
+    assert list(df["AMOUNT_PAID"]) == [Decimal("1000.10"), Decimal("2500.55"), Decimal("0.30")]
+    assert sum(df["AMOUNT_PAID"]) == Decimal("3500.95")
+
+
+def test_categories_only_when_asked_and_only_listed_columns(payments):
+    df = db.compact_frame(payments(), "fee_payment")
+    assert not isinstance(df["PAYMENT_MODE"].dtype, pd.CategoricalDtype)
+    df = db.compact_frame(payments(), "fee_payment", categories=True)
+    assert isinstance(df["PAYMENT_MODE"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["REMARKS"].dtype, pd.CategoricalDtype)
+
+
+def test_unknown_table_keeps_default_dtypes(monkeypatch):
+    def missing(table_name):
+        raise RuntimeError("no metadata")
+    monkeypatch.setattr(db, "get_table_schema", missing)
+    df = pd.DataFrame({"A": [1, 2]})
+    assert db.compact_frame(df, "nope")["A"].dtype == "int64"
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pandas as pd
+
+import importer
+
+SCHEMA = [
+    {"COLUMN_NAME": "PAYMENT_ID", "DATA_TYPE": "int", "COLUMN_TYPE": "int", "IS_NULLABLE": "NO",
+     "COLUMN_DEFAULT": None, "EXTRA": "auto_increment", "CHARACTER_MAXIMUM_LENGTH": None,
+     "NUMERIC_PRECISION": 10, "NUMERIC_SCALE": 0},
+    {"COLUMN_NAME": "AMOUNT_PAID", "DATA_TYPE": "decimal", "COLUMN_TYPE": "decimal(10,2)", "IS_NULLABLE": "NO",
+     "COLUMN_DEFAULT": None, "EXTRA": "", "CHARACTER_MAXIMUM_LENGTH": None,
+     "NUMERIC_PRECISION": 10, "NUMERIC_SCALE": 2},
+    {"COLUMN_NAME": "PAYMENT_MODE", "DATA_TYPE": "varchar", "COLUMN_TYPE": "varchar(5)", "IS_NULLABLE": "YES",
+     "COLUMN_DEFAULT": None, "EXTRA": "", "CHARACTER_MAXIMUM_LENGTH": 5,
+     "NUMERIC_PRECISION": None, "NUMERIC_SCALE": None},
+]
+
+
+def coerce(amounts, modes=None):
+    chunk = pd.DataFrame({"amount": amounts, "mode": modes or ["UPI"] * len(amounts)}, dtype=object)
+    return importer.coerce_chunk(chunk, {"amount": "AMOUNT_PAID", "mode": "PAYMENT_MODE"}, SCHEMA, first_row=1)
+
+
+def test_decimals_are_imported_exactly():
+    columns, rows, errors = coerce(["1000.10", "0.1", " 99999999.99 ", "-5"])
+    assert errors == []
+    assert [r[0] for r in rows] == [Decimal("1000.10"), Decimal("0.1"), Decimal("99999999.99"), Decimal("-5")]
+    assert rows[0][0] + rows[1][0] == Decimal("1000.20")     # no float rounding
+
+
+def test_decimals_outside_precision_or_scale_are_rejected():
+    columns, rows, errors = coerce(["100000000", "1.005", "abc", "12.50"])
+    assert [r[0] for r in rows] == [Decimal("12.50")]
+    assert errors == [(1, "AMOUNT_PAID: invalid decimal(10,2) value"),
+                      (2, "AMOUNT_PAID: invalid decimal(10,2) value"),
+                      (3, "AMOUNT_PAID: invalid decimal(10,2) value")]
+
+
+def test_required_and_too_long_values_are_reported():
+    columns, rows, errors = coerce([None, "10"], ["UPI", "NETBANKING"])
+    assert rows == []
+    assert errors == [(1, "AMOUNT_PAID is required"), (2, "PAYMENT_MODE: invalid varchar value")]
+
+
+def test_match_columns_is_case_insensitive():
+    mapping, unknown, missing = importer.match_columns(["amount_paid", "Notes"], SCHEMA)
+    assert mapping == {"amount_paid": "AMOUNT_PAID"}
+    assert unknown == ["Notes"] and missing == []
@@ -0,0 +1,84 @@
+import sqlite3
+from collections import Counter
+
+import pytest
+
+import db
+
+
+def make_backend(path, name, lag=0):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS whoami (NAME TEXT);")
+    conn.execute("INSERT INTO whoami VALUES (?);", (name,))
+    conn.execute("CREATE TABLE replica_status (Seconds_Behind_Source INTEGER);")
+    conn.execute("INSERT INTO replica_status VALUES (?);", (lag,))
+    conn.commit()
+    conn.close()
+
+
+def set_lag(path, lag):
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE replica_status SET Seconds_Behind_Source = ?;", (lag,))
+    conn.commit()
+    conn.close()
+
+
+def served_by(n=6) -> Counter:
+    return Counter(db.run_query("SELECT NAME FROM whoami;")[0]["NAME"] for _ in range(n))
+
+
+@pytest.fixture
+def replicas(sqlite_db, tmp_path, settings, monkeypatch):
+    """Primary plus replicas r1 (weight 2) and r2, read from the Dashboard; returns their paths."""
+    make_backend(sqlite_db, "primary")
+    paths = {name: str(tmp_path / f"{name}.db") for name in ("r1", "r2")}
+    for name, path in paths.items():
+        make_backend(path, name)
+    settings(
+        DB_REPLICAS=[{"host": "r1", "database": paths["r1"], "weight": 2},
+                     {"host": "r2", "database": paths["r2"]}],
+        REPLICA_MAX_LAG_S=30, REPLICA_CHECK_S=0, READ_YOUR_WRITES_S=60,
+    )
+    monkeypatch.setattr(db, "_recent_writes", {})
+    db.set_page("Dashboard")
+    db.set_session("reader")
+    yield paths
+    db.set_page("-")
+    db.set_session("-")
+
+
+def test_reads_follow_the_weights(replicas):
+    assert served_by(6) == {"r1": 4, "r2": 2}
+    stats = db.replica_metrics()
+    assert stats["r1:3306"]["reads"] == 4 and stats["r2:3306"]["reads"] == 2
+
+
+def test_form_pages_read_the_primary(replicas):
+    db.set_page("Students")
+    assert served_by(3) == {"primary": 3}
+
+
+def test_lagging_replica_is_skipped_until_it_catches_up(replicas):
+    set_lag(replicas["r1"], 120)
+    assert served_by(4) == {"r2": 4}
+    assert db.replica_metrics()["r1:3306"]["healthy"] is False
+    set_lag(replicas["r2"], 120)
+    assert served_by(2) == {"primary": 2}
+    set_lag(replicas["r1"], 0)
+    assert served_by(2) == {"r1": 2}
+
+
+def test_unreachable_replica_is_skipped(replicas, tmp_path, settings):
+    settings(DB_REPLICAS=[{"host": "r1", "database": str(tmp_path / "gone" / "r1.db"), "weight": 2},
+                          {"host": "r2", "database": replicas["r2"]}])
+    assert served_by(4) == {"r2": 4}
+    assert db.replica_metrics()["r1:3306"]["healthy"] is False
+
+
+def test_reads_after_a_write_go_to_the_primary(replicas):
+    assert served_by(3) == {"r1": 2, "r2": 1}
+    db.run_execute("INSERT INTO `room` (`ROOM_NAME`, `CAPACITY`) VALUES (%s, %s);", ("Lab A", 30))
+    assert served_by(3) == {"primary": 3}
+    assert db.run_query("SELECT COUNT(*) AS n FROM room WHERE ROOM_NAME = 'Lab A';")[0]["n"] == 1
+    db.set_session("someone-else")             # other sessions keep using the replicas
+    assert "primary" not in served_by(3)
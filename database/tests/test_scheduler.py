@@ -0,0 +1,62 @@
+from collections import Counter
+
+import scheduler
+
+
+def double_bookings(assignment) -> list:
+    slots = Counter()
+    for (batch, _), (day, period, room, faculty) in assignment.items():
+        slots.update([("batch", batch, day, period), ("room", room, day, period),
+                      ("faculty", faculty, day, period)])
+    return [slot for slot, n in slots.items() if n > 1]
+
+
+def assert_valid(problem, assignment):
+    assert double_bookings(assignment) == []
+    for (batch, _), (day, period, room, faculty) in assignment.items():
+        assert faculty in problem.batches[batch]["faculty"]
+        assert room in problem.fitting_rooms(batch)
+        assert period in problem.batch_periods(batch)
+        assert problem.faculty_free(faculty, day, period)
+
+
+def test_solution_has_no_double_bookings():
+    problem = scheduler.generate_problem(20, 8, 14, seed=1)
+    result = scheduler.solve(problem, time_limit=5)
+    assert result["unplaced"] == []
+    assert len(result["assignment"]) == len(problem.sessions())
+    assert_valid(problem, result["assignment"])
+
+
+def test_fixed_sessions_are_kept():
+    problem = scheduler.generate_problem(10, 5, 8, seed=2)
+    first = scheduler.solve(problem, time_limit=5)["assignment"]
+    fixed = dict(list(first.items())[:5])
+    result = scheduler.solve(problem, fixed=fixed, time_limit=5)
+    assert all(result["assignment"][s] == v for s, v in fixed.items())
+    assert_valid(problem, result["assignment"])
+
+
+def test_resolve_moves_only_the_absent_facultys_classes():
+    problem = scheduler.generate_problem(12, 6, 10, seed=3)
+    before = scheduler.solve(problem, time_limit=5)["assignment"]
+    absent = next(v[3] for v in before.values())
+    changed = scheduler.faculty_absent(problem, absent)
+    after = scheduler.resolve(changed, before, time_limit=5)
+    assert all(value[3] != absent for value in after["assignment"].values())
+    for session, value in before.items():
+        if value[3] != absent:
+            assert after["assignment"][session] == value
+    assert_valid(changed, after["assignment"])
+
+
+def test_impossible_sessions_are_reported_unplaced():
+    problem = scheduler.Problem(
+        days=["Mon"], periods=[540], period_minutes=60,
+        batches={"B1": {"size": 20, "faculty": ["F1"], "sessions": 2, "window": None}},
+        faculty={"F1": {"max_per_day": None, "unavailable": set()}},
+        rooms={"R1": 30},
+    )
+    result = scheduler.solve(problem, time_limit=1)
+    assert len(result["assignment"]) == 1
+    assert len(result["unplaced"]) == 1
@@ -0,0 +1,74 @@
+import sqlite3
+
+import search
+
+
+def make_index():
+    return search.SearchIndex().load([
+        (1, ["Aarav Sharma", "9876543210", "aarav.sharma1@gmail.com"]),
+        (2, ["Priya Verma", "98765 11111", "priya.verma2@yahoo.in"]),
+        (3, ["Rohit Sharma", "9123456789", None]),
+    ])
+
+
+def test_exact_match_ranks_above_prefix():
+    index = make_index()
+    index.upsert(4, ["Sharmaji"])
+    assert index.search("sharma")[:2] == [1, 3]
+    assert index.search("sharma")[-1] == 4
+
+
+def test_prefix_substring_and_digits():
+    index = make_index()
+    assert index.search("pri") == [2]
+    assert index.search("erma") == [2]                # substring of "verma"
+    assert index.search("9876511111") == [2]          # spaced number matched whole
+    assert index.search("aarav.sharma1@gmail.com") == [1]
+
+
+def test_typos_are_tolerated():
+    index = make_index()
+    assert index.search("verrma") == [2]              # one extra letter
+    assert index.search("rohti sharma") == [3]        # swapped letters
+
+
+def test_every_term_must_match():
+    assert make_index().search("priya sharma") == []
+
+
+def test_remove_and_upsert_keep_the_vocabulary_in_step():
+    index = make_index()
+    index.remove(2)
+    assert index.search("priya") == []
+    assert "priya" not in index.postings and "priya" not in index.vocabulary
+    index.upsert(3, ["Rohan Mehta"])
+    assert index.search("rohit") == []
+    assert index.search("mehta") == [3]
+    index.remove(99)                                  # unknown keys are ignored
+    assert len(index) == 2
+
+
+def test_table_search_sync_and_refresh(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "s.db"), isolation_level=None)
+    conn.execute("CREATE TABLE student (STUDENT_ID INTEGER PRIMARY KEY, NAME TEXT);")
+    conn.executemany("INSERT INTO student VALUES (?, ?);", [(1, "Aarav Sharma"), (2, "Priya Verma")])
+
+    def fetch(query, params=()):
+        cur = conn.execute(query.replace("%s", "?").replace("`", ""), params)
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    table = search.TableSearch("student", "STUDENT_ID", ["NAME"])
+    table.sync(fetch, max_age=3600, min_interval=0)
+    assert table.search("priya", 10) == [2]
+
+    conn.execute("INSERT INTO student VALUES (3, 'Priya Das');")
+    table.sync(fetch, max_age=3600, min_interval=0)   # new rows above the key high-water mark
+    assert sorted(table.search("priya", 10)) == [2, 3]
+
+    conn.execute("DELETE FROM student WHERE STUDENT_ID = 2;")
+    conn.execute("UPDATE student SET NAME = 'Aarav Khan' WHERE STUDENT_ID = 1;")
+    table.refresh(fetch, [1, 2])
+    assert table.search("priya", 10) == [3]
+    assert table.search("khan", 10) == [1]
+    assert table.search("sharma", 10) == []
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pyarrow as pa
+
+import snapshot
+
+SCHEMA = pa.schema([
+    ("PAYMENT_ID", pa.int64()),
+    ("AMOUNT_PAID", pa.decimal128(10, 2)),
+    ("REFERENCE_NO", pa.int64()),
+])
+
+
+class Table:
+    """A table the snapshot reads through a driver-like cursor (``%s`` filters on the key only)."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.queries = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def cursor(self, buffered=True):
+        return Cursor(self)
+
+
+class Cursor:
+    def __init__(self, table):
+        self.table = table
+        self.description = [(f.name,) for f in SCHEMA]
+
+    def execute(self, query, params=()):
+        self.table.queries.append(query)
+        low = params[0] if params else None
+        self.pending = [r for r in self.table.rows if low is None or r[0] > low]
+
+    def fetchmany(self, size):
+        chunk, self.pending = self.pending[:size], self.pending[size:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+def test_later_chunks_may_hold_wider_decimals_and_first_non_null_values(tmp_path):
+    table = Table([
+        (1, Decimal("500.00"), None),
+        (2, Decimal("750.50"), None),          # the first chunk has only NULL references
+        (3, Decimal("25000.00"), 1042),
+        (4, Decimal("99999999.99"), 1043),
+    ])
+    data = snapshot.sync(table.connect, str(tmp_path), "fee_payment", SCHEMA, "PAYMENT_ID", chunk_rows=2)
+    assert data.schema == SCHEMA
+    assert data["AMOUNT_PAID"].to_pylist()[2:] == [Decimal("25000.00"), Decimal("99999999.99")]
+    assert data["REFERENCE_NO"].to_pylist() == [None, None, 1042, 1043]
+
+
+def test_incremental_sync_appends_with_the_same_types(tmp_path):
+    table = Table([(1, Decimal("5.00"), None)])
+    snapshot.sync(table.connect, str(tmp_path), "fee_payment", SCHEMA, "PAYMENT_ID")
+    table.rows.append((2, Decimal("123456.78"), 7))
+    data = snapshot.sync(table.connect, str(tmp_path), "fee_payment", SCHEMA, "PAYMENT_ID")
+    assert "WHERE `PAYMENT_ID` > %s" in table.queries[-1]
+    assert len(snapshot.read_meta(str(tmp_path), "fee_payment")["parts"]) == 2
+    assert data["AMOUNT_PAID"].to_pylist() == [Decimal("5.00"), Decimal("123456.78")]
+
+
+def test_changed_column_types_rebuild_the_snapshot(tmp_path):
+    table = Table([(1, Decimal("5.00"), None)])
+    snapshot.sync(table.connect, str(tmp_path), "fee_payment", SCHEMA, "PAYMENT_ID")
+    wider = SCHEMA.set(1, pa.field("AMOUNT_PAID", pa.decimal128(12, 2)))
+    data = snapshot.sync(table.connect, str(tmp_path), "fee_payment", wider, "PAYMENT_ID")
+    assert "WHERE" not in table.queries[-1]
+    assert data.schema == wider
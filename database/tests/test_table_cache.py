@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+import db
+
+
+class Clock:
+    """Stands in for the time module inside db.py so TTLs can be stepped through."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db, "time", clock)
+    return clock
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = db.TableCache(max_entries=10, ttl=60)
+    cache.set("k", 1, ["student"])
+    assert cache.get("k") == (True, 1, False)
+    clock.now += 61
+    assert cache.get("k") == (False, None, False)
+    assert cache.metrics()["misses"] == 1
+
+
+def test_expired_entry_served_stale_only_when_allowed(clock):
+    cache = db.TableCache(max_entries=10, ttl=60, stale_s=30)
+    cache.set("k", 1, ["student"])
+    clock.now += 70
+    assert cache.get("k") == (False, None, False)
+    assert cache.get("k", allow_stale=True) == (True, 1, True)
+    assert cache.peek("k") == (False, None)
+    clock.now += 30
+    assert cache.get("k", allow_stale=True) == (False, None, False)
+
+
+def test_invalidate_drops_only_entries_of_the_written_table(clock):
+    cache = db.TableCache(max_entries=10, ttl=60)
+    cache.set("students", 1, ["student"])
+    cache.set("joined", 2, ["student", "course"])
+    cache.set("leads", 3, ["lead"])
+    assert sorted(cache.invalidate("student")) == ["joined", "students"]
+    assert cache.get("leads") == (True, 3, False)
+    assert cache.get("joined")[0] is False
+
+
+def test_load_overtaken_by_a_write_is_discarded(clock):
+    cache = db.TableCache(max_entries=10, ttl=60)
+    seen = cache.version(["student"])
+    cache.invalidate("student")             # a write lands while the slow read runs
+    assert cache.set("k", "old", ["student"], seen=seen) is False
+    assert cache.get("k")[0] is False
+    assert cache.metrics()["discarded_loads"] == 1
+    assert cache.set("k", "new", ["student"], seen=cache.version(["student"])) is True
+    cache.invalidate("lead")                # other tables do not matter
+    assert cache.get("k") == (True, "new", False)
+
+
+def test_clear_changes_every_version(clock):
+    cache = db.TableCache(max_entries=10, ttl=60)
+    seen = cache.version(["lead"])
+    cache.clear()
+    assert cache.set("k", 1, ["lead"], seen=seen) is False
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = db.TableCache(max_entries=2, ttl=60)
+    cache.set("a", 1, ["t"])
+    cache.set("b", 2, ["t"])
+    cache.get("a")
+    cache.set("c", 3, ["t"])
+    assert cache.get("b")[0] is False
+    assert cache.get("a")[0] and cache.get("c")[0]
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_per_entry_ttl_and_expires_in(clock):
+    cache = db.TableCache(max_entries=10, ttl=60)
+    cache.set("short", 1, ["t"], ttl=5)
+    assert cache.expires_in("short") == (5, 5)
+    clock.now += 6
+    assert cache.get("short")[0] is False
+    assert cache.expires_in("missing") is None
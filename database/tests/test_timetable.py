@@ -0,0 +1,47 @@
+import pandas as pd
+
+import timetable
+
+
+def bookings(rows):
+    return pd.DataFrame(rows, columns=["SCHEDULE_ID", "CLASS_DATE", "START_TIME", "END_TIME", "ROOM_ID", "FACULTY_ID"])
+
+
+SCHEDULE = bookings([
+    (1, "2024-07-01", "09:00", "10:00", 101, 7),
+    (2, "2024-07-01", "09:30", "10:30", 101, 8),    # room 101 double-booked with 1
+    (3, "2024-07-01", "10:00", "11:00", 102, 7),    # back to back with 1: fine
+    (4, "2024-07-02", "09:00", "10:00", 101, 7),    # same room, other day
+    (5, "2024-07-01", "08:00", "12:00", 103, 9),
+    (6, "2024-07-01", "11:00", "11:30", 103, 7),    # inside 5; faculty 7 free again by then
+])
+
+
+def test_resolve_columns_picks_known_names():
+    cols = timetable.resolve_columns(SCHEDULE.columns)
+    assert cols["id"] == "SCHEDULE_ID" and cols["day"] == "CLASS_DATE"
+    assert cols["batch"] is None
+
+
+def test_to_minutes_accepts_strings_and_timedeltas():
+    assert list(timetable.to_minutes(["09:30", "13:15:00"])) == [570, 795]
+    assert list(timetable.to_minutes(pd.to_timedelta(["01:00:00"]))) == [60]
+
+
+def test_find_conflicts_per_resource():
+    cols = timetable.resolve_columns(SCHEDULE.columns)
+    rooms = timetable.find_conflicts(SCHEDULE, cols, "room")
+    assert sorted(zip(rooms["id"], rooms["overlaps_id"])) == [(2, 1), (6, 5)]
+    assert timetable.find_conflicts(SCHEDULE, cols, "faculty").empty
+
+
+def test_interval_index_matches_the_sweep():
+    cols = timetable.resolve_columns(SCHEDULE.columns)
+    index = timetable.IntervalIndex(SCHEDULE, cols, "room")
+    assert index.conflicts(101, "2024-07-01", 595, 620) == [2]    # one clash is enough to reject
+    assert index.conflicts(101, "2024-07-01", 500, 550) == [1]
+    assert index.conflicts(101, "2024-07-01", 630, 700) == []     # starts as 2 ends
+    assert index.conflicts(103, "2024-07-01", 600, 610) == [5]
+    assert index.conflicts(104, "2024-07-01", 600, 610) == []
+    index.add(7, 104, "2024-07-01", 600, 660)
+    assert index.conflicts(104, "2024-07-01", 640, 700) == [7]
@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db
+
+INSERT_ROOM = "INSERT INTO `room` (`ROOM_NAME`, `CAPACITY`) VALUES (%s, %s);"
+
+
+def insert_room(name, gate=None):
+    def work(cur):
+        if gate is not None:
+            gate.wait(5)
+        cur.execute(INSERT_ROOM, (name, 30))
+        return name
+    return work
+
+
+def fail(cur):
+    cur.execute("INSERT INTO `no_such_table` VALUES (1);")
+
+
+def room_names(path) -> set:
+    conn = sqlite3.connect(path)
+    try:
+        return {name for (name,) in conn.execute("SELECT ROOM_NAME FROM room;")}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def write_queue(sqlite_db):
+    """A WriteQueue that groups everything submitted within 50 ms."""
+    return db.WriteQueue(max_pending=10, flush_ms=50, batch_max=10, idempotency_ttl=60)
+
+
+def test_failed_write_is_rolled_back_alone(sqlite_db, write_queue):
+    ok = write_queue.submit(insert_room("Lab A"))
+    bad = write_queue.submit(fail)
+    also_ok = write_queue.submit(insert_room("Lab B"))
+    assert ok.result(5) == "Lab A" and also_ok.result(5) == "Lab B"
+    with pytest.raises(db._mysql().Error):
+        bad.result(5)
+    assert {"Lab A", "Lab B"} <= room_names(sqlite_db)
+    stats = write_queue.metrics()
+    assert (stats["committed"], stats["failed"], stats["flushes"]) == (2, 1, 1)
+
+
+def test_lost_connection_fails_the_whole_group(sqlite_db, write_queue, monkeypatch):
+    def unreachable():
+        raise ConnectionError("server has gone away")
+    monkeypatch.setattr(db, "get_connection", unreachable)
+    futures = [write_queue.submit(insert_room(name)) for name in ("Lab C", "Lab D")]
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(5)
+    assert write_queue.metrics()["failed"] == 2
+    assert not {"Lab C", "Lab D"} & room_names(sqlite_db)
+
+
+def test_repeated_key_is_written_once_and_failures_can_retry(sqlite_db, write_queue):
+    first = write_queue.submit(insert_room("Lab E"), idempotency_key="form-1")
+    again = write_queue.submit(insert_room("Lab E"), idempotency_key="form-1")
+    assert again is first
+    first.result(5)
+    assert write_queue.metrics()["deduplicated"] == 1
+
+    failed = write_queue.submit(fail, idempotency_key="form-2")
+    with pytest.raises(db._mysql().Error):
+        failed.result(5)
+    retried = write_queue.submit(insert_room("Lab F"), idempotency_key="form-2")
+    assert retried is not failed and retried.result(5) == "Lab F"
+
+
+def test_full_queue_rejects_after_the_pool_timeout(sqlite_db, settings):
+    settings(DB_POOL_TIMEOUT=0.1)
+    write_queue = db.WriteQueue(max_pending=1, flush_ms=0, batch_max=1, idempotency_ttl=60)
+    gate = threading.Event()
+    running = write_queue.submit(insert_room("Lab G", gate))
+    deadline = time.monotonic() + 5
+    while write_queue.metrics()["depth"] and time.monotonic() < deadline:
+        time.sleep(0.01)        # the writer has taken it and is blocked on the gate
+    queued = write_queue.submit(insert_room("Lab H"))
+    with pytest.raises(TimeoutError):
+        write_queue.submit(insert_room("Lab I"))
+    assert write_queue.metrics()["rejected"] == 1
+    gate.set()
+    assert running.result(5) == "Lab G" and queued.result(5) == "Lab H"
+    assert "Lab I" not in room_names(sqlite_db)
+
+
+def test_timed_out_submitter_still_invalidates(sqlite_db, settings):
+    settings(WRITE_QUEUE_ENABLED=True, WRITE_TIMEOUT_S=0.05)
+    db.get_write_queue.clear()
+    cache = db.get_table_cache()
+    cache.set("rooms", ["old"], ["room"])
+    gate = threading.Event()
+    try:
+        with pytest.raises(TimeoutError):
+            db.submit_write(insert_room("Lab J", gate), written=[INSERT_ROOM])
+        assert cache.get("rooms")[0]
+        gate.set()
+        deadline = time.monotonic() + 5
+        while cache.get("rooms")[0] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not cache.get("rooms")[0]
+        assert "Lab J" in room_names(sqlite_db)
+    finally:
+        gate.set()
+        db.get_write_queue.clear()
@@ -0,0 +1,180 @@
+"""Timetable conflict detection and room utilisation over ``class_schedule`` bookings."""
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+# role -> accepted column names in class_schedule, first match wins
+COLUMN_CANDIDATES = {
+    "id": ("SCHEDULE_ID", "CLASS_ID", "ID"),
+    "day": ("CLASS_DATE", "SCHEDULE_DATE", "DAY_OF_WEEK", "DAY"),
+    "start": ("START_TIME",),
+    "end": ("END_TIME",),
+    "room": ("ROOM_ID",),
+    "faculty": ("FACULTY_ID",),
+    "batch": ("BATCH_ID", "COURSE_ID", "COURSE_NAME"),
+}
+
+
+def resolve_columns(columns) -> dict:
+    """Map roles to the actual class_schedule column names (None when absent)."""
+    upper = {str(c).upper(): c for c in columns}
+    return {
+        role: next((upper[c] for c in names if c in upper), None)
+        for role, names in COLUMN_CANDIDATES.items()
+    }
+
+
+def to_minutes(values) -> np.ndarray:
+    """TIME values (timedelta from the driver, or 'HH:MM[:SS]' strings) -> minutes."""
+    series = pd.Series(values)
+    if not pd.api.types.is_timedelta64_dtype(series):
+        series = series.astype(str).str.strip()
+        series = series.where(series.str.count(":") != 1, series + ":00")
+        series = pd.to_timedelta(series, errors="coerce")
+    return (series.dt.total_seconds() / 60).to_numpy()
+
+
+def format_minutes(minutes) -> str:
+    """540 -> '09:00'."""
+    if minutes is None or pd.isna(minutes):
+        return ""
+    return f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}"
+
+
+def _intervals(df: pd.DataFrame, cols: dict, resource: str) -> pd.DataFrame:
+    out = pd.DataFrame({
+        "id": df[cols["id"]].to_numpy() if cols["id"] else np.arange(len(df)),
+        "resource": df[cols[resource]].to_numpy(),
+        # days compare as text so DATE, datetime and weekday-name columns all work
+        "day": df[cols["day"]].astype(str).str[:10].to_numpy() if cols["day"] else "",
+        "start": to_minutes(df[cols["start"]]),
+        "end": to_minutes(df[cols["end"]]),
+    })
+    out = out.dropna(subset=["resource", "start", "end"])
+    return out.sort_values(["resource", "day", "start", "end"], kind="mergesort").reset_index(drop=True)
+
+
+def find_conflicts(df: pd.DataFrame, cols: dict, resource: str) -> pd.DataFrame:
+    """Overlapping bookings of one resource kind ("room" or "faculty").
+
+    One sort plus a linear sweep (O(n log n)): within each resource/day, a
+    booking conflicts with the earlier booking that ends last if it starts
+    before that end. Returns one row per conflicting booking with the id of
+    the booking it overlaps.
+    """
+    iv = _intervals(df, cols, resource)
+    if iv.empty:
+        return pd.DataFrame(columns=["resource", "day", "id", "start", "end", "overlaps_id"])
+
+    group = (iv["resource"].ne(iv["resource"].shift()) | iv["day"].ne(iv["day"].shift())).cumsum().to_numpy()
+    starts, ends, ids = iv["start"].to_numpy(), iv["end"].to_numpy(), iv["id"].to_numpy()
+    hits = []
+    best_end, best_id, current = -np.inf, None, None
+    for i in range(len(iv)):
+        if group[i] != current:
+            current, best_end, best_id = group[i], -np.inf, None
+        if starts[i] < best_end:
+            hits.append((i, best_id))
+        if ends[i] > best_end:
+            best_end, best_id = ends[i], ids[i]
+
+    rows = iv.loc[[i for i, _ in hits], ["resource", "day", "id", "start", "end"]]
+    rows["overlaps_id"] = [other for _, other in hits]
+    return rows.reset_index(drop=True)
+
+
+class IntervalIndex:
+    """Sorted bookings per (resource, day) for O(log n) availability checks.
+
+    Keeps start times sorted with a running max of end times, so one binary
+    search finds whether any earlier-starting booking is still running and
+    whether the next booking starts before the new one ends.
+    """
+
+    def __init__(self, df: pd.DataFrame, cols: dict, resource: str):
+        self._slots = {}
+        iv = _intervals(df, cols, resource)
+        for (res, day), grp in iv.groupby(["resource", "day"], sort=False):
+            slot = {"start": grp["start"].tolist(), "end": grp["end"].tolist(), "id": grp["id"].tolist()}
+            self._slots[(res, day)] = slot
+            self._running(slot, 0)
+
+    @staticmethod
+    def _running(slot: dict, pos: int):
+        """Recompute the running max end (and which booking holds it) from ``pos`` on."""
+        ends = slot["end"]
+        run_max, run_arg = slot.setdefault("run_max", []), slot.setdefault("run_arg", [])
+        del run_max[pos:], run_arg[pos:]
+        for i in range(pos, len(ends)):
+            if i and run_max[i - 1] > ends[i]:
+                run_max.append(run_max[i - 1])
+                run_arg.append(run_arg[i - 1])
+            else:
+                run_max.append(ends[i])
+                run_arg.append(i)
+
+    def conflicts(self, resource_id, day, start: float, end: float) -> list:
+        """Ids of bookings overlapping ``[start, end)`` (minutes) for that resource/day.
+
+        Returns at most one booking on each side of ``start``, which is
+        enough to reject a slot.
+        """
+        slot = self._slots.get((resource_id, day))
+        if slot is None:
+            return []
+        starts, ids = slot["start"], slot["id"]
+        found = []
+        i = bisect_right(starts, start) - 1
+        if i >= 0 and slot["run_max"][i] > start:
+            found.append(ids[slot["run_arg"][i]])
+        j = bisect_left(starts, start)
+        while j < len(starts) and starts[j] == start:
+            j += 1
+        if j < len(starts) and starts[j] < end and ids[j] not in found:
+            found.append(ids[j])
+        return found
+
+    def add(self, booking_id, resource_id, day, start: float, end: float):
+        """Insert one booking, keeping the slot sorted."""
+        slot = self._slots.setdefault((resource_id, day), {"start": [], "end": [], "id": []})
+        pos = bisect_right(slot["start"], start)
+        slot["start"].insert(pos, start)
+        slot["end"].insert(pos, end)
+        slot["id"].insert(pos, booking_id)
+        self._running(slot, pos)
+
+
+def booked_hours(df: pd.DataFrame, cols: dict, resource: str) -> pd.Series:
+    """Hours each room/faculty member is booked, fully vectorised.
+
+    Bookings are merged per day first, so overlapping (conflicting) classes
+    are not counted twice.
+    """
+    iv = _intervals(df, cols, resource)
+    if iv.empty:
+        return pd.Series(dtype=float)
+    key = [iv["resource"], iv["day"]]
+    prev_end = iv.groupby(key)["end"].cummax().groupby(key).shift()
+    effective_start = np.maximum(iv["start"], prev_end.fillna(-np.inf))
+    busy = (iv["end"] - effective_start).clip(lower=0)
+    return busy.groupby(iv["resource"]).sum() / 60
+
+
+def room_utilisation(df: pd.DataFrame, cols: dict, open_minutes: float, rooms=None) -> pd.DataFrame:
+    """Occupied hours / available hours per room.
+
+    Available time is ``open_minutes`` for every day that appears in the
+    schedule. ``rooms`` (optional room ids) adds unbooked rooms at 0%.
+    """
+    occupied = booked_hours(df, cols, "room")
+    n_days = max(df[cols["day"]].nunique(), 1) if cols["day"] and not df.empty else 1
+    if rooms is not None:
+        occupied = occupied.reindex(occupied.index.union(pd.Index(list(rooms))), fill_value=0.0)
+    out = pd.DataFrame({
+        "occupied_hours": occupied.round(2),
+        "available_hours": round(n_days * open_minutes / 60, 2),
+    })
+    out["utilisation_pct"] = (100 * occupied / out["available_hours"]).round(1)
+    out.index.name = cols["room"]
+    return out.sort_values("utilisation_pct", ascending=False)